@@ -1,6 +1,21 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from figure_cache import figure_job, build_figures
+
+# Measured attention statistics (src/attention_stats.py, run with --grid 16) for
+# a pre-emergence, a transitional and a post-emergence model. Stages whose file
+# exists are drawn from data; the others fall back to the synthetic patterns.
+STATS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "results", "attention_stats")
+STAGE_STATS = {
+    'scattered': os.path.join(STATS_DIR, 'distilgpt2.npz'),
+    'transitional': os.path.join(STATS_DIR, 'gpt2-medium.npz'),
+    'structured': os.path.join(STATS_DIR, 'gpt2-xl.npz'),
+}
 
 def generate_attention_matrix(pattern_type, size=16):
     """Generate attention patterns based on emergence stage"""
@@ -36,14 +51,25 @@ def generate_attention_matrix(pattern_type, size=16):
         
     return np.clip(matrix, 0, 1)
 
+def stage_attention_matrix(pattern_type, size=16):
+    """Mean measured attention pattern for an emergence stage, if available"""
+    path = STAGE_STATS.get(pattern_type)
+    if path and os.path.exists(path):
+        from attention_stats import load_stats, mean_pattern
+        matrix = mean_pattern(load_stats(path))
+        if matrix.shape == (size, size):
+            # Rescale to [0, 1] to match the synthetic patterns' colour range
+            return matrix / matrix.max()
+    return generate_attention_matrix(pattern_type, size)
+
 def create_attention_pattern_analysis():
     # Create figure with 1x3 subplots
     fig, (ax1, ax2, ax3) = plt.subplots(1, 3, figsize=(15, 5))
     
     # Generate attention patterns
-    pre_emergence = generate_attention_matrix('scattered')
-    transitional = generate_attention_matrix('transitional')
-    post_emergence = generate_attention_matrix('structured')
+    pre_emergence = stage_attention_matrix('scattered')
+    transitional = stage_attention_matrix('transitional')
+    post_emergence = stage_attention_matrix('structured')
     
     # Color map for attention visualization
     cmap = plt.cm.YlOrRd
@@ -110,44 +136,64 @@ def create_attention_pattern_analysis():
     
     return fig
 
-def create_attention_evolution_animation():
-    """Creates additional frames showing attention pattern evolution"""
-    frames = []
-    size = 16
-    steps = 10
-    
+def create_attention_evolution_frame(i, steps=10, size=16, seed=0, figsize=(6, 6)):
+    """Creates frame `i` of `steps` interpolating scattered -> structured attention"""
+    # Same endpoints in every frame, whichever process renders it
+    np.random.seed(seed)
+    weight = i / max(steps - 1, 1)
+    scattered = stage_attention_matrix('scattered', size)
+    structured = stage_attention_matrix('structured', size)
+    interpolated = scattered * (1 - weight) + structured * weight
+    
+    fig, ax = plt.subplots(figsize=figsize)
+    im = ax.imshow(interpolated, cmap=plt.cm.YlOrRd, vmin=0, vmax=1)
+    ax.set_title(f'Attention Evolution: {weight*100:.0f}%')
+    plt.colorbar(im)
+    return fig
+
+def create_attention_evolution_animation(output='attention_evolution.gif', steps=10, fps=4,
+                                         dpi=100, workers=None, size=16, figsize=(6, 6)):
+    """Renders the evolution frames in a worker pool and streams them into a GIF/MP4"""
+    from frame_pipeline import render_frames, write_animation
+    frames = render_frames(__file__, "create_attention_evolution_frame", steps,
+                           params={"steps": steps, "size": size, "figsize": figsize},
+                           dpi=dpi, workers=workers)
+    n_frames, seconds = write_animation(frames, output, fps)
+    print(f"wrote {output}: {n_frames} frames in {seconds:.1f}s")
+    return output
+
+def figure_jobs(steps=10):
+    # Measured statistics are inputs: regenerating them invalidates the figures
+    inputs = [path for path in STAGE_STATS.values() if os.path.exists(path)]
+    jobs = [
+        figure_job(__file__, "create_attention_pattern_analysis", 'attention_patterns.png',
+                   inputs=inputs),
+    ]
+    # One job per evolution frame
     for i in range(steps):
-        # Create interpolated attention pattern
-        weight = i / (steps - 1)
-        scattered = generate_attention_matrix('scattered', size)
-        structured = generate_attention_matrix('structured', size)
-        interpolated = scattered * (1 - weight) + structured * weight
-        
-        fig, ax = plt.subplots(figsize=(6, 6))
-        im = ax.imshow(interpolated, cmap=plt.cm.YlOrRd)
-        ax.set_title(f'Attention Evolution: {weight*100:.0f}%')
-        plt.colorbar(im)
-        frames.append(fig)
-        plt.close()
-    
-    return frames
+        jobs.append(figure_job(__file__, "create_attention_evolution_frame",
+                               f'attention_evolution_{i:02d}.png',
+                               params={"i": i, "steps": steps}, inputs=inputs))
+    return jobs
 
 if __name__ == "__main__":
-    # Generate main attention pattern analysis
-    fig_attention = create_attention_pattern_analysis()
-    plt.savefig('attention_patterns.png', 
-                dpi=300, 
-                bbox_inches='tight',
-                facecolor='white',
-                edgecolor='none')
-    plt.close()
-    
-    # Generate evolution frames
-    frames = create_attention_evolution_animation()
-    for i, frame in enumerate(frames):
-        frame.savefig(f'attention_evolution_{i:02d}.png',
-                     dpi=300,
-                     bbox_inches='tight',
-                     facecolor='white',
-                     edgecolor='none')
-        plt.close(frame)
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Attention pattern figures and animation.")
+    parser.add_argument("--animation", action="store_true",
+                        help="also write the streamed attention-evolution animation")
+    parser.add_argument("--output", default='attention_evolution.gif',
+                        help="animation file (.gif, or .mp4 etc. to encode with ffmpeg)")
+    parser.add_argument("--steps", type=int, default=10, help="evolution frames")
+    parser.add_argument("--fps", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="render processes (default: one per CPU)")
+    parser.add_argument("--force", action="store_true",
+                        help="ignore the figure cache and re-render everything")
+    args = parser.parse_args()
+
+    # Generate main attention pattern analysis and evolution frames
+    # (skipped when unchanged)
+    build_figures(figure_jobs(args.steps), workers=args.workers, force=args.force)
+    if args.animation:
+        create_attention_evolution_animation(args.output, steps=args.steps, fps=args.fps,
+                                             workers=args.workers)
@@ -1,6 +1,11 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy.stats import binned_statistic
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from figure_cache import figure_job, build_figures
 
 def compute_calibration_metrics(confidences, accuracies, n_bins=10):
     """Compute calibration metrics."""
@@ -124,12 +129,11 @@ def create_calibration_analysis():
     
     return fig
 
+def figure_jobs():
+    return [
+        figure_job(__file__, "create_calibration_analysis", 'calibration_analysis.png'),
+    ]
+
 if __name__ == "__main__":
-    # Generate and save the plot
-    fig = create_calibration_analysis()
-    plt.savefig('calibration_analysis.png', 
-                dpi=300, 
-                bbox_inches='tight', 
-                facecolor='white',
-                edgecolor='none')
-    plt.close()
\ No newline at end of file
+    # Render stale figures only, in parallel
+    build_figures(figure_jobs())
@@ -1,35 +1,39 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy.special import expit
+import os
+import sys
 
-def create_emergence_analysis():
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from figure_cache import figure_job, build_figures
+import synthetic_data
+from synthetic_data import generator, perturb, stepwise
+
+# Model scales (in billions of parameters)
+MODEL_SIZES = np.array([0.082, 0.124, 0.345, 0.774, 1.5, 6, 7, 7, 7])
+
+def create_emergence_analysis(resolution=1):
+    """Three emergence patterns; resolution > 1 replaces the nine model sizes
+    with a log-spaced grid of 9 * resolution sizes over the same range"""
     # Create figure with 1x3 subplots
     fig, (ax1, ax2, ax3) = plt.subplots(1, 3, figsize=(15, 5))
     
-    # Model scales (in billions of parameters)
-    model_sizes = np.array([0.082, 0.124, 0.345, 0.774, 1.5, 6, 7, 7, 7])
+    model_sizes = MODEL_SIZES if resolution == 1 else np.geomspace(
+        MODEL_SIZES.min(), MODEL_SIZES.max(), len(MODEL_SIZES) * resolution)
+    log_size = np.log(model_sizes + 0.1)
     
     # Plot 1: Reading Comprehension - Sharp Transition
     # ------------------------------------
     # Generate data showing sharp transition at 1B parameters
-    rc_performance = []
-    rc_uncertainty = []
-    
-    for size in model_sizes:
-        if size < 1:
-            perf = 0.15 + 0.05 * np.log(size + 0.1)
-            unc = 0.4 - 0.05 * np.log(size + 0.1)
-        else:
-            perf = 0.3 + 0.15 * np.log(size + 0.1)
-            unc = 0.2 - 0.02 * np.log(size + 0.1)
-        rc_performance.append(perf)
-        rc_uncertainty.append(unc)
+    small = model_sizes < 1
+    rc_performance = np.where(small, 0.15 + 0.05 * log_size, 0.3 + 0.15 * log_size)
+    rc_uncertainty = np.where(small, 0.4 - 0.05 * log_size, 0.2 - 0.02 * log_size)
     
     # Plot main performance curve
     ax1.plot(model_sizes, rc_performance, 'b-', linewidth=2.5, label='Performance')
     ax1.fill_between(model_sizes, 
-                     np.array(rc_performance) - 0.05,
-                     np.array(rc_performance) + 0.05,
+                     rc_performance - 0.05,
+                     rc_performance + 0.05,
                      alpha=0.2, color='blue')
     
     # Plot uncertainty
@@ -80,38 +84,18 @@ def create_emergence_analysis():
     
     # Plot 3: Dialogue - Stepwise Improvements
     # ------------------------------------
-    # Generate stepwise improvement data
-    dialogue_performance = []
-    dialogue_uncertainty = []
-    
-    for size in model_sizes:
-        # Create stepwise pattern
-        if size < 0.2:
-            perf = 0.15
-            unc = 0.45
-        elif size < 1:
-            perf = 0.25
-            unc = 0.35
-        elif size < 5:
-            perf = 0.35
-            unc = 0.25
-        else:
-            perf = 0.45
-            unc = 0.20
-            
-        # Add small noise
-        perf += np.random.normal(0, 0.01)
-        unc += np.random.normal(0, 0.01)
-        
-        dialogue_performance.append(perf)
-        dialogue_uncertainty.append(unc)
+    # Generate stepwise improvement data (steps at 0.2B, 1B and 5B) with small noise
+    rng = generator("emergence_analysis")
+    steps = [0.2, 1, 5]
+    dialogue_performance = perturb(stepwise(model_sizes, steps, [0.15, 0.25, 0.35, 0.45]), 0.01, rng)
+    dialogue_uncertainty = perturb(stepwise(model_sizes, steps, [0.45, 0.35, 0.25, 0.20]), 0.01, rng)
     
     # Plot stepwise performance
     ax3.plot(model_sizes, dialogue_performance, 'purple', linewidth=2.5, 
             label='Performance')
     ax3.fill_between(model_sizes, 
-                     np.array(dialogue_performance) - 0.05,
-                     np.array(dialogue_performance) + 0.05,
+                     dialogue_performance - 0.05,
+                     dialogue_performance + 0.05,
                      alpha=0.2, color='purple')
     
     # Plot uncertainty
@@ -120,7 +104,7 @@ def create_emergence_analysis():
                  label='Uncertainty')
     
     # Add step markers
-    for step in [0.2, 1, 5]:
+    for step in steps:
         ax3.axvline(x=step, color='gray', linestyle=':', alpha=0.5)
         ax3.text(step*1.1, 0.1, f'Step\n{step}B', rotation=90, alpha=0.7)
     
@@ -141,23 +125,23 @@ def create_emergence_analysis():
     
     return fig
 
-def create_detailed_emergence_view():
+def create_detailed_emergence_view(resolution=1):
     """Creates additional visualization showing emergence patterns in detail"""
     fig, ax = plt.subplots(figsize=(10, 6))
     
     # Generate detailed model size range
-    model_sizes = np.logspace(-2, 1, 1000)
+    model_sizes = np.logspace(-2, 1, 1000 * resolution)
     
     # Generate different emergence patterns
     sharp = expit(3 * (np.log10(model_sizes) + 0.5))
     gradual = 0.1 + 0.4 * np.log10(model_sizes + 0.1) / np.log10(11)
-    stepwise = np.minimum(0.5, np.maximum(0.1, 
-                         np.floor(2 * np.log10(model_sizes) + 1) * 0.1))
+    steps = np.minimum(0.5, np.maximum(0.1, 
+                      np.floor(2 * np.log10(model_sizes) + 1) * 0.1))
     
     # Plot patterns
     ax.plot(model_sizes, sharp, 'b-', label='Sharp Transition', linewidth=2)
     ax.plot(model_sizes, gradual, 'g-', label='Gradual Emergence', linewidth=2)
-    ax.plot(model_sizes, stepwise, 'purple', label='Stepwise', linewidth=2)
+    ax.plot(model_sizes, steps, 'purple', label='Stepwise', linewidth=2)
     
     ax.set_xscale('log')
     ax.set_title('Comparison of Emergence Patterns', fontsize=12, fontweight='bold')
@@ -168,21 +152,15 @@ def create_detailed_emergence_view():
     
     return fig
 
+def figure_jobs():
+    # The data comes from synthetic_data.py: editing it invalidates the figures
+    inputs = [synthetic_data.__file__]
+    return [
+        figure_job(__file__, "create_emergence_analysis", 'emergence_analysis.png', inputs=inputs),
+        figure_job(__file__, "create_detailed_emergence_view", 'emergence_patterns_detail.png',
+                   inputs=inputs),
+    ]
+
 if __name__ == "__main__":
-    # Generate main emergence analysis plot
-    fig_emergence = create_emergence_analysis()
-    plt.savefig('emergence_analysis.png', 
-                dpi=300, 
-                bbox_inches='tight',
-                facecolor='white',
-                edgecolor='none')
-    plt.close()
-    
-    # Generate detailed emergence view
-    fig_detail = create_detailed_emergence_view()
-    plt.savefig('emergence_patterns_detail.png',
-                dpi=300,
-                bbox_inches='tight',
-                facecolor='white',
-                edgecolor='none')
-    plt.close()
\ No newline at end of file
+    # Render stale figures only, in parallel
+    build_figures(figure_jobs())
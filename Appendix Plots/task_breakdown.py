@@ -1,6 +1,11 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.gridspec as gridspec
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from figure_cache import figure_job, build_figures
 
 # Set basic matplotlib parameters
 plt.rcParams['figure.facecolor'] = 'white'
@@ -123,12 +128,11 @@ def create_task_breakdown_plot():
     
     return fig
 
+def figure_jobs():
+    return [
+        figure_job(__file__, "create_task_breakdown_plot", 'task_breakdown.png'),
+    ]
+
 if __name__ == "__main__":
-    # Generate and save the plot
-    fig = create_task_breakdown_plot()
-    plt.savefig('task_breakdown.png', 
-                dpi=300, 
-                bbox_inches='tight', 
-                facecolor='white',
-                edgecolor='none')
-    plt.close()
\ No newline at end of file
+    # Render stale figures only, in parallel
+    build_figures(figure_jobs())
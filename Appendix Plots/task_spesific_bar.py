@@ -1,5 +1,10 @@
 import numpy as np
 import matplotlib.pyplot as plt
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from figure_cache import figure_job, build_figures
 
 def create_task_specific_comparison():
     # Set up the figure with 5 subplots
@@ -144,21 +149,12 @@ def create_trend_analysis():
     
     return fig
 
+def figure_jobs():
+    return [
+        figure_job(__file__, "create_task_specific_comparison", 'task_specific_bars.png'),
+        figure_job(__file__, "create_trend_analysis", 'task_trends.png'),
+    ]
+
 if __name__ == "__main__":
-    # Generate main task-specific comparison plot
-    fig_comparison = create_task_specific_comparison()
-    plt.savefig('task_specific_bars.png', 
-                dpi=300, 
-                bbox_inches='tight',
-                facecolor='white',
-                edgecolor='none')
-    plt.close()
-    
-    # Generate trend analysis plot
-    fig_trends = create_trend_analysis()
-    plt.savefig('task_trends.png',
-                dpi=300,
-                bbox_inches='tight',
-                facecolor='white',
-                edgecolor='none')
-    plt.close()
\ No newline at end of file
+    # Render stale figures only, in parallel
+    build_figures(figure_jobs())
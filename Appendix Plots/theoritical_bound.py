@@ -1,6 +1,18 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from figure_cache import figure_job, build_figures
+import synthetic_data
+from synthetic_data import generator, perturb
+
+# Measured surface from src/phase_surface.py; the analytic mock is drawn
+# when it has not been built yet
+PHASE_SURFACE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "results",
+                             "phase_surface.npz")
 
 # Set basic matplotlib parameters
 plt.rcParams['figure.facecolor'] = 'white'
@@ -10,7 +22,7 @@ plt.rcParams['grid.alpha'] = 0.3
 plt.rcParams['axes.linewidth'] = 1.5
 plt.rcParams['axes.edgecolor'] = 'black'
 
-def create_theoretical_bounds_plot():
+def create_theoretical_bounds_plot(resolution=1):
     # Set up the figure
     fig = plt.figure(figsize=(15, 5))
     
@@ -44,13 +56,11 @@ def create_theoretical_bounds_plot():
     ax2 = fig.add_subplot(132)
     
     # Generate phase transition data
-    params = np.linspace(0, 7, 100)
+    params = np.linspace(0, 7, 100 * resolution)
     performance = 1 / (1 + np.exp(-2 * (params - 2)))
     
-    # Add controlled noise
-    np.random.seed(42)
-    noise = np.random.normal(0, 0.05, size=len(params))
-    performance_noisy = performance + noise
+    # Add controlled noise (seeded stream shared with the other appendix figures)
+    performance_noisy = perturb(performance, 0.05, generator("phase_transition_boundary"))
     
     ax2.plot(params, performance, color='#2ca02c', linestyle='-', 
              label='Mean Performance', linewidth=2.5)
@@ -101,14 +111,16 @@ def create_theoretical_bounds_plot():
     
     return fig
 
-def create_phase_transition_surface():
+def create_phase_transition_surface(resolution=1, task=None):
     """Creates 3D visualization of phase transition surface"""
+    if os.path.exists(PHASE_SURFACE):
+        return create_measured_phase_surface(task)
     fig = plt.figure(figsize=(10, 8))
     ax = fig.add_subplot(111, projection='3d')
     
     # Create detailed meshgrid
-    x = np.linspace(0, 7, 50)
-    y = np.linspace(0, 1, 50)
+    x = np.linspace(0, 7, 50 * resolution)
+    y = np.linspace(0, 1, 50 * resolution)
     X, Y = np.meshgrid(x, y)
     
     # Generate surface data
@@ -136,21 +148,51 @@ def create_phase_transition_surface():
     
     return fig
 
+def create_measured_phase_surface(task=None):
+    """Fraction of items with UCS >= tau over (log params, tau), from measured results"""
+    from phase_surface import load_phase_surface
+    data = load_phase_surface(PHASE_SURFACE)
+    tasks = list(data["tasks"])
+    # One task, or the mean over all tasks
+    Z = data["surface"][tasks.index(task)] if task else np.nanmean(data["surface"], axis=0)
+    X, Y = np.meshgrid(data["grid"], data["taus"], indexing='ij')
+    
+    fig = plt.figure(figsize=(10, 8))
+    ax = fig.add_subplot(111, projection='3d')
+    surf = ax.plot_surface(X, Y, Z, cmap='viridis', alpha=0.8, antialiased=True)
+    
+    # Evaluated models along the parameter axis, on the surface at the first tau
+    marker_z = np.interp(data["log_params"], data["grid"], Z[:, 0])
+    ax.scatter(data["log_params"], np.full_like(data["log_params"], data["taus"][0]),
+               marker_z, color='black', s=15)
+    
+    ax.set_xlabel('log10 Model Size (params)', fontsize=11, fontweight='bold', labelpad=10)
+    ax.set_ylabel('Threshold (tau)', fontsize=11, fontweight='bold', labelpad=10)
+    ax.set_zlabel('Fraction UCS >= tau', fontsize=11, fontweight='bold', labelpad=10)
+    scope = task or f'mean of {len(tasks)} tasks'
+    ax.set_title(f'Phase Transition Surface ({scope}, alpha = {float(data["alpha"]):g})',
+                 fontsize=13, fontweight='bold', pad=20)
+    
+    cbar = plt.colorbar(surf)
+    cbar.set_label('Emergent Fraction', fontsize=11, fontweight='bold')
+    cbar.ax.tick_params(labelsize=9)
+    
+    ax.view_init(elev=30, azim=45)
+    
+    return fig
+
+def figure_jobs():
+    # The data comes from synthetic_data.py and, when built, the measured
+    # surface: editing either invalidates the figures
+    inputs = [synthetic_data.__file__]
+    surface_inputs = inputs + ([PHASE_SURFACE] if os.path.exists(PHASE_SURFACE) else [])
+    return [
+        figure_job(__file__, "create_theoretical_bounds_plot", 'theoretical_bounds.png',
+                   inputs=inputs),
+        figure_job(__file__, "create_phase_transition_surface", 'phase_transition_surface.png',
+                   inputs=surface_inputs),
+    ]
+
 if __name__ == "__main__":
-    # Generate and save main plot
-    fig = create_theoretical_bounds_plot()
-    plt.savefig('theoretical_bounds.png', 
-                dpi=300, 
-                bbox_inches='tight', 
-                facecolor='white',
-                edgecolor='none')
-    plt.close()
-    
-    # Generate and save 3D surface plot
-    fig_3d = create_phase_transition_surface()
-    plt.savefig('phase_transition_surface.png', 
-                dpi=300, 
-                bbox_inches='tight', 
-                facecolor='white',
-                edgecolor='none')
-    plt.close()
\ No newline at end of file
+    # Render stale figures only, in parallel
+    build_figures(figure_jobs())
@@ -2,6 +2,11 @@ import numpy as np
 import matplotlib.pyplot as plt
 from scipy import stats
 import seaborn as sns
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from figure_cache import figure_job, build_figures
 
 def create_uncertainty_patterns():
     # Set up the figure with 3 subplots
@@ -130,21 +135,12 @@ def create_conformal_prediction_example():
     
     return fig
 
+def figure_jobs():
+    return [
+        figure_job(__file__, "create_uncertainty_patterns", 'uncertainty_patterns.png'),
+        figure_job(__file__, "create_conformal_prediction_example", 'conformal_example.png'),
+    ]
+
 if __name__ == "__main__":
-    # Generate main uncertainty patterns plot
-    fig_uncertainty = create_uncertainty_patterns()
-    plt.savefig('uncertainty_patterns.png', 
-                dpi=300, 
-                bbox_inches='tight', 
-                facecolor='white',
-                edgecolor='none')
-    plt.close()
-    
-    # Generate conformal prediction example
-    fig_conformal = create_conformal_prediction_example()
-    plt.savefig('conformal_example.png', 
-                dpi=300, 
-                bbox_inches='tight', 
-                facecolor='white',
-                edgecolor='none')
-    plt.close()
\ No newline at end of file
+    # Render stale figures only, in parallel
+    build_figures(figure_jobs())
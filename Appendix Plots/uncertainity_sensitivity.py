@@ -1,8 +1,16 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy import stats
+import os
+import sys
 
-def create_threshold_sensitivity_plot():
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from figure_cache import figure_job, build_figures
+import synthetic_data
+from synthetic_data import emergence_fraction, generator, perturb
+
+def create_threshold_sensitivity_plot(resolution=1):
+    """Threshold sensitivity panels; `resolution` multiplies the threshold grids"""
     # Create figure with 1x3 subplots
     fig, (ax1, ax2, ax3) = plt.subplots(1, 3, figsize=(15, 5))
     
@@ -15,18 +23,16 @@ def create_threshold_sensitivity_plot():
         ('Qwen-7B', 7, '#9467bd')
     ]
     
+    sizes = np.array([size for _, size, _ in models])
+    rng = generator("threshold_sensitivity")
+    
     # Plot 1: Emergence fraction vs. threshold
-    thresholds = np.linspace(0.1, 0.9, 50)
-    
-    for model_name, size, color in models:
-        # Generate emergence fractions based on model size
-        if size < 0.5:  # Small models
-            fraction = 1 / (1 + np.exp(10 * (thresholds - 0.3)))
-        elif size < 2:  # Medium models
-            fraction = 1 / (1 + np.exp(8 * (thresholds - 0.5)))
-        else:  # Large models
-            fraction = 1 / (1 + np.exp(6 * (thresholds - 0.7)))
-            
+    # [model, threshold]; small (< 0.5B), medium (< 2B) and large models
+    # emerge around thresholds 0.3, 0.5 and 0.7
+    thresholds = np.linspace(0.1, 0.9, 50 * resolution)
+    fractions = emergence_fraction(thresholds, sizes)
+    
+    for (model_name, _, color), fraction in zip(models, fractions):
         ax1.plot(thresholds, fraction, label=model_name, 
                 color=color, linewidth=2)
     
@@ -38,21 +44,12 @@ def create_threshold_sensitivity_plot():
     ax1.grid(True, alpha=0.3)
     
     # Plot 2: Model ranking stability
-    thresholds_sparse = np.linspace(0.2, 0.8, 4)
-    rankings = np.zeros((len(models), len(thresholds_sparse)))
-    
-    # Generate rankings for different thresholds
-    for i, thresh in enumerate(thresholds_sparse):
-        # Simulate performance scores at each threshold
-        scores = []
-        for _, size, _ in models:
-            base_score = size / 8  # Normalize to 0-1 range
-            noise = np.random.normal(0, 0.05)
-            score = base_score + noise
-            scores.append(score)
-        
-        # Convert to rankings
-        rankings[:, i] = len(models) - stats.rankdata(scores)
+    thresholds_sparse = np.linspace(0.2, 0.8, 4 * resolution)
+    
+    # Simulated performance scores [threshold, model] (size / 8 normalises
+    # to 0-1), converted to rankings [model, threshold]
+    scores = perturb(sizes / 8, 0.05, rng, (len(thresholds_sparse), len(models)))
+    rankings = (len(models) - stats.rankdata(scores, axis=1)).T
     
     # Plot ranking lines
     for i, (model_name, _, color) in enumerate(models):
@@ -69,14 +66,9 @@ def create_threshold_sensitivity_plot():
     
     # Plot 3: Task-specific threshold effects
     tasks = ['QA', 'RC', 'CI', 'DR', 'Sum']
-    threshold_effects = np.zeros((len(tasks), len(models)))
     
-    # Generate task-specific effects
-    for i, task in enumerate(tasks):
-        for j, (_, size, _) in enumerate(models):
-            base_effect = size / 8
-            task_modifier = np.random.normal(0, 0.1)
-            threshold_effects[i, j] = base_effect + task_modifier
+    # Task-specific effects [task, model]
+    threshold_effects = perturb(sizes / 8, 0.1, rng, (len(tasks), len(models)))
     
     # Create heatmap
     im = ax3.imshow(threshold_effects, cmap='YlOrRd', aspect='auto')
@@ -116,12 +108,12 @@ def create_threshold_sensitivity_plot():
     return fig
 
 # Additional function for detailed threshold analysis
-def create_threshold_detail_plot():
+def create_threshold_detail_plot(resolution=1):
     """Creates additional detailed threshold analysis"""
     fig, ax = plt.subplots(figsize=(8, 6))
     
     # Generate detailed threshold data
-    thresholds = np.linspace(0.1, 0.9, 100)
+    thresholds = np.linspace(0.1, 0.9, 100 * resolution)
     performance = 1 / (1 + np.exp(-10 * (thresholds - 0.5)))
     uncertainty = 1 - performance
     
@@ -140,21 +132,14 @@ def create_threshold_detail_plot():
     
     return fig
 
+def figure_jobs():
+    # The data comes from synthetic_data.py: editing it invalidates the figures
+    inputs = [synthetic_data.__file__]
+    return [
+        figure_job(__file__, "create_threshold_sensitivity_plot", 'threshold_sensitivity.png', inputs=inputs),
+        figure_job(__file__, "create_threshold_detail_plot", 'threshold_detail.png', inputs=inputs),
+    ]
+
 if __name__ == "__main__":
-    # Generate main threshold sensitivity plot
-    fig_threshold = create_threshold_sensitivity_plot()
-    plt.savefig('threshold_sensitivity.png', 
-                dpi=300, 
-                bbox_inches='tight',
-                facecolor='white',
-                edgecolor='none')
-    plt.close()
-    
-    # Generate detailed threshold analysis
-    fig_detail = create_threshold_detail_plot()
-    plt.savefig('threshold_detail.png',
-                dpi=300,
-                bbox_inches='tight',
-                facecolor='white',
-                edgecolor='none')
-    plt.close()
\ No newline at end of file
+    # Render stale figures only, in parallel
+    build_figures(figure_jobs())
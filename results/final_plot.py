@@ -9,12 +9,19 @@ Generates:
 2) Param count vs. UCS   plots (one per dataset)
 
 Saves them to results/figures/datasetname_acc.png and datasetname_ucs.png.
+Figures whose records and plotting code are unchanged since the last run are
+skipped; the rest are rendered in parallel (see src/figure_cache.py).
 """
 
+import argparse
 import os
+import sys
 import matplotlib.pyplot as plt
 import numpy as np
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from figure_cache import figure_job, build_figures
+
 # Same data structure as the tables script
 data_records = [
     # ===================== MMLU_10k (Question Answering) =====================
@@ -76,53 +83,63 @@ data_records = [
 def filter_by_dataset(records, ds_name):
     return [r for r in records if r["dataset"] == ds_name]
 
-def main():
-    os.makedirs("results/figures", exist_ok=True)
-
+def plot_param_vs_metric(ds, records, metric, ylabel, title, marker, color=None):
+    """
+    One dataset's param count vs. `metric` line plot, annotated with model names.
+    """
+    # Sort by param_count
+    subset_sorted = sorted(records, key=lambda x: x["param_count"])
+
+    params = [r["param_count"] for r in subset_sorted]
+    values = [r[metric]        for r in subset_sorted]
+    models = [r["model"]       for r in subset_sorted]
+
+    fig = plt.figure()
+    plt.plot(params, values, marker=marker, color=color)
+    for i, txt in enumerate(models):
+        plt.annotate(txt, (params[i], values[i]), xytext=(5, -5),
+                     textcoords='offset points', fontsize=8)
+    plt.xscale("log")
+    plt.xlabel("Parameter Count (log scale)")
+    plt.ylabel(ylabel)
+    plt.title(f"{ds}: {title} vs. Model Size")
+    plt.grid(True)
+    return fig
+
+def figure_jobs():
+    """
+    Two figures per dataset. Each job only carries its own dataset's records,
+    so updating one dataset leaves the other datasets' PNGs cached.
+    """
     datasets = ["mmlu_10k","cosmosqa_10k","hellaswag_10k","halu_dialogue","halu_summarization"]
+    jobs = []
     for ds in datasets:
         subset = filter_by_dataset(data_records, ds)
         if not subset:
             continue
-        # Sort by param_count
-        subset_sorted = sorted(subset, key=lambda x: x["param_count"])
-
-        params = [r["param_count"] for r in subset_sorted]
-        acc    = [r["acc"]         for r in subset_sorted]
-        ucs    = [r["ucs"]         for r in subset_sorted]
-        models = [r["model"]       for r in subset_sorted]
-
         # 1) Plot: Param vs. Accuracy
-        plt.figure()
-        plt.plot(params, acc, marker='o')
-        for i, txt in enumerate(models):
-            plt.annotate(txt, (params[i], acc[i]), xytext=(5, -5),
-                         textcoords='offset points', fontsize=8)
-        plt.xscale("log")
-        plt.xlabel("Parameter Count (log scale)")
-        plt.ylabel("Accuracy (C)")
-        plt.title(f"{ds}: Accuracy vs. Model Size")
-        plt.grid(True)
-        out_acc = f"results/figures/{ds}_acc.png"
-        plt.savefig(out_acc, dpi=300)
-        plt.close()
-
+        jobs.append(figure_job(
+            __file__, "plot_param_vs_metric", f"results/figures/{ds}_acc.png",
+            params=dict(ds=ds, records=subset, metric="acc", ylabel="Accuracy (C)",
+                        title="Accuracy", marker='o'),
+            savefig={"dpi": 300}))
         # 2) Plot: Param vs. UCS
-        plt.figure()
-        plt.plot(params, ucs, marker='s', color='red')
-        for i, txt in enumerate(models):
-            plt.annotate(txt, (params[i], ucs[i]), xytext=(5, -5),
-                         textcoords='offset points', fontsize=8)
-        plt.xscale("log")
-        plt.xlabel("Parameter Count (log scale)")
-        plt.ylabel("UCS (alpha=0.3)")
-        plt.title(f"{ds}: UCS vs. Model Size")
-        plt.grid(True)
-        out_ucs = f"results/figures/{ds}_ucs.png"
-        plt.savefig(out_ucs, dpi=300)
-        plt.close()
-
-        print(f"Saved plots for dataset={ds} -> {out_acc}, {out_ucs}")
+        jobs.append(figure_job(
+            __file__, "plot_param_vs_metric", f"results/figures/{ds}_ucs.png",
+            params=dict(ds=ds, records=subset, metric="ucs", ylabel="UCS (alpha=0.3)",
+                        title="UCS", marker='s', color='red'),
+            savefig={"dpi": 300}))
+    return jobs
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--force", action="store_true",
+                        help="re-render every figure even if its inputs are unchanged")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of render processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    build_figures(figure_jobs(), workers=args.workers, force=args.force)
 
 if __name__ == "__main__":
     main()
@@ -12,82 +12,47 @@ This simulates emergent-like improvements and also includes an
 uncertainty measure that slightly penalizes final scores.
 """
 
+import os
+import sys
+
 import numpy as np
 import matplotlib.pyplot as plt
 
-def logistic_emergence(x, x0, k, floor=0.05, ceil=0.95):
-    """
-    Logistic function to simulate emergent transitions.
-    x: param scale
-    x0: center of transition
-    k: steepness
-    floor, ceil: min/max possible range
-    """
-    # logistic base formula: 1 / (1 + e^{-k(x - x0)})
-    # then scale to [floor, ceil]
-    return floor + (ceil - floor) / (1.0 + np.exp(-k * (x - x0)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from synthetic_data import generator, task_curves
 
-def generate_synthetic_data_scales():
+# Emergent centre x0 (millions of params), steepness k and base uncertainty
+# per task, for illustration
+TASK_PARAMS = {
+    "QA": (500.0, 0.003, 0.4),
+    "RC": (1000.0, 0.002, 0.35),
+    "CI": (800.0, 0.0025, 0.38),
+    "DRS": (1200.0, 0.0018, 0.30),
+    "DS": (2000.0, 0.0015, 0.45),
+}
+DEFAULT_TASK_PARAMS = (1000.0, 0.002, 0.40)
+
+def generate_synthetic_data_scales(resolution=1):
     """
     Returns an array of param scales (in millions),
     e.g. from 82M to 7000M (7B).
-    We'll do ~7 points on a log-ish scale.
+    We'll do ~7 points on a log-ish scale (7 * resolution log-spaced
+    points over the same range for resolution > 1).
     """
-    return np.array([82, 124, 345, 774, 1500, 3500, 7000], dtype=float)
+    scales = np.array([82, 124, 345, 774, 1500, 3500, 7000], dtype=float)
+    if resolution == 1:
+        return scales
+    return np.geomspace(scales[0], scales[-1], len(scales) * resolution)
 
-def generate_accuracy_and_uncertainty(task_name, param_scales):
+def generate_accuracy_and_uncertainty(tasks, param_scales, rng=None):
     """
-    Generate synthetic accuracy and uncertainty for each param scale.
-    We'll define emergent transitions using logistic, with different
-    centers or slopes for each task for variety.
+    Synthetic accuracy and uncertainty, [task, scale] arrays, for all tasks
+    at once: a logistic emergence per task (accuracy from 0.05 to 0.90,
+    uncertainty dropping by 0.1) plus N(0, 0.01) jitter.
     """
-    # Different tasks might have different emergent centers & slopes
-    # for illustration. We'll define some constants:
-    # these could be tuned per task
-    if task_name == "QA":
-        x0, k = 500.0, 0.003
-        base_uncert = 0.4
-    elif task_name == "RC":
-        x0, k = 1000.0, 0.002
-        base_uncert = 0.35
-    elif task_name == "CI":
-        x0, k = 800.0, 0.0025
-        base_uncert = 0.38
-    elif task_name == "DRS":
-        x0, k = 1200.0, 0.0018
-        base_uncert = 0.30
-    elif task_name == "DS":
-        x0, k = 2000.0, 0.0015
-        base_uncert = 0.45
-    else:
-        x0, k = 1000.0, 0.002
-        base_uncert = 0.40
-    
-    # We'll produce an array of accuracies, plus a bit of random noise
-    accuracies = []
-    uncertainties = []
-    
-    for p in param_scales:
-        # logistic for accuracy:
-        acc = logistic_emergence(p, x0, k, floor=0.05, ceil=0.90)
-        # small random jitter:
-        acc += np.random.normal(0.0, 0.01)
-        acc = np.clip(acc, 0.0, 1.0)
-        
-        # some "base" uncertainty that might *decrease* with scale
-        # e.g. base_uncert - logistic
-        # or simpler approach: We define a mild downward slope:
-        # or we can do: unc = 0.4 - 0.1 * logistic
-        # let's keep it simpler:
-        unc = base_uncert - 0.1 * logistic_emergence(p, x0, k, floor=0.0, ceil=1.0)
-        unc += np.random.normal(0.0, 0.01)
-        # clamp to [0.0, 1.0]
-        unc = np.clip(unc, 0.0, 1.0)
-        
-        accuracies.append(acc)
-        uncertainties.append(unc)
-    
-    return np.array(accuracies), np.array(uncertainties)
+    rng = rng if rng is not None else generator("fig2_emergence")
+    x0, k, base_uncert = np.array([TASK_PARAMS.get(t, DEFAULT_TASK_PARAMS) for t in tasks]).T
+    return task_curves(param_scales, x0, k, base_uncert, rng)
 
 def main():
     # The tasks we'll simulate
@@ -98,17 +63,9 @@ def main():
     
     # We'll store results in a dict
     # e.g. results[task] = { "acc": ..., "unc": ..., "ucs": ...}
-    results = {}
-    
-    for t in tasks:
-        acc, unc = generate_accuracy_and_uncertainty(t, param_scales)
-        # compute UCS
-        ucs = acc * (1.0 - alpha * unc)
-        results[t] = {
-            "acc": acc,
-            "unc": unc,
-            "ucs": ucs
-        }
+    acc, unc = generate_accuracy_and_uncertainty(tasks, param_scales)
+    ucs = acc * (1.0 - alpha * unc)  # compute UCS
+    results = {t: {"acc": acc[i], "unc": unc[i], "ucs": ucs[i]} for i, t in enumerate(tasks)}
     
     # Let's plot a multi-line chart of param vs. UCS for each task
     plt.figure(figsize=(7,5))
@@ -1,40 +1,173 @@
 # streamlit_emergence.py
-import streamlit as st
-import json
+#
+#     streamlit run "some figures code/streamlit_emergence.py"
+#
+# Dashboard over real main.py result files (<dataset>_results_<model>.json
+# under the chosen directory).
+#
+# Single dataset: each file is parsed once into a UCSIndex (src/ucs_index.py:
+# sorted entropies of the correct items), cached by path and modification
+# time; slider moves only run binary searches on those indices, so they stay
+# well under 50 ms at any number of items.
+#
+# Compare models: reads the precomputed fraction[model, dataset, alpha, tau]
+# array of src/emergence_surface.py and only slices it.
+import os
+import sys
+import time
+
 import numpy as np
+import pandas as pd
+import streamlit as st
 
-# Suppose you have a single dataset's results in a JSON
-# where each item has "capability" (0 or 1), "entropy", etc.
-# We'll demonstrate how to see fraction emergent vs. tau.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from emergence_surface import build_surface, divergence, fraction, load_surface, nearest, save_surface
+from ucs_index import find_result_files, load_index
 
-def compute_ucs(capabilities, entropies, alpha):
-    return capabilities * (1 - alpha * entropies)
+TAU_GRID = np.linspace(0.0, 1.0, 101)
+HIST_EDGES = np.linspace(0.0, 1.0, 41)
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
 
-def fraction_above_threshold(values, tau):
-    return np.mean(values >= tau)
+@st.cache_data(ttl=60, show_spinner=False)
+def discover(results_dir):
+    return find_result_files(results_dir)
 
-# For demonstration, we'll assume we've loaded a small data array:
-# You can adapt to your real data
-data = [
-  {"capability": 1.0, "entropy": 0.314},
-  {"capability": 0.0, "entropy": 0.200},
-  {"capability": 1.0, "entropy": 0.500},
-  {"capability": 1.0, "entropy": 1.200},
-  {"capability": 0.0, "entropy": 0.050},
-  # ...
-]
+@st.cache_data(show_spinner="Indexing results...", max_entries=64)
+def cached_index(path, mtime, normalize_entropy):
+    # mtime is part of the cache key, so a rewritten file is re-indexed.
+    return load_index(path, normalize_entropy)
 
-capabilities = np.array([d["capability"] for d in data])
-entropies    = np.array([d["entropy"]    for d in data])
+@st.cache_resource(show_spinner="Loading surface...", max_entries=4)
+def cached_surface(path, mtime):
+    return load_surface(path)
 
-st.title("Emergent Capability Dashboard")
+def single_view(results_dir, normalize_entropy):
+    files = discover(results_dir) if os.path.isdir(results_dir) else []
+    if not files:
+        st.info("No result files found. Write some with src/main.py --output <dir>/"
+                "<dataset>_results_<model>.json.")
+        st.stop()
+    with st.sidebar:
+        dataset = st.selectbox("Dataset", sorted({ds for ds, _, _ in files}))
+        available = {model: path for ds, model, path in files if ds == dataset}
+        models = st.multiselect("Models", sorted(available), default=sorted(available)[:6])
+
+    alpha = st.slider("Uncertainty Penalty (alpha)", 0.0, 2.0, 0.3, 0.05)
+    tau = st.slider("Threshold (tau)", 0.0, 1.0, 0.5, 0.01)
+    if not models:
+        st.stop()
+
+    indices = {m: cached_index(available[m], os.path.getmtime(available[m]), normalize_entropy)
+               for m in models}
+
+    start = time.perf_counter()
+    summary = pd.DataFrame([{
+        "model": m,
+        "items": idx.n,
+        "accuracy": idx.accuracy,
+        "mean entropy": idx.mean_entropy,
+        "mean UCS": idx.mean_ucs(alpha),
+        f"UCS >= {tau:.2f}": float(idx.fraction_above(alpha, tau)),
+        **{f"p{int(q * 100)}": v for q, v in zip(QUANTILES, idx.quantiles(alpha, QUANTILES))},
+    } for m, idx in indices.items()]).set_index("model")
+    fraction_curve = pd.DataFrame({m: idx.fraction_above(alpha, TAU_GRID)
+                                   for m, idx in indices.items()},
+                                  index=pd.Index(TAU_GRID, name="tau"))
+    centers = 0.5 * (HIST_EDGES[:-1] + HIST_EDGES[1:])
+    histogram = pd.DataFrame({m: idx.histogram(alpha, HIST_EDGES) / max(idx.n, 1)
+                              for m, idx in indices.items()},
+                             index=pd.Index(np.round(centers, 3), name="UCS"))
+    elapsed_ms = (time.perf_counter() - start) * 1e3
+
+    st.subheader(f"{dataset}: fraction emergent (UCS >= {tau:.2f}) at alpha = {alpha:.2f}")
+    st.dataframe(summary.style.format(precision=3), use_container_width=True)
+
+    st.subheader("Fraction emergent vs. tau")
+    st.line_chart(fraction_curve)
 
-alpha = st.slider("Uncertainty Penalty (alpha)", 0.0, 2.0, 0.3, 0.1)
-tau   = st.slider("Threshold (tau)", 0.0, 2.0, 0.5, 0.1)
+    st.subheader("UCS distribution (share of items per bin; negatives in the first bin)")
+    st.bar_chart(histogram)
 
-ucs_vals = compute_ucs(capabilities, entropies, alpha)
-frac_emergent = fraction_above_threshold(ucs_vals, tau)
+    st.caption(f"Query time {elapsed_ms:.1f} ms for {sum(i.n for i in indices.values())} items "
+               f"across {len(indices)} model(s).")
+
+def compare_view(results_dir, normalize_entropy):
+    with st.sidebar:
+        surface_path = st.text_input("Surface file", os.path.join(results_dir, "emergence_surface.npz"))
+    if not os.path.exists(surface_path):
+        st.info(f"No surface at {surface_path}. Build it offline with\n\n"
+                f"    python src/emergence_surface.py --results_dir {results_dir} "
+                f"--output {surface_path}\n\nor here:")
+        if st.button("Build now"):
+            files = discover(results_dir) if os.path.isdir(results_dir) else []
+            if not files:
+                st.error(f"No result files under {results_dir}.")
+                st.stop()
+            save_surface(build_surface(files, normalize_entropy=normalize_entropy), surface_path)
+            st.experimental_rerun()
+        st.stop()
+
+    surface = cached_surface(surface_path, os.path.getmtime(surface_path))
+    if bool(surface["normalize_entropy"]) != normalize_entropy:
+        st.warning("The surface was built with normalize_entropy="
+                   f"{bool(surface['normalize_entropy'])}; rebuild it to switch.")
+    alphas, taus = surface["alphas"], surface["taus"]
+    with st.sidebar:
+        dataset = st.selectbox("Dataset", list(surface["datasets"]))
+        j = list(surface["datasets"]).index(dataset)
+        available = [str(m) for m, ok in zip(surface["models"], surface["present"][:, j]) if ok]
+        models = st.multiselect("Models", available, default=available)
+
+    alpha = st.slider("Uncertainty Penalty (alpha)", float(alphas[0]), float(alphas[-1]), 0.3,
+                      float(alphas[1] - alphas[0]))
+    tau = st.slider("Threshold (tau)", float(taus[0]), float(taus[-1]), 0.5,
+                    float(taus[1] - taus[0]))
+    if not models:
+        st.stop()
+
+    start = time.perf_counter()
+    rows = [list(surface["models"]).index(m) for m in models]
+    a, t = nearest(alphas, alpha), nearest(taus, tau)
+    vs_tau = pd.DataFrame(fraction(surface, rows, j, a).T, columns=models,
+                          index=pd.Index(taus, name="tau"))
+    vs_alpha = pd.DataFrame(fraction(surface, rows, j, slice(None), t).T, columns=models,
+                            index=pd.Index(alphas, name="alpha"))
+    summary = pd.DataFrame({
+        "items": surface["n_items"][rows, j],
+        "accuracy": surface["accuracy"][rows, j],
+        "mean UCS": surface["mean_ucs"][rows, j, a],
+        f"UCS >= {taus[t]:.3f}": fraction(surface, rows, j, a, t),
+    }, index=pd.Index(models, name="model"))
+    spread = divergence(surface, rows, j)
+    elapsed_ms = (time.perf_counter() - start) * 1e3
+
+    st.subheader(f"{dataset}: {len(models)} models at alpha = {alphas[a]:.3f}, tau = {taus[t]:.3f}")
+    st.dataframe(summary.style.format(precision=3), use_container_width=True)
+    left, right = st.columns(2)
+    with left:
+        st.markdown("Fraction emergent vs. tau")
+        st.line_chart(vs_tau)
+    with right:
+        st.markdown("Fraction emergent vs. alpha")
+        st.line_chart(vs_alpha)
+
+    import plotly.express as px
+
+    st.subheader("Where the models diverge: max - min fraction emergent")
+    fig = px.imshow(spread.T, x=alphas, y=taus, origin="lower", aspect="auto",
+                    labels={"x": "alpha", "y": "tau", "color": "spread"},
+                    color_continuous_scale="Viridis")
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"Sliced in {elapsed_ms:.1f} ms from a {surface['fraction'].shape} array.")
+
+st.title("Emergent Capability Dashboard")
 
-st.write(f"Fraction Emergent (UCS >= {tau:.2f}): {frac_emergent*100:.2f}%")
+with st.sidebar:
+    mode = st.radio("View", ["Single dataset", "Compare models"])
+    results_dir = st.text_input("Results directory", "results")
+    normalize_entropy = st.checkbox("Normalise entropy by log(k)", value=False)
 
-st.bar_chart(ucs_vals)
+if mode == "Single dataset":
+    single_view(results_dir, normalize_entropy)
+else:
+    compare_view(results_dir, normalize_entropy)
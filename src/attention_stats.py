@@ -0,0 +1,218 @@
+# src/attention_stats.py
+
+"""
+Streaming per-head attention statistics from a real model.
+
+Forward hooks on every attention module reduce each batch's attention
+weights to running sums as soon as they are computed, so no full attention
+tensor outlives its layer's forward call. The statistics, per (layer, head),
+averaged over all valid query positions of all items:
+
+    entropy        attention entropy of a query row (nats)
+    norm_entropy   entropy / log(number of visible keys), rows with >= 2 keys
+    diag_mass      weight on the query's own position
+    local_mass     weight on the `window` most recent positions (incl. itself)
+    pattern        mean attention map resized to a grid x grid image: queries
+                   are averaged within each bin and key weight is summed per
+                   bin, so each resized row still sums to 1
+
+Attention weights are only materialised by the eager attention
+implementation, which is selected before the run.
+
+Usage:
+    python src/attention_stats.py --model_name gpt2 --data_path data/mmlu_10k.json \\
+        --output results/attention_stats/gpt2.npz
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+from instrumentation import count, stage
+
+ATTENTION_MODULE_NAMES = ("attn", "self_attn", "attention")
+
+def use_eager_attention(model):
+    if hasattr(model, "set_attn_implementation"):
+        model.set_attn_implementation("eager")
+    else:
+        model.config._attn_implementation = "eager"
+
+def attention_modules(model):
+    """
+    Attention submodules in layer order (GPT-2: transformer.h.<i>.attn).
+    """
+    return [module for name, module in model.named_modules()
+            if name.rsplit(".", 1)[-1] in ATTENTION_MODULE_NAMES]
+
+def _attention_weights(output):
+    """
+    The [batch, heads, query, key] tensor in an attention module's output.
+    """
+    for value in (output if isinstance(output, tuple) else (output,)):
+        if getattr(value, "ndim", 0) == 4 and value.shape[-1] == value.shape[-2]:
+            return value
+    return None
+
+class AttentionStats:
+    """
+    Running per-(layer, head) sums, updated from forward hooks.
+    """
+
+    def __init__(self, n_layers, n_heads, grid=16, window=3):
+        self.grid = grid
+        self.window = window
+        self.sums = {name: np.zeros((n_layers, n_heads)) for name in
+                     ("entropy", "norm_entropy", "diag_mass", "local_mass")}
+        self.pattern = np.zeros((n_layers, n_heads, grid, grid))
+        self.n_queries = 0
+        self.n_norm_queries = 0
+        self.n_sequences = 0
+        self._lengths = None
+
+    def set_batch(self, lengths):
+        self._lengths = lengths
+
+    def _bins(self, width, device):
+        """
+        Per-sequence query-averaging and key-summing bin matrices [B, grid, width].
+        """
+        import torch
+
+        lengths = torch.as_tensor(self._lengths, device=device)
+        pos = torch.arange(width, device=device)
+        valid = pos[None, :] < lengths[:, None]
+        bins = (pos[None, :] * self.grid) // lengths[:, None].clamp(min=1)
+        onehot = (bins[:, None, :] == torch.arange(self.grid, device=device)[None, :, None])
+        key_bins = (onehot & valid[:, None, :]).float()
+        query_bins = key_bins / key_bins.sum(-1, keepdim=True).clamp(min=1.0)
+        return valid, query_bins, key_bins
+
+    def update(self, layer, attn):
+        import torch
+
+        attn = attn.float()
+        _, _, width, _ = attn.shape
+        valid, query_bins, key_bins = self._bins(width, attn.device)
+        q_valid = valid[:, None, :].float()  # [B, 1, T]
+
+        entropy = -(attn * torch.log(attn.clamp(min=1e-12))).sum(-1)  # [B, H, T]
+        n_keys = torch.arange(1, width + 1, device=attn.device, dtype=attn.dtype)
+        norm_valid = q_valid * (n_keys > 1)
+        norm_entropy = entropy / torch.log(n_keys).clamp(min=1e-12)
+        diag = attn.diagonal(dim1=-2, dim2=-1)
+        pos = torch.arange(width, device=attn.device)
+        offset = pos[:, None] - pos[None, :]
+        band = ((offset >= 0) & (offset < self.window)).to(attn.dtype)
+        local = (attn * band).sum(-1)
+
+        for name, value, weight in (("entropy", entropy, q_valid),
+                                    ("norm_entropy", norm_entropy, norm_valid),
+                                    ("diag_mass", diag, q_valid),
+                                    ("local_mass", local, q_valid)):
+            self.sums[name][layer] += (value * weight).sum(dim=(0, 2)).cpu().numpy()
+        pattern = query_bins[:, None] @ attn @ key_bins[:, None].transpose(-1, -2)
+        self.pattern[layer] += pattern.sum(0).cpu().numpy()
+        if layer == 0:
+            self.n_queries += int(valid.sum())
+            self.n_norm_queries += int(norm_valid.sum())
+            self.n_sequences += len(self._lengths)
+
+    def result(self):
+        out = {name: total / max(self.n_norm_queries if name == "norm_entropy"
+                                 else self.n_queries, 1)
+               for name, total in self.sums.items()}
+        out["pattern"] = self.pattern / max(self.n_sequences, 1)
+        out["n_queries"] = np.array(self.n_queries)
+        out["n_sequences"] = np.array(self.n_sequences)
+        out["grid"] = np.array(self.grid)
+        out["window"] = np.array(self.window)
+        return out
+
+def collect_attention_stats(texts, tokenizer, model, device="cuda", batch_size=16, max_length=256,
+                            grid=16, window=3):
+    """
+    Run `texts` through the model and return AttentionStats.result().
+    """
+    import torch
+
+    from multiple_choice import length_sorted_chunks, pad_sequences
+
+    use_eager_attention(model)
+    modules = attention_modules(model)
+    stats = AttentionStats(len(modules), model.config.num_attention_heads, grid, window)
+
+    def make_hook(layer):
+        def hook(module, inputs, output):
+            attn = _attention_weights(output)
+            if attn is None:
+                raise RuntimeError("attention module returned no weights; is eager attention on?")
+            with stage("attention_stats"):
+                stats.update(layer, attn)
+        return hook
+
+    handles = [m.register_forward_hook(make_hook(i)) for i, m in enumerate(modules)]
+    try:
+        with stage("tokenize"):
+            encoded = [ids[:max_length] for ids in tokenizer(texts)["input_ids"]]
+        for chunk in length_sorted_chunks(encoded, batch_size):
+            input_ids, attention_mask, lengths = pad_sequences([encoded[i] for i in chunk], device)
+            stats.set_batch(lengths)
+            with stage("forward"), torch.no_grad():
+                model.base_model(input_ids=input_ids, attention_mask=attention_mask,
+                                 output_attentions=True)
+            count("sequences", len(chunk))
+    finally:
+        for handle in handles:
+            handle.remove()
+    return stats.result()
+
+def load_stats(path):
+    with np.load(path) as npz:
+        return {key: npz[key] for key in npz.files}
+
+def mean_pattern(stats, layers=None):
+    """
+    Grid attention pattern averaged over heads and the given layers (all by default).
+    """
+    pattern = stats["pattern"] if layers is None else stats["pattern"][layers]
+    return pattern.mean(axis=(0, 1))
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-head attention statistics over a dataset.")
+    parser.add_argument("--model_name", default="gpt2")
+    parser.add_argument("--data_path", default="data/mmlu_10k.json")
+    parser.add_argument("--dataset", default=None)
+    parser.add_argument("--device", default="cuda")
+    parser.add_argument("--batch_size", type=int, default=16)
+    parser.add_argument("--max_length", type=int, default=256)
+    parser.add_argument("--grid", type=int, default=16)
+    parser.add_argument("--window", type=int, default=3)
+    parser.add_argument("--output", default=None,
+                        help="default: results/attention_stats/<model>.npz")
+    args = parser.parse_args()
+
+    from dataset_registry import load_items
+    from model_utils import load_model
+
+    tokenizer, model = load_model(model_name=args.model_name, device=args.device)
+    items = load_items(args.data_path, args.dataset)
+    stats = collect_attention_stats([f"{it['prompt']}\nAnswer:" for it in items], tokenizer, model,
+                                    args.device, args.batch_size, args.max_length, args.grid,
+                                    args.window)
+    output = args.output or os.path.join(
+        "results", "attention_stats", args.model_name.strip("/").replace("/", "--") + ".npz")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    np.savez(output, model=np.array(args.model_name), **stats)
+
+    print(f"{int(stats['n_sequences'])} sequences, {int(stats['n_queries'])} query positions")
+    print(f"{'layer':>5} {'entropy':>8} {'norm':>6} {'diag':>6} {'local':>6}")
+    for layer in range(stats["entropy"].shape[0]):
+        print(f"{layer:>5} {stats['entropy'][layer].mean():>8.3f} "
+              f"{stats['norm_entropy'][layer].mean():>6.3f} {stats['diag_mass'][layer].mean():>6.3f} "
+              f"{stats['local_mass'][layer].mean():>6.3f}")
+    print(f"Saved {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# src/benchmark_import_time.py
+
+"""
+Import-time guard for the src/ modules.
+
+Each module is imported in a fresh interpreter and must not pull in any of the
+heavy libraries (torch, transformers, matplotlib, scipy) at import time. The
+result-only command `main.py --summarize` is also timed end to end against a
+small synthetic results file and must finish within the budget.
+
+Usage:
+    python src/benchmark_import_time.py [--repeat 5] [--budget_ms 200]
+
+Exits non-zero when a module imports a heavy dependency or a timing exceeds
+the budget, so it can run in CI.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+HEAVY_MODULES = ["torch", "transformers", "matplotlib", "scipy"]
+
+# Modules whose import must stay light.
+LIGHT_MODULES = [
+    "main",
+    "capability_utils",
+    "model_utils",
+    "multiple_choice",
+    "figure_cache",
+    "render_figures",
+    "instrumentation",
+    "dataset_registry",
+    "result_cache",
+    "dedup",
+    "sequential_eval",
+    "subsample_planner",
+    "ucs_index",
+    "emergence_surface",
+    "phase_surface",
+]
+
+def heavy_imports(module):
+    """
+    Return the heavy modules that end up in sys.modules after `import module`.
+    """
+    code = (
+        f"import sys, {module}; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=SRC_DIR,
+                         capture_output=True, text=True, check=True).stdout.strip()
+    return [m for m in out.split(",") if m]
+
+def wall_time_ms(cmd, repeat):
+    """
+    Median wall time of running `cmd` in a fresh interpreter.
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(cmd, cwd=SRC_DIR, capture_output=True, check=True)
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return statistics.median(samples)
+
+def write_sample_results(path, n_items=1000):
+    results = [
+        {"id": str(i), "correct_idx": i % 4, "probs": [0.25] * 4,
+         "capability": float(i % 3 == 0), "entropy": 1.386}
+        for i in range(n_items)
+    ]
+    with open(path, "w") as f:
+        json.dump(results, f)
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time benchmark for src/.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget_ms", type=float, default=200.0,
+                        help="maximum median wall time for result-only commands")
+    args = parser.parse_args()
+
+    failures = []
+
+    print(f"{'module':<20} {'import ms':>10}  heavy imports")
+    for module in LIGHT_MODULES:
+        heavy = heavy_imports(module)
+        ms = wall_time_ms([sys.executable, "-c", f"import {module}"], args.repeat)
+        print(f"{module:<20} {ms:>10.1f}  {', '.join(heavy) or '-'}")
+        if heavy:
+            failures.append(f"{module} imports {', '.join(heavy)} at module load")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results_path = os.path.join(tmp, "results.json")
+        write_sample_results(results_path)
+        cmd = [sys.executable, "main.py", "--summarize", results_path]
+        ms = wall_time_ms(cmd, args.repeat)
+        print(f"\nmain.py --summarize: {ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+        if ms > args.budget_ms:
+            failures.append(f"main.py --summarize took {ms:.1f} ms > {args.budget_ms:.0f} ms")
+
+    if failures:
+        print("\nFAILED:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("\nOK")
+
+if __name__ == "__main__":
+    main()
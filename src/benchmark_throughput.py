@@ -0,0 +1,239 @@
+# src/benchmark_throughput.py
+
+"""
+End-to-end throughput benchmark for the scoring pipeline.
+
+Builds a tiny randomly initialised GPT-2 and a word-level tokenizer locally
+(nothing is downloaded), generates synthetic multiple-choice items with a
+controlled context length and choice count, and times:
+
+  * get_option_probabilities, item by item  ("option_probabilities")
+  * the main.py evaluation loop incl. JSON serialisation  ("main_loop")
+
+Reports items/s, tokens/s, p50/p99 per-item latency, peak RSS and model load
+time, and writes them as JSON so runs can be compared across commits.
+
+Usage:
+    python src/benchmark_throughput.py --n_items 200 --context_len 128 --n_choices 4
+    python src/benchmark_throughput.py --compare results/benchmarks/throughput_<old>.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+SPECIAL_WORDS = ["[UNK]", "[PAD]", "Context", "Question", "Answer", ":"]
+
+def build_tokenizer(vocab_size=1000):
+    """
+    Word-level tokenizer over synthetic words "w0".."wN" plus the words used
+    by the prompt template, built in memory.
+    """
+    from tokenizers import Tokenizer, models, pre_tokenizers
+    from transformers import PreTrainedTokenizerFast
+
+    words = SPECIAL_WORDS + [f"w{i}" for i in range(vocab_size - len(SPECIAL_WORDS))]
+    vocab = {w: i for i, w in enumerate(words)}
+    tok = Tokenizer(models.WordLevel(vocab=vocab, unk_token="[UNK]"))
+    tok.pre_tokenizer = pre_tokenizers.Whitespace()
+    return PreTrainedTokenizerFast(tokenizer_object=tok, unk_token="[UNK]", pad_token="[PAD]")
+
+def build_tiny_model(vocab_size=1000, n_layer=2, n_embd=64, n_head=2, n_positions=1024,
+                     device="cpu", seed=0):
+    """
+    Randomly initialised GPT-2 from a local config. Returns (model, load_seconds).
+    """
+    import torch
+    from transformers import GPT2Config, GPT2LMHeadModel
+
+    torch.manual_seed(seed)
+    start = time.perf_counter()
+    config = GPT2Config(vocab_size=vocab_size, n_layer=n_layer, n_embd=n_embd,
+                        n_head=n_head, n_positions=n_positions,
+                        bos_token_id=SPECIAL_WORDS.index("[PAD]"),
+                        eos_token_id=SPECIAL_WORDS.index("[PAD]"))
+    model = GPT2LMHeadModel(config)
+    model.to(device)
+    model.eval()
+    return model, time.perf_counter() - start
+
+def synthetic_items(n_items, context_len, n_choices, choice_len=4, vocab_size=1000, seed=0):
+    """
+    Multiple-choice items in the parsed "mc_qa" structure used by main.py.
+    `context_len` is the number of words in the context (one token each).
+    """
+    rng = np.random.default_rng(seed)
+    n_words = vocab_size - len(SPECIAL_WORDS)
+
+    def words(n):
+        return " ".join(f"w{i}" for i in rng.integers(0, n_words, n))
+
+    items = []
+    for i in range(n_items):
+        items.append({
+            "id": str(i),
+            "prompt": f"Context: {words(context_len)}\nQuestion: {words(8)}",
+            "choices": [words(choice_len) for _ in range(n_choices)],
+            "correct_idx": int(rng.integers(0, n_choices)),
+        })
+    return items
+
+def count_tokens(items, tokenizer):
+    """
+    Tokens fed to the model per item (one sequence per choice).
+    """
+    return [
+        sum(len(tokenizer(f"{it['prompt']}\nAnswer: {c}")["input_ids"]) for c in it["choices"])
+        for it in items
+    ]
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+def _sync(device):
+    if str(device).startswith("cuda"):
+        import torch
+        torch.cuda.synchronize()
+
+def latency_stats(latencies, tokens, wall):
+    lat_ms = np.asarray(latencies) * 1000.0
+    return {
+        "items": len(latencies),
+        "seconds": wall,
+        "items_per_s": len(latencies) / wall if wall else 0.0,
+        "tokens_per_s": float(np.sum(tokens)) / wall if wall else 0.0,
+        "latency_ms_p50": float(np.percentile(lat_ms, 50)),
+        "latency_ms_p99": float(np.percentile(lat_ms, 99)),
+        "latency_ms_mean": float(lat_ms.mean()),
+    }
+
+def bench_option_probabilities(items, tokens, tokenizer, model, device):
+    from multiple_choice import get_option_probabilities
+
+    latencies = []
+    start = time.perf_counter()
+    for it in items:
+        t0 = time.perf_counter()
+        get_option_probabilities(it["prompt"], it["choices"], tokenizer, model, device=device)
+        _sync(device)
+        latencies.append(time.perf_counter() - t0)
+    return latency_stats(latencies, tokens, time.perf_counter() - start)
+
+def bench_main_loop(items, tokens, tokenizer, model, device):
+    """
+    Same work as main.py: evaluate_items one item at a time, then serialise.
+    Per-item latency is measured by feeding evaluate_items single items.
+    """
+    from main import evaluate_items
+
+    latencies = []
+    results = []
+    start = time.perf_counter()
+    for it in items:
+        t0 = time.perf_counter()
+        results.extend(evaluate_items([it], tokenizer, model, device=device))
+        _sync(device)
+        latencies.append(time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    json.dumps(results, indent=2)
+    serialize_s = time.perf_counter() - t0
+    stats = latency_stats(latencies, tokens, time.perf_counter() - start)
+    stats["serialize_seconds"] = serialize_s
+    return stats
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def compare(current, baseline_path):
+    """
+    Print relative change of the headline numbers against an earlier run.
+    """
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)
+    print(f"\nvs. {baseline_path} (commit {baseline.get('commit')}):")
+    for bench, stats in current["benchmarks"].items():
+        old = baseline.get("benchmarks", {}).get(bench)
+        if not old:
+            continue
+        for key in ["items_per_s", "tokens_per_s", "latency_ms_p50", "latency_ms_p99"]:
+            change = (stats[key] - old[key]) / old[key] * 100.0 if old[key] else float("nan")
+            print(f"  {bench:<22} {key:<16} {old[key]:>10.2f} -> {stats[key]:>10.2f} ({change:+.1f}%)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Scoring pipeline throughput benchmark.")
+    parser.add_argument("--n_items", type=int, default=200)
+    parser.add_argument("--context_len", type=int, default=128)
+    parser.add_argument("--n_choices", type=int, default=4)
+    parser.add_argument("--choice_len", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--n_layer", type=int, default=2)
+    parser.add_argument("--n_embd", type=int, default=64)
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None,
+                        help="JSON output (default: results/benchmarks/throughput_<commit>.json)")
+    parser.add_argument("--compare", default=None, help="earlier benchmark JSON to diff against")
+    args = parser.parse_args()
+
+    import torch
+
+    commit = git_commit()
+    tokenizer = build_tokenizer()
+    model, load_s = build_tiny_model(n_layer=args.n_layer, n_embd=args.n_embd,
+                                     device=args.device, seed=args.seed)
+    items = synthetic_items(args.n_items + args.warmup, args.context_len, args.n_choices,
+                            args.choice_len, seed=args.seed)
+    warmup, items = items[:args.warmup], items[args.warmup:]
+    tokens = count_tokens(items, tokenizer)
+
+    bench_option_probabilities(warmup, count_tokens(warmup, tokenizer), tokenizer, model, args.device)
+    report = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "device": args.device,
+            "threads": torch.get_num_threads(),
+        },
+        "config": vars(args),
+        "model_load_seconds": load_s,
+        "mean_tokens_per_item": float(np.mean(tokens)),
+        "benchmarks": {
+            "option_probabilities": bench_option_probabilities(items, tokens, tokenizer, model, args.device),
+            "main_loop": bench_main_loop(items, tokens, tokenizer, model, args.device),
+        },
+    }
+    report["peak_rss_mb"] = peak_rss_mb()
+
+    print(f"model load: {load_s:.3f}s   peak RSS: {report['peak_rss_mb']:.0f} MB   "
+          f"tokens/item: {report['mean_tokens_per_item']:.0f}")
+    for bench, stats in report["benchmarks"].items():
+        print(f"{bench:<22} {stats['items_per_s']:>8.1f} items/s {stats['tokens_per_s']:>10.0f} tok/s "
+              f"p50 {stats['latency_ms_p50']:.2f} ms  p99 {stats['latency_ms_p99']:.2f} ms")
+
+    out = args.output or os.path.join("results", "benchmarks", f"throughput_{commit}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {out}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+if __name__ == "__main__":
+    main()
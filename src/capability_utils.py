@@ -10,12 +10,85 @@ def compute_capability(prob_array, correct_idx):
     top_choice = np.argmax(prob_array)
     return 1.0 if top_choice == correct_idx else 0.0
 
-def compute_entropy(prob_array):
+def compute_entropy(prob_array, normalize=False):
     """
     Shannon entropy of the probability distribution.
+    With normalize=True it is divided by log(k), the maximum for k choices,
+    so items with different numbers of choices are on the same [0, 1] scale.
     """
     # Ensure no zero-prob
     prob_array = np.array(prob_array) + 1e-12
     prob_array = prob_array / np.sum(prob_array)
     entropy = -np.sum(prob_array * np.log(prob_array))
+    if normalize:
+        k = len(prob_array)
+        entropy = entropy / np.log(k) if k > 1 else 0.0
     return entropy
+
+def compute_ucs(capability, entropy, alpha=0.3):
+    """
+    Uncertainty-aware capability score:
+    UCS = capability * (1 - alpha * entropy).
+    Works on scalars or per-item arrays.
+    """
+    return capability * (1.0 - alpha * entropy)
+
+# Ragged batches: items with different numbers of choices are stored as a
+# zero-padded [n_items, max_choices] array plus a boolean mask of real
+# choices. Padded entries never win the argmax and add nothing to entropy.
+
+def pad_ragged(values, n_choices):
+    """
+    Flat per-choice values (item after item) -> (padded [n, max_k], mask).
+    """
+    values = np.asarray(values)
+    n_choices = np.asarray(n_choices, dtype=np.int64)
+    mask = np.arange(n_choices.max(initial=0))[None, :] < n_choices[:, None]
+    padded = np.zeros(mask.shape, dtype=values.dtype)
+    padded[mask] = values  # row-major fill matches the flat item order
+    return padded, mask
+
+def pad_prob_list(prob_list):
+    """
+    List of per-item probability arrays -> (padded [n, max_k], mask).
+    """
+    n_choices = [len(p) for p in prob_list]
+    flat = np.concatenate([np.asarray(p, dtype=np.float64) for p in prob_list]) if prob_list else []
+    return pad_ragged(flat, n_choices)
+
+def batch_capability(probs, mask, correct_idx):
+    """
+    Vectorised compute_capability over a padded batch.
+    """
+    top_choice = np.argmax(np.where(mask, probs, -np.inf), axis=1)
+    return (top_choice == np.asarray(correct_idx)).astype(np.float64)
+
+def batch_entropy(probs, mask, normalize=False):
+    """
+    Vectorised compute_entropy over a padded batch (same 1e-12 smoothing,
+    applied to real choices only). normalize=True divides by log(k_i).
+    """
+    p = np.where(mask, probs + 1e-12, 0.0)
+    p = p / p.sum(axis=1, keepdims=True)
+    logp = np.log(np.where(mask, p, 1.0))
+    entropy = -(p * logp).sum(axis=1)
+    if normalize:
+        log_k = np.log(mask.sum(axis=1))
+        entropy = np.divide(entropy, log_k, out=np.zeros_like(entropy), where=log_k > 0)
+    return entropy
+
+def uncertainty_decomposition(prob_samples, mask, normalize=False):
+    """
+    Split predictive uncertainty over S stochastic predictions (MC-dropout
+    passes or ensemble members), given as a padded [S, n_items, max_k] array:
+
+        total     = H[mean_s p_s]           (predictive entropy)
+        expected  = mean_s H[p_s]           (aleatoric part)
+        mutual_info = total - expected      (epistemic part, >= 0)
+
+    Returns (total, expected, mutual_info), each of shape [n_items].
+    """
+    prob_samples = np.asarray(prob_samples)
+    total = batch_entropy(prob_samples.mean(axis=0), mask, normalize)
+    expected = np.mean([batch_entropy(p, mask, normalize) for p in prob_samples], axis=0)
+    return total, expected, np.maximum(total - expected, 0.0)
@@ -0,0 +1,309 @@
+# src/dataset_registry.py
+
+"""
+Parsers for the evaluation datasets, plus a compiled array form for scoring.
+
+Each parser turns one raw JSON item into the common structure used by
+main.py: {"prompt", "choices", "correct_idx", "id"}. Parsers are registered
+by dataset name; the name is inferred from the file name when not given
+(data/hellaswag_10k.json -> "hellaswag_10k").
+
+Each parser reads its source's own fields (HellaSwag ctx/endings/label,
+CosmosQA answer0..3/label, MMLU question/choices/answer/subject, HaluEval
+right_/hallucinated_ response or summary), and also accepts files already
+converted to the normalised context/question/choices/answer/id layout.
+Choices may be a letter-keyed dict ({"A": ..., "B": ...}) or a list, and the
+answer a letter or an integer index, so the number of choices can vary
+between datasets and items.
+
+`compile_dataset` tokenises a whole dataset once into a compact .npz:
+
+    tokens         int32 [n_tokens]   all "{prompt}\\nAnswer: {choice}" sequences
+    seq_offsets    int64 [n_seqs + 1] sequence s is tokens[seq_offsets[s]:seq_offsets[s+1]]
+    choice_offsets int64 [n_items + 1] item i owns sequences choice_offsets[i]:choice_offsets[i+1]
+    n_choices      int32 [n_items]
+    correct_idx    int32 [n_items]
+    item_ids       str   [n_items]
+
+and `score_compiled` scores it straight from those arrays.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import string
+import zlib
+
+import numpy as np
+
+PARSERS = {}
+
+def register_parser(*names):
+    """
+    Decorator registering a raw-item parser under one or more dataset names.
+    """
+    def wrap(fn):
+        for name in names:
+            PARSERS[name] = fn
+        return fn
+    return wrap
+
+def _choice_list(choices):
+    if isinstance(choices, dict):
+        # Letter keys in alphabetical order: A, B, C, ...
+        return [choices[key] for key in sorted(choices)]
+    return list(choices)
+
+def _answer_index(answer, choices):
+    if isinstance(answer, str) and not answer.isdigit():
+        if isinstance(choices, dict):
+            return sorted(choices).index(answer)
+        return string.ascii_uppercase.index(answer.strip().upper())
+    return int(answer)
+
+def _parsed(item, prompt, choices_key="choices", answer_key="answer"):
+    raw = item[choices_key]
+    return {
+        "prompt": prompt,
+        "choices": _choice_list(raw),
+        "correct_idx": _answer_index(item[answer_key], raw),
+        "id": item.get("id"),
+    }
+
+def _normalised(item):
+    # Files already converted to the common {"choices", "answer"} layout
+    return "choices" in item and "answer" in item
+
+def _pair(item, prompt, right, hallucinated):
+    """
+    Two-choice item from a faithful / hallucinated pair. The position of the
+    faithful answer is fixed per item (crc32 parity of its id, or of the
+    faithful text when there is none), so it is not always choice A.
+    """
+    item_id = item.get("id")
+    key = str(item_id) if item_id is not None else right
+    swap = zlib.crc32(key.encode("utf-8")) % 2 == 1
+    return {
+        "prompt": prompt,
+        "choices": [hallucinated, right] if swap else [right, hallucinated],
+        "correct_idx": 1 if swap else 0,
+        "id": item_id,
+    }
+
+@register_parser("cosmosqa", "cosmosqa_10k")
+def parse_cosmosqa(item):
+    """
+    CosmosQA: context + question with answer0..answer3 and an integer label,
+    or the normalised letter-keyed layout; the same prompt as
+    main.parse_cosmosqa_item.
+    """
+    prompt = f"Context: {item['context']}\nQuestion: {item['question']}"
+    if _normalised(item):
+        return _parsed(item, prompt)
+    choices = [item[f"answer{k}"] for k in range(4) if f"answer{k}" in item]
+    return {"prompt": prompt, "choices": choices, "correct_idx": int(item["label"]),
+            "id": item.get("id")}
+
+@register_parser("hellaswag", "hellaswag_10k")
+def parse_hellaswag(item):
+    """
+    HellaSwag: a context (`ctx`, or `ctx_a` + `ctx_b`) to be completed by one
+    of the `endings`, answer in `label`; `ind` is the item id.
+    """
+    if _normalised(item):
+        return _parsed(item, f"Context: {item['context']}\nQuestion: {item['question']}")
+    context = item.get("ctx") or f"{item['ctx_a']} {item.get('ctx_b', '')}".strip()
+    if item.get("activity_label"):
+        context = f"{item['activity_label']}: {context}"
+    return {
+        "prompt": f"Context: {context}\nQuestion: Which ending is the most plausible?",
+        "choices": list(item["endings"]),
+        "correct_idx": int(item["label"]),
+        "id": item.get("id", item.get("ind")),
+    }
+
+@register_parser("mmlu", "mmlu_10k")
+def parse_mmlu(item):
+    """
+    MMLU: question with a list of (usually four) choices and an integer or
+    letter answer; the subject, or a context if present, is prepended.
+    """
+    prompt = f"Question: {item['question']}"
+    if item.get("context"):
+        prompt = f"Context: {item['context']}\n{prompt}"
+    elif item.get("subject"):
+        prompt = f"Subject: {item['subject'].replace('_', ' ')}\n{prompt}"
+    return _parsed(item, prompt)
+
+@register_parser("halu_dialogue")
+def parse_halu_dialogue(item):
+    """
+    HaluEval dialogue: knowledge + dialogue_history, choosing between the
+    right_response and the hallucinated_response.
+    """
+    if _normalised(item):
+        return _parsed(item, f"Context: {item['context']}\nQuestion: {item['question']}")
+    prompt = (f"Knowledge: {item['knowledge']}\nDialogue: {item['dialogue_history']}\n"
+              f"Question: Which response is faithful to the knowledge?")
+    return _pair(item, prompt, item["right_response"], item["hallucinated_response"])
+
+@register_parser("halu_summarization")
+def parse_summarization(item):
+    """
+    HaluEval summarization: a document, choosing between the right_summary
+    and the hallucinated_summary.
+    """
+    document = item.get("document", item.get("context", ""))
+    if _normalised(item):
+        return _parsed(item, f"Document: {document}\nQuestion: {item['question']}")
+    prompt = f"Document: {document}\nQuestion: Which summary is faithful to the document?"
+    return _pair(item, prompt, item["right_summary"], item["hallucinated_summary"])
+
+def infer_dataset(data_path):
+    """
+    Registered dataset name for a data file, falling back to "cosmosqa".
+    """
+    stem = os.path.splitext(os.path.basename(data_path))[0]
+    if stem in PARSERS:
+        return stem
+    for name in sorted(PARSERS, key=len, reverse=True):
+        if stem.startswith(name):
+            return name
+    return "cosmosqa"
+
+def get_parser(dataset):
+    try:
+        return PARSERS[dataset]
+    except KeyError:
+        raise ValueError(f"unknown dataset {dataset!r}; registered: {', '.join(sorted(PARSERS))}")
+
+def parse_items(raw_items, dataset):
+    """
+    Parsed items; those without an id in the source get their position.
+    """
+    parser = get_parser(dataset)
+    items = [parser(item) for item in raw_items]
+    for i, item in enumerate(items):
+        if item["id"] is None:
+            item["id"] = i
+    return items
+
+def load_items(data_path, dataset=None):
+    with open(data_path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    return parse_items(raw, dataset or infer_dataset(data_path))
+
+def _file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _parser_digest(dataset):
+    """
+    Hash of the source defining the dataset's parser and the compiled layout
+    (this module, plus the parser's own module if registered elsewhere).
+    """
+    h = hashlib.sha256()
+    for path in sorted({os.path.abspath(__file__), inspect.getsourcefile(get_parser(dataset))}):
+        h.update(_file_digest(path).encode())
+    return h.hexdigest()
+
+def _tokenizer_digest(tokenizer):
+    """
+    Hash of the tokenizer's class, name_or_path and full vocabulary, so a
+    different revision under the same name is told apart.
+    """
+    h = hashlib.sha256(type(tokenizer).__name__.encode())
+    h.update(str(getattr(tokenizer, "name_or_path", "")).encode())
+    h.update(json.dumps(sorted(tokenizer.get_vocab().items())).encode())
+    return h.hexdigest()
+
+def _ragged_take(offsets, rows):
+    """
+    (flat element indices, new offsets) selecting segments `rows` of a
+    ragged array described by `offsets`.
+    """
+    lengths = offsets[rows + 1] - offsets[rows]
+    new_offsets = np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)])
+    flat = np.repeat(offsets[rows] - new_offsets[:-1], lengths) + np.arange(new_offsets[-1])
+    return flat, new_offsets
+
+def select_items(compiled, item_ids):
+    """
+    Compiled arrays restricted to the items whose id is in `item_ids`,
+    keeping their order in the dataset.
+    """
+    rows = np.flatnonzero(np.isin(compiled["item_ids"], np.array(sorted(map(str, item_ids)))))
+    seqs, choice_offsets = _ragged_take(compiled["choice_offsets"], rows)
+    flat, seq_offsets = _ragged_take(compiled["seq_offsets"], seqs)
+    selected = dict(compiled)
+    selected.update(tokens=compiled["tokens"][flat], seq_offsets=seq_offsets,
+                    choice_offsets=choice_offsets, n_choices=compiled["n_choices"][rows],
+                    correct_idx=compiled["correct_idx"][rows], item_ids=compiled["item_ids"][rows])
+    return selected
+
+def compile_items(items, tokenizer):
+    """
+    Array form of parsed items (see module docstring).
+    """
+    texts = [f"{item['prompt']}\nAnswer: {choice}" for item in items for choice in item["choices"]]
+    encoded = tokenizer(texts)["input_ids"]
+    lengths = np.fromiter((len(ids) for ids in encoded), dtype=np.int64, count=len(encoded))
+    n_choices = np.array([len(item["choices"]) for item in items], dtype=np.int32)
+    return {
+        "tokens": np.fromiter((t for ids in encoded for t in ids), dtype=np.int32,
+                              count=int(lengths.sum())),
+        "seq_offsets": np.concatenate([[0], np.cumsum(lengths)]),
+        "choice_offsets": np.concatenate([[0], np.cumsum(n_choices, dtype=np.int64)]),
+        "n_choices": n_choices,
+        "correct_idx": np.array([item["correct_idx"] for item in items], dtype=np.int32),
+        "item_ids": np.array([str(item["id"]) for item in items]),
+    }
+
+def compiled_path(data_path, tokenizer_name, cache_dir=None):
+    cache_dir = cache_dir or os.path.join(os.path.dirname(data_path) or ".", "compiled")
+    stem = os.path.splitext(os.path.basename(data_path))[0]
+    return os.path.join(cache_dir, f"{stem}.{tokenizer_name.strip('/').replace('/', '--')}.npz")
+
+def load_or_compile(data_path, tokenizer, tokenizer_name, dataset=None, cache_dir=None):
+    """
+    Compiled arrays for a data file, rebuilt when the source file, dataset
+    parser or tokenizer changes.
+    """
+    dataset = dataset or infer_dataset(data_path)
+    path = compiled_path(data_path, tokenizer_name, cache_dir)
+    key = {
+        "source_sha256": _file_digest(data_path),
+        "dataset": dataset,
+        "parser_sha256": _parser_digest(dataset),
+        "tokenizer_sha256": _tokenizer_digest(tokenizer),
+    }
+    if os.path.exists(path):
+        with np.load(path) as npz:
+            if all(name in npz.files and str(npz[name]) == value for name, value in key.items()):
+                return {name: npz[name] for name in npz.files}
+    compiled = compile_items(load_items(data_path, dataset), tokenizer)
+    compiled.update({name: np.array(value) for name, value in key.items()})
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    np.savez(path, **compiled)
+    return compiled
+
+def score_compiled(compiled, model, device="cuda", max_sequences=64):
+    """
+    Normalised option probabilities for every item, as one flat float array
+    aligned with the sequences (item i: probs[choice_offsets[i]:choice_offsets[i+1]]).
+    """
+    from multiple_choice import score_encoded
+
+    tokens, offsets = compiled["tokens"], compiled["seq_offsets"]
+    sequences = [tokens[offsets[s]:offsets[s + 1]] for s in range(len(offsets) - 1)]
+    scores = score_encoded(sequences, model, device=device, max_sequences=max_sequences)
+
+    # Per-item max-shifted exp-normalisation over the ragged choice segments.
+    starts = compiled["choice_offsets"][:-1]
+    counts = compiled["n_choices"]
+    shifted = np.exp(scores - np.repeat(np.maximum.reduceat(scores, starts), counts))
+    return shifted / np.repeat(np.add.reduceat(shifted, starts), counts)
@@ -0,0 +1,186 @@
+# src/dedup.py
+
+"""
+Deduplicate scoring work before it reaches the model.
+
+Every item expands into (prompt, choice) units, each scored as the sequence
+"{prompt}\\nAnswer: {choice}". Identical units (exact-duplicate items,
+repeated options) are scored once and fanned back out to every item that
+uses them.
+
+With `share_prefix=True` the units are further grouped by prompt: the shared
+"{prompt}\\nAnswer:" prefix goes through the model once, and only the short
+choice suffixes run on top of its cached key/values. A group falls back to
+full-sequence scoring when tokenising the full text does not reproduce the
+prefix tokens, so scores are unchanged up to float rounding.
+
+Usage (dedup report per dataset):
+    python src/dedup.py data/hellaswag_10k.json data/halu_dialogue.json
+"""
+
+import argparse
+
+import numpy as np
+
+from instrumentation import count, stage
+
+def build_units(items):
+    """
+    Unique (prompt, choice) units and, per item, the unit index of each choice.
+    """
+    unit_ids = {}
+    units = []
+    item_units = []
+    for item in items:
+        idx = []
+        for choice in item["choices"]:
+            key = (item["prompt"], choice)
+            if key not in unit_ids:
+                unit_ids[key] = len(units)
+                units.append(key)
+            idx.append(unit_ids[key])
+        item_units.append(idx)
+    return units, item_units
+
+def dedup_stats(items):
+    """
+    Counts of items, units and prompts before and after deduplication.
+    """
+    units, _ = build_units(items)
+    n_units = sum(len(item["choices"]) for item in items)
+    unique_items = {(item["prompt"], tuple(item["choices"])) for item in items}
+    prompts = {item["prompt"] for item in items}
+    return {
+        "n_items": len(items),
+        "n_unique_items": len(unique_items),
+        "n_units": n_units,
+        "n_unique_units": len(units),
+        "n_unique_prompts": len(prompts),
+        "unit_ratio": n_units / len(units) if units else 1.0,
+    }
+
+def _expand_past(past, n):
+    """
+    Repeat a batch-1 key/value cache n times along the batch dimension
+    (legacy tuple caches and transformers Cache objects). The input cache is
+    left untouched, so it can be expanded again for the next chunk.
+    """
+    if hasattr(past, "batch_repeat_interleave"):
+        import copy
+
+        past = copy.deepcopy(past)
+        past.batch_repeat_interleave(n)
+        return past
+    return tuple(tuple(t.expand(n, *t.shape[1:]) for t in layer) for layer in past)
+
+def _score_group_with_prefix(prefix_ids, suffixes, model, device, max_sequences=64):
+    """
+    Last-token score of prefix + each suffix, running the prefix once and
+    the suffixes in chunks of at most `max_sequences`.
+    """
+    import torch
+
+    base = model.base_model
+    lm_head = model.get_output_embeddings()
+    scores = np.empty(len(suffixes), dtype=np.float64)
+    with torch.no_grad():
+        prefix_past = base(input_ids=torch.tensor([prefix_ids], device=device),
+                           use_cache=True).past_key_values
+        for start in range(0, len(suffixes), max_sequences):
+            chunk = suffixes[start:start + max_sequences]
+            n = len(chunk)
+            lengths = [len(s) for s in chunk]
+            suffix_ids = torch.zeros((n, max(lengths)), dtype=torch.long)
+            suffix_mask = torch.zeros((n, max(lengths)), dtype=torch.long)
+            for row, s in enumerate(chunk):
+                suffix_ids[row, :len(s)] = torch.tensor(s)
+                suffix_mask[row, :len(s)] = 1
+            suffix_ids = suffix_ids.to(device)
+            mask = torch.cat([torch.ones((n, len(prefix_ids)), dtype=torch.long),
+                              suffix_mask], dim=1).to(device)
+            hidden = base(input_ids=suffix_ids, attention_mask=mask,
+                          past_key_values=_expand_past(prefix_past, n),
+                          use_cache=False).last_hidden_state
+            rows = torch.arange(n, device=hidden.device)
+            last = torch.tensor(lengths, device=hidden.device) - 1
+            logits = lm_head(hidden[rows, last])
+            scores[start:start + n] = logits[rows, suffix_ids[rows, last]].float().cpu().numpy()
+            count("sequences", n)
+            count("tokens", sum(lengths))
+    count("tokens", len(prefix_ids))
+    return scores
+
+def score_units(units, tokenizer, model, device="cuda", max_sequences=64, share_prefix=False):
+    """
+    Last-token score (see multiple_choice.get_option_probabilities) of each
+    unique unit.
+    """
+    from multiple_choice import score_encoded
+
+    with stage("tokenize"):
+        encoded = tokenizer([f"{prompt}\nAnswer: {choice}" for prompt, choice in units])["input_ids"]
+    scores = np.empty(len(units), dtype=np.float64)
+    plain = list(range(len(units)))
+
+    if share_prefix:
+        groups = {}
+        for i, (prompt, _) in enumerate(units):
+            groups.setdefault(prompt, []).append(i)
+        prompts = list(groups)
+        with stage("tokenize"):
+            prefixes = tokenizer([f"{prompt}\nAnswer:" for prompt in prompts])["input_ids"]
+        plain = []
+        for prompt, prefix in zip(prompts, prefixes):
+            members = groups[prompt]
+            p = len(prefix)
+            if len(members) < 2 or any(encoded[i][:p] != prefix or len(encoded[i]) <= p
+                                       for i in members):
+                plain.extend(members)  # nothing to share, or BPE merged across the boundary
+                continue
+            with stage("forward"):
+                scores[members] = _score_group_with_prefix(
+                    prefix, [encoded[i][p:] for i in members], model, device, max_sequences)
+
+    if plain:
+        scores[plain] = score_encoded([encoded[i] for i in plain], model, device=device,
+                                      max_sequences=max_sequences)
+    return scores
+
+def get_option_probabilities_dedup(items, tokenizer, model, device="cuda", max_sequences=64,
+                                   share_prefix=False):
+    """
+    Normalised option probabilities for every item (same values as
+    get_option_probabilities), scoring each unique unit once.
+    Returns (probs per item, dedup_stats).
+    """
+    units, item_units = build_units(items)
+    scores = score_units(units, tokenizer, model, device=device, max_sequences=max_sequences,
+                         share_prefix=share_prefix)
+    probs = []
+    with stage("softmax"):
+        for idx in item_units:
+            item_scores = scores[idx]
+            unnorm = np.exp(item_scores - item_scores.max())
+            probs.append(unnorm / unnorm.sum())
+    return probs, dedup_stats(items)
+
+def format_stats(name, stats):
+    return (f"{name}: {stats['n_items']} items ({stats['n_unique_items']} unique), "
+            f"{stats['n_units']} units -> {stats['n_unique_units']} unique "
+            f"(ratio {stats['unit_ratio']:.2f}x), {stats['n_unique_prompts']} distinct prompts")
+
+def main():
+    parser = argparse.ArgumentParser(description="Report duplicate scoring work per dataset.")
+    parser.add_argument("data_paths", nargs="+")
+    parser.add_argument("--dataset", default=None,
+                        help="registered parser name (default: inferred from each file name)")
+    args = parser.parse_args()
+
+    from dataset_registry import load_items
+
+    for path in args.data_paths:
+        items = load_items(path, args.dataset)
+        print(format_stats(path, dedup_stats(items)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# src/emergence_surface.py
+
+"""
+Precomputed emergent-fraction surfaces for model comparison.
+
+For every (model, dataset) result file the fraction of items with
+UCS >= tau is evaluated on a dense (alpha, tau) grid in one vectorised
+binary search over its UCSIndex. The results are stacked into one array
+
+    fraction[model, dataset, alpha, tau]
+
+stored as uint16 (resolution 1/65535) in a single .npz file, with the grid,
+a presence mask, item counts, accuracy and mean UCS per alpha. The dashboard's
+comparison mode only slices this array, so overlaying any subset of models
+never touches per-item data.
+
+Usage:
+    python src/emergence_surface.py --results_dir results --output results/emergence_surface.npz
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from ucs_index import find_result_files, load_index
+
+DEFAULT_ALPHAS = np.round(np.linspace(0.0, 2.0, 201), 4)
+DEFAULT_TAUS = np.round(np.linspace(0.0, 1.0, 201), 4)
+SCALE = 65535
+
+def build_surface(files, alphas=DEFAULT_ALPHAS, taus=DEFAULT_TAUS, normalize_entropy=False):
+    """
+    Surface dict from [(dataset, model, path)] (see find_result_files).
+    """
+    alphas = np.asarray(alphas, dtype=np.float64)
+    taus = np.asarray(taus, dtype=np.float64)
+    models = sorted({m for _, m, _ in files})
+    datasets = sorted({d for d, _, _ in files})
+    shape = (len(models), len(datasets))
+    fraction = np.zeros(shape + (len(alphas), len(taus)), dtype=np.uint16)
+    mean_ucs = np.full(shape + (len(alphas),), np.nan, dtype=np.float32)
+    present = np.zeros(shape, dtype=bool)
+    n_items = np.zeros(shape, dtype=np.int64)
+    accuracy = np.full(shape, np.nan, dtype=np.float32)
+    for dataset, model, path in files:
+        i, j = models.index(model), datasets.index(dataset)
+        index = load_index(path, normalize_entropy)
+        frac = index.fraction_above(alphas[:, None], taus[None, :])
+        fraction[i, j] = np.round(frac * SCALE).astype(np.uint16)
+        mean_ucs[i, j] = index.mean_ucs(alphas)
+        present[i, j] = True
+        n_items[i, j] = index.n
+        accuracy[i, j] = index.accuracy
+    return {
+        "models": np.array(models), "datasets": np.array(datasets),
+        "alphas": alphas, "taus": taus, "fraction": fraction, "mean_ucs": mean_ucs,
+        "present": present, "n_items": n_items, "accuracy": accuracy,
+        "normalize_entropy": np.array(normalize_entropy),
+    }
+
+def save_surface(surface, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez_compressed(path, **surface)
+
+def load_surface(path):
+    with np.load(path) as npz:
+        return {key: npz[key] for key in npz.files}
+
+def nearest(grid, value):
+    return int(np.abs(np.asarray(grid) - value).argmin())
+
+def fraction(surface, model_idx, dataset_idx, alpha_idx=slice(None), tau_idx=slice(None)):
+    """
+    Float view of a slice of the stored fractions.
+    """
+    return surface["fraction"][model_idx, dataset_idx, alpha_idx, tau_idx] / SCALE
+
+def divergence(surface, model_idx, dataset_idx):
+    """
+    [alpha, tau] spread (max - min) of the emergent fraction across models.
+    """
+    values = fraction(surface, model_idx, dataset_idx)
+    return values.max(axis=0) - values.min(axis=0)
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute emergent-fraction surfaces.")
+    parser.add_argument("--results_dir", default="results")
+    parser.add_argument("--output", default="results/emergence_surface.npz")
+    parser.add_argument("--alpha_max", type=float, default=2.0)
+    parser.add_argument("--alpha_points", type=int, default=201)
+    parser.add_argument("--tau_points", type=int, default=201)
+    parser.add_argument("--normalize_entropy", action="store_true")
+    args = parser.parse_args()
+
+    files = find_result_files(args.results_dir)
+    if not files:
+        raise SystemExit(f"no result files under {args.results_dir}")
+    start = time.perf_counter()
+    surface = build_surface(files, np.linspace(0.0, args.alpha_max, args.alpha_points),
+                            np.linspace(0.0, 1.0, args.tau_points), args.normalize_entropy)
+    save_surface(surface, args.output)
+    print(f"{int(surface['present'].sum())} result files, {len(surface['models'])} models x "
+          f"{len(surface['datasets'])} datasets x {args.alpha_points} alphas x {args.tau_points} taus "
+          f"in {time.perf_counter() - start:.1f}s -> {args.output} "
+          f"({os.path.getsize(args.output) / 2 ** 20:.1f} MB)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# src/epsilon_manifold.py
+
+"""
+ε-capability manifold on a 3-D parameter grid.
+
+With capability = base(params) + N(0, noise^2), the probability of clearing
+the threshold has a closed form,
+
+    P(capability >= tau) = Phi((base - tau) / noise),
+
+so no noisy copies of the grid are needed. Monte Carlo sampling is kept as
+an option (method="mc") for comparison, accumulating exceedance counts one
+sample at a time.
+
+The grid is processed in float32 slabs along the first axis. Each slab is
+passed to marching cubes on its own and the partial meshes are concatenated
+(consecutive slabs share one boundary plane, so the surface has no gaps).
+Peak memory therefore depends on the slab size, not the grid size, and a
+256^3 grid takes seconds.
+"""
+
+import argparse
+import math
+import time
+
+import numpy as np
+
+def sigmoid_capability(radius, scale=3.0, center=3.0):
+    """
+    Base capability of some figures code/plot.py: a sigmoid phase transition
+    in the distance from the origin.
+    """
+    return 1.0 / (1.0 + np.exp(-scale * (radius - center)))
+
+def exceedance_probability(base, tau, noise, method="analytic", n_samples=10, rng=None):
+    """
+    P(base + noise * N(0, 1) >= tau), elementwise, as float32.
+    """
+    from scipy.special import erfc
+
+    base = np.asarray(base, dtype=np.float32)
+    if method == "analytic":
+        return (0.5 * erfc((np.float32(tau) - base) / np.float32(noise * math.sqrt(2.0)))
+                ).astype(np.float32)
+    if method != "mc":
+        raise ValueError(f"unknown method: {method}")
+    rng = rng if rng is not None else np.random.default_rng()
+    hits = np.zeros(base.shape, dtype=np.float32)
+    for _ in range(n_samples):
+        hits += (base + noise * rng.standard_normal(base.shape, dtype=np.float32)) >= tau
+    return hits / np.float32(n_samples)
+
+def slab_planes(res, memory_mb=256, arrays_per_plane=8):
+    """
+    Number of grid planes per slab that keeps the working set within
+    `memory_mb` (about `arrays_per_plane` float32 planes alive per grid plane).
+    """
+    plane_bytes = res * res * 4 * arrays_per_plane
+    return max(2, min(res, int(memory_mb * 2 ** 20 // plane_bytes)))
+
+def _top_k(values, coords, k, best_values, best_coords):
+    """
+    Merge a slab's candidates into the running top-k by value.
+    """
+    values = np.concatenate([best_values, values])
+    coords = np.concatenate([best_coords, coords])
+    if len(values) > k:
+        keep = np.argpartition(values, -k)[-k:]
+        values, coords = values[keep], coords[keep]
+    return values, coords
+
+def epsilon_manifold(res=256, lo=-5.0, hi=5.0, tau=0.7, epsilon=0.1, noise=0.2,
+                     base_fn=sigmoid_capability, method="analytic", n_samples=10, seed=42,
+                     memory_mb=256, max_points=5000):
+    """
+    Level set P(capability >= tau) = 1 - epsilon on a res^3 grid over
+    [lo, hi]^3, where capability = base_fn(|params|) + noise.
+
+    Returns a dict with the mesh (`verts` in parameter coordinates, `faces`),
+    the `max_points` grid points with the steepest probability gradient
+    (`critical_points`, `critical_gradient`) and timing/memory stats. The
+    mesh is empty when P never reaches 1 - epsilon (see `max_probability`).
+    """
+    from skimage import measure
+
+    axis = np.linspace(lo, hi, res, dtype=np.float32)
+    step = float(axis[1] - axis[0])
+    level = 1.0 - epsilon
+    planes = slab_planes(res, memory_mb)
+    rng = np.random.default_rng(seed)
+    yy, zz = np.meshgrid(axis, axis, indexing="ij")
+    yz_sq = yy ** 2 + zz ** 2
+
+    verts, faces = [], []
+    n_verts = 0
+    max_prob = 0.0
+    best_values = np.empty(0, dtype=np.float32)
+    best_coords = np.empty((0, 3), dtype=np.float32)
+    start = time.perf_counter()
+    for i0 in range(0, res - 1, planes - 1):
+        # Planes a..b (inclusive) with one halo plane on each side for the gradient.
+        i1 = min(i0 + planes - 1, res - 1)
+        a, b = max(i0 - 1, 0), min(i1 + 1, res - 1)
+        radius = np.sqrt(axis[a:b + 1, None, None] ** 2 + yz_sq[None])
+        prob = exceedance_probability(base_fn(radius), tau, noise, method, n_samples, rng)
+        max_prob = max(max_prob, float(prob.max()))
+
+        # Marching cubes over planes i0..i1; the next slab starts at i1 again.
+        core = prob[i0 - a:i1 - a + 1]
+        if core.min() <= level <= core.max():
+            v, f, _, _ = measure.marching_cubes(core, level=level, spacing=(step, step, step))
+            v += np.array([axis[i0], lo, lo], dtype=v.dtype)
+            verts.append(v)
+            faces.append(f + n_verts)
+            n_verts += len(v)
+
+        # Gradient magnitude on planes this slab owns (i0..i1-1, plus the last plane at the end).
+        stop = i1 + 1 if i1 == res - 1 else i1
+        grads = np.gradient(prob, step)
+        magnitude = np.sqrt(sum(g ** 2 for g in grads))[i0 - a:stop - a].ravel()
+        k = min(max_points, magnitude.size)
+        idx = np.argpartition(magnitude, -k)[-k:]
+        i, j, l = np.unravel_index(idx, (stop - i0, res, res))
+        coords = np.stack([axis[i + i0], axis[j], axis[l]], axis=1)
+        best_values, best_coords = _top_k(magnitude[idx], coords, max_points,
+                                          best_values, best_coords)
+    seconds = time.perf_counter() - start
+
+    return {
+        "verts": np.concatenate(verts) if verts else np.empty((0, 3), dtype=np.float32),
+        "faces": np.concatenate(faces) if faces else np.empty((0, 3), dtype=np.int64),
+        "critical_points": best_coords,
+        "critical_gradient": best_values,
+        "max_probability": max_prob,  # below 1 - epsilon means the level set is empty
+        "seconds": seconds,
+        "slab_planes": planes,
+        "slab_mb": (planes + 2) * res * res * 4 / 2 ** 20,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the ε-manifold estimator.")
+    parser.add_argument("--res", type=int, nargs="+", default=[50, 128, 256])
+    parser.add_argument("--method", choices=["analytic", "mc"], default="analytic")
+    parser.add_argument("--n_samples", type=int, default=10)
+    parser.add_argument("--memory_mb", type=float, default=256)
+    parser.add_argument("--noise", type=float, default=0.2)
+    args = parser.parse_args()
+
+    for res in args.res:
+        out = epsilon_manifold(res=res, noise=args.noise, method=args.method,
+                               n_samples=args.n_samples, memory_mb=args.memory_mb)
+        print(f"{res}^3 ({args.method}): {out['seconds']:.2f}s, {len(out['faces'])} faces, "
+              f"slabs of {out['slab_planes']} planes (~{out['slab_mb']:.0f} MB each)")
+
+if __name__ == "__main__":
+    main()
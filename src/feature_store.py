@@ -0,0 +1,143 @@
+# src/feature_store.py
+
+"""
+On-disk store of per-token log-probs and final hidden states.
+
+Layout of a store directory (all arrays are .npy, so they open with
+np.load(..., mmap_mode="r") and slices are read lazily):
+
+    meta.json            model, item ids, shapes
+    seq_offsets.npy      int64 [n_seqs + 1]; sequence s owns tokens
+                         seq_offsets[s]:seq_offsets[s+1]
+    choice_offsets.npy   int64 [n_items + 1]; item i owns sequences
+                         choice_offsets[i]:choice_offsets[i+1]
+    token_ids.npy        int32 [n_tokens]
+    token_logprobs.npy   float32 [n_tokens]; log p(token_t | tokens_<t), NaN
+                         at position 0
+    hidden.npy           float16/32 [n_seqs, hidden_size]; final-layer hidden
+                         state at each sequence's last token
+
+Sequences are the usual "{prompt}\\nAnswer: {choice}" texts. All arrays are
+preallocated from the tokenised lengths and filled chunk by chunk while
+scoring, so memory use does not grow with the dataset.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from instrumentation import count, stage
+
+def _open(path, name, dtype, shape):
+    return np.lib.format.open_memmap(os.path.join(path, name), mode="w+", dtype=dtype,
+                                     shape=shape)
+
+def capture_features(items, tokenizer, model, out_dir, device="cuda", max_sequences=16,
+                     hidden_dtype="float16", model_name=None):
+    """
+    Score parsed items while streaming per-token log-probs and last-token
+    hidden states into a feature store at `out_dir`.
+
+    Returns the flat last-token scores (same values as score_encoded), so
+    the caller can normalise them into option probabilities as usual.
+    """
+    import torch
+
+    from multiple_choice import length_sorted_chunks, pad_sequences, tokenize_options
+
+    choices_list = [it["choices"] for it in items]
+    encoded = tokenize_options([it["prompt"] for it in items], choices_list, tokenizer)
+    lengths = np.array([len(ids) for ids in encoded], dtype=np.int64)
+    seq_offsets = np.concatenate([[0], np.cumsum(lengths)])
+    choice_offsets = np.concatenate([[0], np.cumsum([len(c) for c in choices_list])])
+    hidden_size = model.get_output_embeddings().weight.shape[1]
+
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, "seq_offsets.npy"), seq_offsets)
+    np.save(os.path.join(out_dir, "choice_offsets.npy"), choice_offsets)
+    token_ids = _open(out_dir, "token_ids.npy", np.int32, (int(seq_offsets[-1]),))
+    token_logprobs = _open(out_dir, "token_logprobs.npy", np.float32, (int(seq_offsets[-1]),))
+    hidden_out = _open(out_dir, "hidden.npy", hidden_dtype, (len(encoded), hidden_size))
+
+    base = model.base_model
+    lm_head = model.get_output_embeddings()
+    scores = np.empty(len(encoded), dtype=np.float64)
+    for chunk in length_sorted_chunks(encoded, max_sequences):
+        input_ids, attention_mask, chunk_lengths = pad_sequences([encoded[i] for i in chunk],
+                                                                 device)
+        with stage("forward"), torch.no_grad():
+            hidden = base(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+            logits = lm_head(hidden)  # full [chunk, width, vocab]: needed for every token
+            rows = torch.arange(len(chunk), device=hidden.device)
+            last = torch.as_tensor(chunk_lengths, device=hidden.device) - 1
+            last_scores = logits[rows, last, input_ids[rows, last]]
+            next_logprobs = torch.log_softmax(logits[:, :-1].float(), dim=-1).gather(
+                -1, input_ids[:, 1:, None])[..., 0]
+        with stage("capture"):
+            scores[chunk] = last_scores.float().cpu().numpy()
+            next_logprobs = next_logprobs.cpu().numpy()
+            last_hidden = hidden[rows, last].float().cpu().numpy()
+            ids = input_ids.cpu().numpy()
+            for row, s in enumerate(chunk):
+                start, n = seq_offsets[s], chunk_lengths[row]
+                token_ids[start:start + n] = ids[row, :n]
+                token_logprobs[start] = np.nan
+                token_logprobs[start + 1:start + n] = next_logprobs[row, :n - 1]
+                hidden_out[s] = last_hidden[row]
+        count("sequences", len(chunk))
+        count("tokens", sum(chunk_lengths))
+
+    for array in (token_ids, token_logprobs, hidden_out):
+        array.flush()
+    meta = {
+        "model": model_name,
+        "item_ids": [str(it["id"]) for it in items],
+        "n_items": len(items),
+        "n_sequences": len(encoded),
+        "n_tokens": int(seq_offsets[-1]),
+        "hidden_size": int(hidden_size),
+        "hidden_dtype": str(np.dtype(hidden_dtype)),
+    }
+    with open(os.path.join(out_dir, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    return scores
+
+class FeatureStore:
+    """
+    Read-only, memory-mapped view of a feature store directory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.index = {item_id: i for i, item_id in enumerate(self.meta["item_ids"])}
+        load = lambda name: np.load(os.path.join(path, name), mmap_mode="r")
+        self.seq_offsets = load("seq_offsets.npy")
+        self.choice_offsets = load("choice_offsets.npy")
+        self.token_ids = load("token_ids.npy")
+        self.token_logprobs = load("token_logprobs.npy")
+        self.hidden = load("hidden.npy")
+
+    def __len__(self):
+        return self.meta["n_items"]
+
+    def sequences(self, item_id):
+        """
+        Sequence indices (one per choice) of an item.
+        """
+        i = self.index[str(item_id)]
+        return range(int(self.choice_offsets[i]), int(self.choice_offsets[i + 1]))
+
+    def item(self, item_id):
+        """
+        Per-choice token ids and log-probs, and the [k, hidden] last-token states.
+        """
+        seqs = self.sequences(item_id)
+        spans = [(int(self.seq_offsets[s]), int(self.seq_offsets[s + 1])) for s in seqs]
+        return {
+            "token_ids": [np.asarray(self.token_ids[a:b]) for a, b in spans],
+            "token_logprobs": [np.asarray(self.token_logprobs[a:b]) for a, b in spans],
+            "hidden": np.asarray(self.hidden[seqs.start:seqs.stop]),
+        }
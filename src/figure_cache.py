@@ -0,0 +1,250 @@
+# src/figure_cache.py
+
+import ast
+import hashlib
+import importlib.util
+import json
+import os
+import time
+
+MANIFEST_NAME = ".figure_cache.json"
+CACHE_VERSION = 1
+
+DEFAULT_SAVEFIG = {
+    "dpi": 300,
+    "bbox_inches": "tight",
+    "facecolor": "white",
+    "edgecolor": "none",
+}
+
+def figure_job(script, func, output, params=None, inputs=(), savefig=None):
+    """
+    Describe one figure: `func` (a function defined in `script` that returns
+    a matplotlib Figure) is called with `params` and saved to `output`.
+    `inputs` lists data files the figure reads, so edits to them invalidate it.
+    """
+    return {
+        "script": os.path.abspath(script),
+        "func": func,
+        "output": os.path.abspath(output),
+        "params": params or {},
+        "inputs": [os.path.abspath(p) for p in inputs],
+        "savefig": DEFAULT_SAVEFIG if savefig is None else savefig,
+    }
+
+def _top_level_sources(script):
+    """
+    Split a script into named top-level definitions (functions, classes,
+    simple assignments) and unnamed statements that always run on import
+    (imports, rcParams tweaks, seeding).
+    """
+    with open(script, "r", encoding="utf-8") as f:
+        src = f.read()
+    tree = ast.parse(src)
+    named, always = {}, []
+    for node in tree.body:
+        segment = ast.get_source_segment(src, node)
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            named[node.name] = (node, segment)
+        elif isinstance(node, ast.Assign) and all(isinstance(t, ast.Name) for t in node.targets):
+            for target in node.targets:
+                named[target.id] = (node, segment)
+        elif isinstance(node, ast.If) and "__name__" in ast.dump(node.test):
+            continue
+        else:
+            always.append(segment)
+    return named, always
+
+def _source_digest(script, func):
+    """
+    Hash the source `func` depends on: its own definition, every top-level
+    name it (transitively) references, and the script's import-time
+    statements. Edits elsewhere in the script leave the digest unchanged.
+    """
+    named, always = _top_level_sources(script)
+    if func not in named:
+        raise KeyError(f"{func} is not defined at the top level of {script}")
+    seen, stack = set(), [func]
+    while stack:
+        name = stack.pop()
+        if name in seen or name not in named:
+            continue
+        seen.add(name)
+        for node in ast.walk(named[name][0]):
+            if isinstance(node, ast.Name):
+                stack.append(node.id)
+    h = hashlib.sha256()
+    for segment in always:
+        h.update(segment.encode("utf-8"))
+    for name in sorted(seen):
+        h.update(named[name][1].encode("utf-8"))
+    return h.hexdigest()
+
+def _file_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def job_digest(job, _source_cache=None):
+    """
+    Content hash of everything that determines a job's PNG: dependent source,
+    params, input file contents and savefig options.
+    """
+    key = (job["script"], job["func"])
+    if _source_cache is not None and key in _source_cache:
+        source = _source_cache[key]
+    else:
+        source = _source_digest(*key)
+        if _source_cache is not None:
+            _source_cache[key] = source
+    payload = {
+        "version": CACHE_VERSION,
+        "source": source,
+        "params": job["params"],
+        "inputs": {p: _file_digest(p) for p in job["inputs"]},
+        "savefig": job["savefig"],
+    }
+    blob = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+def _load_manifest(directory):
+    path = os.path.join(directory, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_manifest(directory, manifest):
+    path = os.path.join(directory, MANIFEST_NAME)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+# Scripts loaded in this process, keyed by path.
+_SCRIPTS = {}
+
+def load_script(path):
+    """
+    Import a plotting script by file path (the script folders contain spaces
+    and are not packages). Its `__main__` block does not run.
+    """
+    module = _SCRIPTS.get(path)
+    if module is None:
+        name = "_figure_" + hashlib.md5(path.encode("utf-8")).hexdigest()[:10]
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _SCRIPTS[path] = module
+    return module
+
+def use_headless_backend():
+    os.environ["MPLBACKEND"] = "Agg"
+    import matplotlib
+    matplotlib.use("Agg")
+
+def render_job(job):
+    """
+    Render a single job in the current process. Returns (output, seconds).
+    """
+    use_headless_backend()
+    import matplotlib.pyplot as plt
+
+    start = time.perf_counter()
+    module = load_script(job["script"])
+    fig = getattr(module, job["func"])(**job["params"])
+    os.makedirs(os.path.dirname(job["output"]), exist_ok=True)
+    fig.savefig(job["output"], **job["savefig"])
+    plt.close("all")
+    return job["output"], time.perf_counter() - start
+
+def build_figures(jobs, workers=None, force=False, verbose=True, executor=None):
+    """
+    Render only the jobs whose output is missing or whose digest changed
+    since the last build, spreading the stale ones over a process pool.
+    Digests are kept in a `.figure_cache.json` next to each output.
+    Pass `executor` to share an existing pool instead of starting one.
+
+    Returns a list of (output, status, seconds) with status "rendered",
+    "cached" or "failed: <script>:<func>: <error>". A failing job does not
+    stop the others and keeps its old digest, so it is retried next time.
+    """
+    source_cache = {}
+    manifests = {}
+    stale, report = [], []
+    for job in jobs:
+        directory = os.path.dirname(job["output"])
+        if directory not in manifests:
+            manifests[directory] = _load_manifest(directory)
+        digest = job_digest(job, source_cache)
+        name = os.path.basename(job["output"])
+        up_to_date = (
+            not force
+            and manifests[directory].get(name) == digest
+            and os.path.exists(job["output"])
+        )
+        if up_to_date:
+            report.append((job["output"], "cached", 0.0))
+        else:
+            stale.append((job, digest))
+
+    if stale:
+        if executor is not None:
+            rendered = _render_in_pool(executor, stale)
+        elif workers == 1 or len(stale) == 1:
+            rendered = [_render_or_error(job) for job, _ in stale]
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=workers,
+                                     initializer=use_headless_backend) as pool:
+                rendered = _render_in_pool(pool, stale)
+        for (job, digest), (seconds, error) in zip(stale, rendered):
+            if error is not None:
+                report.append((job["output"], _failure(job, error), 0.0))
+                continue
+            directory = os.path.dirname(job["output"])
+            manifests[directory][os.path.basename(job["output"])] = digest
+            report.append((job["output"], "rendered", seconds))
+        for directory, manifest in manifests.items():
+            os.makedirs(directory, exist_ok=True)
+            _save_manifest(directory, manifest)
+
+    if verbose:
+        n_rendered = sum(1 for _, status, _ in report if status == "rendered")
+        n_failed = sum(1 for _, status, _ in report if status.startswith("failed"))
+        for output, status, seconds in report:
+            if status == "rendered":
+                print(f"rendered {os.path.relpath(output)} ({seconds:.2f}s)")
+            elif status != "cached":
+                print(f"{status} ({os.path.relpath(output)})")
+        print(f"{n_rendered} figure(s) rendered, {len(report) - n_rendered - n_failed} up to date"
+              + (f", {n_failed} failed." if n_failed else "."))
+    return report
+
+def _failure(job, error):
+    return f"failed: {os.path.basename(job['script'])}:{job['func']}: {error}"
+
+def _render_or_error(job):
+    """
+    (seconds, None) for a rendered job, (None, error text) for a failed one.
+    """
+    try:
+        return render_job(job)[1], None
+    except Exception as exc:
+        return None, f"{type(exc).__name__}: {exc}"
+
+def _render_in_pool(executor, stale):
+    futures = [executor.submit(render_job, job) for job, _ in stale]
+    rendered = []
+    for future in futures:
+        try:
+            rendered.append((future.result()[1], None))
+        except Exception as exc:
+            rendered.append((None, f"{type(exc).__name__}: {exc}"))
+    return rendered
@@ -0,0 +1,164 @@
+# src/frame_pipeline.py
+
+"""
+Parallel, streaming rendering of matplotlib animations.
+
+Frames are addressed like figure_cache jobs: a plotting script, the name of
+a function in it that returns the Figure for frame `i`, and keyword params.
+A process pool renders them to RGB arrays with at most `window` frames in
+flight; frames are handed to the encoder strictly in order and dropped as
+soon as they are written. Peak memory is therefore about `window` frames,
+whatever the length of the animation.
+
+Encoders write as they receive frames:
+
+    .gif           Pillow, one palettised frame at a time (local colour tables)
+    anything else  an ffmpeg subprocess fed raw RGB over a pipe (.mp4, .webm, ...)
+"""
+
+import os
+import shutil
+import subprocess
+import time
+from collections import deque
+
+import numpy as np
+
+from figure_cache import load_script, use_headless_backend
+
+def figure_to_rgb(fig, dpi=None):
+    """
+    Draw a Figure and return its pixels as an [H, W, 3] uint8 array; the
+    figure is closed.
+    """
+    import matplotlib.pyplot as plt
+
+    if dpi is not None:
+        fig.set_dpi(dpi)
+    fig.canvas.draw()
+    rgb = np.asarray(fig.canvas.buffer_rgba())[..., :3].copy()
+    plt.close(fig)
+    return rgb
+
+def render_frame(script, func, i, params=None, dpi=None):
+    """
+    Render frame `i` of `func` in `script` in the current process.
+    """
+    use_headless_backend()
+    module = load_script(os.path.abspath(script))
+    return figure_to_rgb(getattr(module, func)(i=i, **(params or {})), dpi)
+
+def render_frames(script, func, n_frames, params=None, dpi=None, workers=None, window=None):
+    """
+    Yield frames 0..n_frames-1 as RGB arrays, in order, rendered by a pool of
+    `workers` processes (default: all CPUs) with at most `window` frames
+    (default: 2 per worker) queued or waiting to be consumed.
+    """
+    workers = workers or os.cpu_count() or 1
+    window = window or 2 * workers
+    if workers == 1:
+        for i in range(n_frames):
+            yield render_frame(script, func, i, params, dpi)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Workers pick the headless backend before importing pyplot; the
+    # caller's environment is left alone.
+    with ProcessPoolExecutor(max_workers=workers, initializer=use_headless_backend) as pool:
+        pending = deque()
+        next_frame = 0
+        while pending or next_frame < n_frames:
+            while next_frame < n_frames and len(pending) < window:
+                pending.append(pool.submit(render_frame, script, func, next_frame, params, dpi))
+                next_frame += 1
+            yield pending.popleft().result()
+
+class GifWriter:
+    """
+    Streaming GIF encoder: every frame gets its own adaptive 256-colour
+    palette and is written immediately.
+    """
+
+    def __init__(self, path, fps, loop=0):
+        self.path = path
+        self.duration = int(round(1000 / fps))
+        self.loop = loop
+        self.file = None
+
+    def write(self, frame):
+        from PIL import GifImagePlugin, Image
+
+        im = Image.fromarray(frame).quantize(colors=256)
+        if self.file is None:
+            self.file = open(self.path, "wb")
+            header, _ = GifImagePlugin.getheader(im, info={"loop": self.loop})
+            self.file.write(b"".join(header))
+        for chunk in GifImagePlugin.getdata(im, duration=self.duration, include_color_table=True):
+            self.file.write(chunk)
+
+    def close(self):
+        if self.file is not None:
+            self.file.write(b";")  # GIF trailer
+            self.file.close()
+
+def ffmpeg_executable():
+    path = shutil.which("ffmpeg")
+    if path is None:
+        try:
+            import imageio_ffmpeg
+            path = imageio_ffmpeg.get_ffmpeg_exe()
+        except ImportError:
+            raise RuntimeError("ffmpeg not found: install it (or imageio-ffmpeg), "
+                               "or write a .gif instead")
+    return path
+
+class FfmpegWriter:
+    """
+    Pipe raw RGB frames into ffmpeg; the codec follows the file extension
+    (H.264 / yuv420p for .mp4).
+    """
+
+    def __init__(self, path, fps, crf=18):
+        self.path = path
+        self.fps = fps
+        self.crf = crf
+        self.proc = None
+
+    def write(self, frame):
+        if self.proc is None:
+            height, width, _ = frame.shape
+            cmd = [ffmpeg_executable(), "-y", "-loglevel", "error",
+                   "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}",
+                   "-r", str(self.fps), "-i", "-",
+                   "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2"]  # yuv420p needs even sizes
+            if self.path.endswith(".mp4"):
+                cmd += ["-c:v", "libx264", "-pix_fmt", "yuv420p", "-crf", str(self.crf)]
+            self.proc = subprocess.Popen(cmd + [self.path], stdin=subprocess.PIPE)
+        self.proc.stdin.write(np.ascontiguousarray(frame).tobytes())
+
+    def close(self):
+        if self.proc is not None:
+            self.proc.stdin.close()
+            if self.proc.wait() != 0:
+                raise RuntimeError(f"ffmpeg failed writing {self.path}")
+
+def open_writer(path, fps):
+    return GifWriter(path, fps) if path.lower().endswith(".gif") else FfmpegWriter(path, fps)
+
+def write_animation(frames, path, fps=4):
+    """
+    Stream an iterable of equally sized RGB frames into `path`.
+    Returns (number of frames, seconds).
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    writer = open_writer(path, fps)
+    start = time.perf_counter()
+    n = 0
+    try:
+        for frame in frames:
+            writer.write(frame)
+            n += 1
+    finally:
+        writer.close()
+    return n, time.perf_counter() - start
@@ -0,0 +1,199 @@
+# src/instrumentation.py
+
+"""
+Low-overhead per-stage timing for the evaluation hot path.
+
+Code marks its stages with `with stage("forward"): ...` and bumps counters
+with `count("tokens", n)`. Both are no-ops (a shared null context) until a
+StageTimer is enabled for the run, e.g. by `main.py --profile stages`.
+"""
+
+import contextlib
+import json
+import os
+import threading
+import time
+
+_NULL = contextlib.nullcontext()
+_ACTIVE = None
+
+class StageTimer:
+    """
+    Accumulates wall time per stage name plus free-form counters, and keeps
+    the individual stage events (up to `max_events`) for a Chrome trace.
+
+    With `sync_cuda=True` the CUDA stream is synchronised at stage boundaries
+    so asynchronous kernels are charged to the stage that launched them.
+
+    Updates are locked, so stages may run on several threads (main.py
+    --pipeline). Their times then overlap: totals are also kept per thread
+    and the profile is marked as overlapping.
+    """
+
+    def __init__(self, sync_cuda=False, record_function=False, max_events=1_000_000):
+        self.sync_cuda = sync_cuda
+        self.record_function = record_function
+        self.max_events = max_events
+        self.totals = {}
+        self.calls = {}
+        self.counters = {}
+        self.events = []
+        self.thread_totals = {}
+        self.start_ns = time.perf_counter_ns()
+        self._lock = threading.Lock()
+
+    def _sync(self):
+        if self.sync_cuda:
+            import torch
+            torch.cuda.synchronize()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        if self.record_function:
+            # Label the stage inside a torch.profiler trace as well.
+            import torch
+            label = torch.profiler.record_function(name)
+        else:
+            label = _NULL
+        with label:
+            self._sync()
+            t0 = time.perf_counter_ns()
+            try:
+                yield
+            finally:
+                self._sync()
+                dt = time.perf_counter_ns() - t0
+                thread = threading.current_thread().name
+                with self._lock:
+                    self.totals[name] = self.totals.get(name, 0) + dt
+                    self.calls[name] = self.calls.get(name, 0) + 1
+                    per_thread = self.thread_totals.setdefault(thread, {})
+                    per_thread[name] = per_thread.get(name, 0) + dt
+                    if len(self.events) < self.max_events:
+                        self.events.append((name, t0, dt, thread))
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    @property
+    def overlapping(self):
+        """
+        True when stages were timed on more than one thread, so their totals
+        overlap in wall time and can add up to more than the run took.
+        """
+        return len(self.thread_totals) > 1
+
+    def summary(self):
+        """
+        Text table of time per stage (share of total wall time) and counters.
+        """
+        wall_ns = time.perf_counter_ns() - self.start_ns
+        lines = [f"{'stage':<14} {'calls':>9} {'total s':>10} {'mean ms':>10} {'% wall':>7}"]
+        for name, total in sorted(self.totals.items(), key=lambda kv: -kv[1]):
+            calls = self.calls[name]
+            lines.append(f"{name:<14} {calls:>9} {total / 1e9:>10.3f} "
+                         f"{total / calls / 1e6:>10.3f} {100.0 * total / wall_ns:>6.1f}%")
+        if self.overlapping:
+            lines.append(f"(stages overlap across {len(self.thread_totals)} threads; "
+                         f"% wall does not add up to 100)")
+            for thread, totals in sorted(self.thread_totals.items()):
+                busy = sum(totals.values())
+                lines.append(f"thread {thread}: {busy / 1e9:.3f} s busy "
+                             f"({100.0 * busy / wall_ns:.1f}% wall) in "
+                             + ", ".join(sorted(totals)))
+        else:
+            untracked = wall_ns - sum(self.totals.values())
+            lines.append(f"{'(other)':<14} {'':>9} {untracked / 1e9:>10.3f} {'':>10} "
+                         f"{100.0 * untracked / wall_ns:>6.1f}%")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"counter {name}: {value}")
+        return "\n".join(lines)
+
+    def write_trace(self, path):
+        """
+        Write the recorded stage events in Chrome trace format
+        (open with chrome://tracing or https://ui.perfetto.dev).
+        """
+        threads = {thread: tid for tid, thread in enumerate(sorted(self.thread_totals))}
+        events = [
+            {"name": name, "ph": "X", "pid": 0, "tid": threads[thread],
+             "ts": (t0 - self.start_ns) / 1e3, "dur": dt / 1e3}
+            for name, t0, dt, thread in self.events
+        ]
+        events += [{"name": "thread_name", "ph": "M", "pid": 0, "tid": tid,
+                    "args": {"name": thread}} for thread, tid in threads.items()]
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events,
+                       "otherData": {"counters": self.counters, "overlapping": self.overlapping}}, f)
+
+def enable(timer):
+    global _ACTIVE
+    _ACTIVE = timer
+    return timer
+
+def disable():
+    global _ACTIVE
+    _ACTIVE = None
+
+def active():
+    return _ACTIVE
+
+def stage(name):
+    """
+    Context manager timing `name` on the active timer; a no-op when disabled.
+    """
+    if _ACTIVE is None:
+        return _NULL
+    return _ACTIVE.stage(name)
+
+def count(name, n=1):
+    if _ACTIVE is not None:
+        _ACTIVE.count(name, n)
+
+@contextlib.contextmanager
+def profile_run(mode, trace_dir, device="cpu"):
+    """
+    Instrument everything inside the block.
+
+    mode: None/"none" (off), "stages" (stage timers only), "cprofile"
+    (stage timers + cProfile), or "torch" (stage timers + torch.profiler).
+    Writes into `trace_dir`: stages_trace.json, plus cprofile.prof or
+    torch_trace.json, and prints the stage breakdown at the end.
+    """
+    if not mode or mode == "none":
+        yield None
+        return
+
+    timer = enable(StageTimer(sync_cuda=str(device).startswith("cuda"),
+                              record_function=(mode == "torch")))
+    profiler = None
+    if mode == "cprofile":
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    elif mode == "torch":
+        import torch
+        activities = [torch.profiler.ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(torch.profiler.ProfilerActivity.CUDA)
+        profiler = torch.profiler.profile(activities=activities, record_shapes=True)
+        profiler.__enter__()
+    try:
+        yield timer
+    finally:
+        disable()
+        os.makedirs(trace_dir, exist_ok=True)
+        if mode == "cprofile":
+            import pstats
+            profiler.disable()
+            profiler.dump_stats(os.path.join(trace_dir, "cprofile.prof"))
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(20)
+        elif mode == "torch":
+            profiler.__exit__(None, None, None)
+            profiler.export_chrome_trace(os.path.join(trace_dir, "torch_trace.json"))
+        timer.write_trace(os.path.join(trace_dir, "stages_trace.json"))
+        print("\nStage breakdown:")
+        print(timer.summary())
+        print(f"Traces written to {trace_dir}")
@@ -0,0 +1,127 @@
+# src/loadtest_scoring_server.py
+
+"""
+Load test for scoring_server.py: fires synthetic {prompt, choices} requests
+at increasing concurrency and reports throughput and latency per level, which
+shows how micro-batching scales with the number of concurrent clients.
+
+Usage:
+    # against a running server
+    python src/loadtest_scoring_server.py --url http://127.0.0.1:8080
+    # self-contained: start an in-process server on a tiny local GPT-2
+    python src/loadtest_scoring_server.py --tiny
+"""
+
+import argparse
+import json
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+from benchmark_throughput import synthetic_items
+
+def post_json(url, payload, timeout=120.0):
+    data = json.dumps(payload).encode("utf-8")
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+def run_level(url, items, concurrency):
+    """
+    `concurrency` client threads share the item list; each sends one request
+    at a time. Returns throughput / latency / batch-size stats.
+    """
+    latencies, batch_sizes = [], []
+    errors = [0]
+    lock = threading.Lock()
+    cursor = [0]
+
+    def client():
+        while True:
+            with lock:
+                i = cursor[0]
+                cursor[0] += 1
+            if i >= len(items):
+                return
+            item = items[i]
+            t0 = time.perf_counter()
+            try:
+                result = post_json(url, {"prompt": item["prompt"], "choices": item["choices"],
+                                         "correct_idx": item["correct_idx"]})
+            except OSError:
+                with lock:
+                    errors[0] += 1
+                continue
+            elapsed = time.perf_counter() - t0
+            with lock:
+                latencies.append(elapsed)
+                batch_sizes.append(result["batch_size"])
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    lat_ms = np.asarray(latencies) * 1000.0
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors[0],
+        "requests_per_s": len(latencies) / wall,
+        "latency_ms_p50": float(np.percentile(lat_ms, 50)),
+        "latency_ms_p99": float(np.percentile(lat_ms, 99)),
+        "mean_batch_size": float(np.mean(batch_sizes)),
+    }
+
+def start_tiny_server(max_batch, max_wait_ms):
+    """
+    In-process server on the locally built tiny GPT-2 from benchmark_throughput.
+    """
+    from benchmark_throughput import build_tiny_model, build_tokenizer
+    from scoring_server import serve
+
+    tokenizer = build_tokenizer()
+    model, _ = build_tiny_model(device="cpu")
+    server = serve(tokenizer, model, device="cpu", port=0, max_batch=max_batch,
+                   max_wait_ms=max_wait_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    return f"http://{host}:{port}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for the scoring server.")
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--tiny", action="store_true",
+                        help="start an in-process server on a tiny local model instead")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--requests_per_level", type=int, default=200)
+    parser.add_argument("--context_len", type=int, default=64)
+    parser.add_argument("--n_choices", type=int, default=4)
+    parser.add_argument("--max_batch", type=int, default=32, help="(--tiny only)")
+    parser.add_argument("--max_wait_ms", type=float, default=10.0, help="(--tiny only)")
+    parser.add_argument("--output", default=None, help="optional JSON report path")
+    args = parser.parse_args()
+
+    url = start_tiny_server(args.max_batch, args.max_wait_ms) if args.tiny else args.url
+    items = synthetic_items(args.requests_per_level, args.context_len, args.n_choices)
+    run_level(url + "/score", items[:8], 1)  # warm-up
+
+    print(f"{'clients':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'batch':>6} {'errors':>6}")
+    report = []
+    for concurrency in args.concurrency:
+        stats = run_level(url + "/score", items, concurrency)
+        report.append(stats)
+        print(f"{concurrency:>7} {stats['requests_per_s']:>8.1f} {stats['latency_ms_p50']:>8.1f} "
+              f"{stats['latency_ms_p99']:>8.1f} {stats['mean_batch_size']:>6.1f} {stats['errors']:>6}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# src/logit_lens.py
+
+"""
+Logit-lens depth sweep: choice probabilities at every layer of one model.
+
+A single forward pass with output_hidden_states=True yields the residual
+stream after the embeddings and after every block. Applying the model's
+final norm and LM head to each of them at the last token gives the same
+last-token score as get_option_probabilities, as if the network stopped at
+that depth. Each item therefore gets per-layer probabilities, capability and
+entropy, and the per-layer means form a depth-scaling curve for the cost of
+one evaluation.
+
+The last hidden state returned by transformers already has the final norm
+applied, so it is passed to the LM head as is; the final layer reproduces
+the regular scores.
+
+Usage:
+    python src/logit_lens.py --model_name gpt2-medium --data_path data/mmlu_10k.json \\
+        --output results/logit_lens_gpt2-medium_mmlu.json
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+
+from capability_utils import batch_capability, batch_entropy, pad_prob_list
+from instrumentation import count, stage
+from multiple_choice import length_sorted_chunks, normalize_scores, pad_sequences, tokenize_options
+
+FINAL_NORM_NAMES = ("ln_f", "norm", "final_layer_norm", "final_layernorm")
+
+def final_norm(model):
+    """
+    The norm applied before the LM head (GPT-2: ln_f, Llama/Mistral: norm,
+    GPT-NeoX: final_layer_norm).
+    """
+    base = model.base_model
+    for name in FINAL_NORM_NAMES:
+        if hasattr(base, name):
+            return getattr(base, name)
+    raise ValueError(f"no final norm found on {type(base).__name__}")
+
+def layer_scores(encoded, model, device="cuda", max_sequences=64):
+    """
+    [n_layers + 1, n_sequences] last-token scores read out after the
+    embeddings (row 0) and after each block (row l).
+    """
+    import torch
+
+    norm = final_norm(model)
+    lm_head = model.get_output_embeddings()
+    scores = None
+    for chunk in length_sorted_chunks(encoded, max_sequences):
+        input_ids, attention_mask, lengths = pad_sequences([encoded[i] for i in chunk], device)
+        with stage("forward"), torch.no_grad():
+            hidden_states = model.base_model(input_ids=input_ids, attention_mask=attention_mask,
+                                             output_hidden_states=True).hidden_states
+            rows = torch.arange(len(chunk), device=input_ids.device)
+            last = torch.as_tensor(lengths, device=input_ids.device) - 1
+            token_ids = input_ids[rows, last]
+            if scores is None:
+                scores = np.empty((len(hidden_states), len(encoded)), dtype=np.float64)
+            for layer, hidden in enumerate(hidden_states):
+                h = hidden[rows, last]
+                if layer < len(hidden_states) - 1:
+                    h = norm(h)  # the final entry is already normalised
+                # One layer at a time keeps the [chunk, vocab] logits small.
+                layer_logits = lm_head(h)
+                scores[layer, chunk] = layer_logits[rows, token_ids].float().cpu().numpy()
+        count("sequences", len(chunk))
+        count("tokens", sum(lengths))
+    return scores
+
+def depth_sweep(items, tokenizer, model, device="cuda", max_sequences=64, alpha=0.3,
+                normalize_entropy=False):
+    """
+    Per-item results (final-layer fields in the main.py layout plus
+    per-layer lists) and the per-layer mean curve.
+    """
+    choices_list = [it["choices"] for it in items]
+    encoded = tokenize_options([it["prompt"] for it in items], choices_list, tokenizer)
+    scores = layer_scores(encoded, model, device, max_sequences)
+    correct = [it["correct_idx"] for it in items]
+
+    per_layer = []
+    for layer_score in scores:
+        probs, mask = pad_prob_list(normalize_scores(layer_score, choices_list))
+        per_layer.append((probs, batch_capability(probs, mask, correct),
+                          batch_entropy(probs, mask, normalize_entropy)))
+
+    n_layers = len(per_layer) - 1
+    curve = []
+    for layer, (_, cap, ent) in enumerate(per_layer):
+        curve.append({
+            "layer": layer,
+            "depth_fraction": layer / n_layers,
+            "accuracy": float(cap.mean()),
+            "entropy": float(ent.mean()),
+            "ucs": float((cap * (1.0 - alpha * ent)).mean()),
+        })
+
+    final_probs, final_cap, final_ent = per_layer[-1]
+    results = []
+    for i, item in enumerate(items):
+        k = len(item["choices"])
+        results.append({
+            "id": item["id"],
+            "correct_idx": item["correct_idx"],
+            "probs": final_probs[i, :k].tolist(),
+            "capability": float(final_cap[i]),
+            "entropy": float(final_ent[i]),
+            "layer_capability": [float(cap[i]) for _, cap, _ in per_layer],
+            "layer_entropy": [float(ent[i]) for _, _, ent in per_layer],
+            "layer_probs": [probs[i, :k].tolist() for probs, _, _ in per_layer],
+        })
+    return results, curve
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-layer (logit lens) capability sweep.")
+    parser.add_argument("--model_name", default="gpt2-medium")
+    parser.add_argument("--data_path", default="data/mmlu_10k.json")
+    parser.add_argument("--dataset", default=None)
+    parser.add_argument("--device", default="cuda")
+    parser.add_argument("--max_sequences", type=int, default=64)
+    parser.add_argument("--alpha", type=float, default=0.3)
+    parser.add_argument("--normalize_entropy", action="store_true")
+    parser.add_argument("--output", default=None,
+                        help="per-item results; the depth curve goes to <output>.curve.json")
+    args = parser.parse_args()
+
+    from dataset_registry import load_items
+    from model_utils import load_model
+
+    tokenizer, model = load_model(model_name=args.model_name, device=args.device)
+    items = load_items(args.data_path, args.dataset)
+    results, curve = depth_sweep(items, tokenizer, model, args.device, args.max_sequences,
+                                 args.alpha, args.normalize_entropy)
+
+    print(f"{'layer':>5} {'depth':>6} {'acc':>7} {'entropy':>8} {'ucs':>7}")
+    for row in curve:
+        print(f"{row['layer']:>5} {row['depth_fraction']:>6.2f} {row['accuracy']:>7.3f} "
+              f"{row['entropy']:>8.3f} {row['ucs']:>7.3f}")
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        curve_path = os.path.splitext(args.output)[0] + ".curve.json"
+        with open(curve_path, "w") as f:
+            json.dump({"model": args.model_name, "data_path": args.data_path, "curve": curve}, f,
+                      indent=2)
+        print(f"Results saved to {args.output}, depth curve to {curve_path}")
+
+if __name__ == "__main__":
+    main()
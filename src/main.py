@@ -1,27 +1,33 @@
 # src/main.py
 
+import argparse
 import json
 from pathlib import Path
+import math
 import os
 import string
 
-from model_utils import load_model
-from multiple_choice import get_option_probabilities
-from capability_utils import compute_capability, compute_entropy
+from instrumentation import count, profile_run, stage
+
+# Heavy modules (numpy via capability_utils, torch / transformers via
+# model_utils and multiple_choice) are imported inside the functions that run
+# a model, so result-only commands such as --summarize start quickly.
+# benchmark_import_time.py keeps it that way.
 
 # Map "A"->0, "B"->1, ...
-ANSWER_MAP = {letter: idx for idx, letter in enumerate(string.ascii_uppercase[:6])}
+ANSWER_MAP = {letter: idx for idx, letter in enumerate(string.ascii_uppercase)}
 
 def parse_cosmosqa_item(item):
     context_str = item["context"]
     question_str = item["question"]
     combined_prompt = f"Context: {context_str}\nQuestion: {question_str}"
 
-    letter_order = ["A", "B", "C", "D", "E", "F"]
+    # However many lettered choices the item has (A-F for CosmosQA)
+    letter_order = sorted(item["choices"])
     choice_texts = [item["choices"][letter] for letter in letter_order]
 
     correct_letter = item["answer"]  # e.g. "B"
-    correct_idx = ANSWER_MAP[correct_letter]
+    correct_idx = letter_order.index(correct_letter)
 
     parsed_item = {
         "prompt": combined_prompt,
@@ -31,56 +37,363 @@ def parse_cosmosqa_item(item):
     }
     return parsed_item
 
-def main():
-    # 1. Load a large model or smaller model as needed
-    tokenizer, model = load_model(model_name="gpt2-medium", device="cuda")
-
-    # 2. Load the CosmosQA dataset
-    data_path = Path("data\hellaswag_10k.json")  # example path
-    with data_path.open("r") as f:
-        data = json.load(f)
-
-    # If cosmosqa_10k.json is a list of items,
-    # parse each item into our "mc_qa" structure
-    mc_qa_items = []
-    for item in data:
-        mc_qa_items.append(parse_cosmosqa_item(item))
+def evaluate_items(mc_qa_items, tokenizer, model, device="cuda", cache=None):
+    """
+    Score each parsed item and return one result dict per item
+    (probs, capability, entropy). With a result_cache.ResultCache, only
+    items missing from the cache are run through the model.
+    """
+    from multiple_choice import get_option_probabilities
 
-    # 3. Compute probabilities, capability, and uncertainty
     results = []
-    correct_count = 0
     for i, q_item in enumerate(mc_qa_items):
         prompt = q_item["prompt"]
         choices = q_item["choices"]
-        correct_idx = q_item["correct_idx"]
 
-        # get_option_probabilities from multiple_choice.py
-        prob_array = get_option_probabilities(prompt, choices, tokenizer, model)
+        prob_array = cache.get(prompt, choices) if cache is not None else None
+        if prob_array is None:
+            # get_option_probabilities from multiple_choice.py
+            prob_array = get_option_probabilities(prompt, choices, tokenizer, model, device=device)
+            if cache is not None:
+                cache.put(prompt, choices, prob_array)
+
+        results.append(build_result(q_item, prob_array))
+        count("items")
+    return results
+
+def evaluate_items_dedup(mc_qa_items, tokenizer, model, device="cuda", cache=None,
+                         share_prefix=False):
+    """
+    Same results as evaluate_items, but identical (prompt, choice) units are
+    scored once across the whole dataset (dedup.py).
+    """
+    from dedup import dedup_stats, format_stats, get_option_probabilities_dedup
+
+    print(format_stats("Dedup", dedup_stats(mc_qa_items)))
+    probs = [cache.get(q["prompt"], q["choices"]) if cache is not None else None
+             for q in mc_qa_items]
+    todo = [i for i, p in enumerate(probs) if p is None]
+    if todo:
+        scored, _ = get_option_probabilities_dedup([mc_qa_items[i] for i in todo], tokenizer,
+                                                   model, device=device,
+                                                   share_prefix=share_prefix)
+        for i, prob_array in zip(todo, scored):
+            probs[i] = prob_array
+            if cache is not None:
+                cache.put(mc_qa_items[i]["prompt"], mc_qa_items[i]["choices"], prob_array)
+
+    results = []
+    for q_item, prob_array in zip(mc_qa_items, probs):
+        results.append(build_result(q_item, prob_array))
+        count("items")
+    return results
 
-        cap = compute_capability(prob_array, correct_idx)
+def evaluate_items_capture(mc_qa_items, tokenizer, model, capture_dir, device="cuda",
+                           model_name=None):
+    """
+    Same results as evaluate_items, additionally writing per-token log-probs
+    and last-token hidden states to a memory-mapped store (feature_store.py).
+    """
+    from feature_store import capture_features
+    from multiple_choice import normalize_scores
+
+    scores = capture_features(mc_qa_items, tokenizer, model, capture_dir, device=device,
+                              model_name=model_name)
+    results = []
+    for q_item, prob_array in zip(mc_qa_items,
+                                  normalize_scores(scores, [q["choices"] for q in mc_qa_items])):
+        results.append(build_result(q_item, prob_array))
+        count("items")
+    print(f"Captured token log-probs and hidden states to {capture_dir}")
+    return results
+
+def build_result(q_item, prob_array):
+    """
+    Per-item result record written to the results JSON.
+    """
+    from capability_utils import compute_capability, compute_entropy
+
+    with stage("metrics"):
+        cap = compute_capability(prob_array, q_item["correct_idx"])
         ent = compute_entropy(prob_array)
 
-        result_dict = {
-            "id": q_item["id"],
-            "prompt": prompt,
-            "choices": choices,
-            "correct_idx": correct_idx,
-            "probs": prob_array.tolist(),
-            "capability": cap,
-            "entropy": ent
-        }
-        results.append(result_dict)
-        correct_count += cap
-
-    accuracy = correct_count / len(mc_qa_items) if mc_qa_items else 0.0
-    print(f"Overall Accuracy: {accuracy*100:.2f}%")
+    return {
+        "id": q_item["id"],
+        "prompt": q_item["prompt"],
+        "choices": q_item["choices"],
+        "correct_idx": q_item["correct_idx"],
+        "probs": prob_array.tolist(),
+        "capability": cap,
+        "entropy": float(ent)
+    }
+
+def item_entropy(result, normalize_entropy=False):
+    """
+    Stored entropy of a result record, optionally divided by log(k) for its
+    k choices (see capability_utils.compute_entropy).
+    """
+    ent = float(result["entropy"])
+    if normalize_entropy:
+        k = len(result["probs"])
+        ent = ent / math.log(k) if k > 1 else 0.0
+    return ent
+
+def summarize_results(results, alpha=0.3, normalize_entropy=False):
+    """
+    Mean accuracy, entropy and UCS over a list of per-item result dicts.
+    Plain Python on purpose (no numpy import on the --summarize path);
+    UCS follows capability_utils.compute_ucs.
+    """
+    n = len(results)
+    if not n:
+        return {"n_items": 0, "accuracy": 0.0, "entropy": 0.0, "ucs": 0.0}
+    cap_sum = ent_sum = ucs_sum = 0.0
+    for r in results:
+        cap, ent = float(r["capability"]), item_entropy(r, normalize_entropy)
+        cap_sum += cap
+        ent_sum += ent
+        ucs_sum += cap * (1.0 - alpha * ent)
+    return {
+        "n_items": n,
+        "accuracy": cap_sum / n,
+        "entropy": ent_sum / n,
+        "ucs": ucs_sum / n,
+    }
+
+def print_summary_table(paths, alpha=0.3, normalize_entropy=False):
+    """
+    Print one table row per existing result JSON.
+    """
+    print(f"| Results file | Items | Accuracy (C) | Entropy (U) | UCS (α={alpha}) |")
+    print("|--------------|------:|-------------:|------------:|------------:|")
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):  # --sequential output: {"sequential": ..., "results": [...]}
+            data = data["results"]
+        summary = summarize_results(data, alpha, normalize_entropy)
+        print(f"| {path} | {summary['n_items']} | {summary['accuracy']:.3f} | "
+              f"{summary['entropy']:.3f} | {summary['ucs']:.3f} |")
+
+def evaluate(args):
+    from model_utils import load_model
+
+    # 1. Load a large model or smaller model as needed
+    with stage("load_model"):
+        tokenizer, model = load_model(model_name=args.model_name, device=args.device,
+                                      revision=args.revision)
+
+    out_dir = os.path.dirname(args.output)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+
+    # 2. Load the dataset with its registered parser (dataset_registry.py)
+    from dataset_registry import infer_dataset, parse_items
+
+    data_path = Path(args.data_path)
+    dataset = args.dataset or infer_dataset(args.data_path)
+    if args.compiled:
+        evaluate_compiled(args, dataset, tokenizer, model)
+        return
+    with stage("load_data"), data_path.open("r") as f:
+        data = json.load(f)
+
+    # If the file is a list of items,
+    # parse each item into our "mc_qa" structure
+    mc_qa_items = parse_items(data, dataset)
+
+    if args.item_ids:
+        # Restrict to a subset, e.g. a subsample_planner.py plan
+        keep = load_item_ids(args.item_ids)
+        mc_qa_items = [q for q in mc_qa_items if str(q["id"]) in keep]
+        print(f"Evaluating {len(mc_qa_items)} items listed in {args.item_ids}")
+
+    if args.pipeline:
+        # 3+4. Tokenize, score and write concurrently, streaming results to disk
+        from pipeline import run_pipeline
+
+        summary = run_pipeline(mc_qa_items, tokenizer, model, args.output, device=args.device,
+                               batch_items=args.batch_items, queue_size=args.queue_size,
+                               alpha=args.alpha, normalize_entropy=args.normalize_entropy)
+        print_summary(summary, args.alpha)
+        busy = summary["busy_seconds"]
+        print(f"Pipeline: {summary['wall_seconds']:.1f}s wall, model busy "
+              f"{summary['inference_utilization']*100:.0f}% (tokenize {busy['tokenize']:.1f}s, "
+              f"inference {busy['inference']:.1f}s, write {busy['write']:.1f}s)")
+        print(f"Results saved to {args.output}")
+        return
+
+    if args.sequential:
+        # 3+4. Score in random order until the tau decision / CI width is reached
+        from sequential_eval import print_report, sequential_evaluate
+
+        results, unused, report = sequential_evaluate(
+            mc_qa_items, tokenizer, model, tau=args.tau, metric=args.sequential_metric,
+            target_width=args.ci_width, confidence=args.confidence, alpha=args.alpha,
+            batch_items=args.batch_items, min_items=args.min_items, seed=args.seed,
+            device=args.device, normalize_entropy=args.normalize_entropy)
+        print_report(report)
+        with stage("serialize"), open(args.output, "w") as f:
+            json.dump({"sequential": report, "results": results, "unused_results": unused},
+                      f, indent=2)
+        print(f"Results saved to {args.output}")
+        return
+
+    # 3. Compute probabilities, capability, and uncertainty
+    cache = None
+    if args.cache_dir:
+        from result_cache import ResultCache
+        cache = ResultCache.for_model(args.cache_dir, args.model_name, model,
+                                      revision=args.revision)
+    if args.capture_dir:
+        results = evaluate_items_capture(mc_qa_items, tokenizer, model, args.capture_dir,
+                                         device=args.device, model_name=args.model_name)
+    elif args.dedup:
+        results = evaluate_items_dedup(mc_qa_items, tokenizer, model, device=args.device,
+                                       cache=cache, share_prefix=args.share_prefix)
+    else:
+        results = evaluate_items(mc_qa_items, tokenizer, model, device=args.device, cache=cache)
+    if cache is not None:
+        print(cache.summary())
+    print_summary(summarize_results(results, args.alpha, args.normalize_entropy), args.alpha)
 
     # 4. Save results
-    os.makedirs("results", exist_ok=True)
-    out_file = "results/hellaswag_results_gpt2-medium.json"
-    with open(out_file, "w") as f:
+    with stage("serialize"), open(args.output, "w") as f:
         json.dump(results, f, indent=2)
-    print(f"Results saved to {out_file}")
+    print(f"Results saved to {args.output}")
+
+def load_item_ids(path):
+    """
+    Item ids (as strings) from a JSON list or a subsample_planner.py plan.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        keep = json.load(f)
+    return set(map(str, keep["item_ids"] if isinstance(keep, dict) else keep))
+
+def evaluate_compiled(args, dataset, tokenizer, model):
+    """
+    Score the precompiled array form of the dataset (dataset_registry.py):
+    tokenisation happens once per dataset/tokenizer, and the scoring loop
+    works on flat arrays only. Result records omit prompt and choice text.
+    """
+    from capability_utils import batch_capability, batch_entropy, pad_ragged
+    from dataset_registry import load_or_compile, score_compiled, select_items
+
+    with stage("load_data"):
+        compiled = load_or_compile(args.data_path, tokenizer, args.model_name, dataset)
+        if args.item_ids:
+            compiled = select_items(compiled, load_item_ids(args.item_ids))
+            print(f"Evaluating {len(compiled['item_ids'])} items listed in {args.item_ids}")
+    flat_probs = score_compiled(compiled, model, device=args.device)
+
+    with stage("metrics"):
+        # One masked pass over all items, whatever their number of choices
+        probs, mask = pad_ragged(flat_probs, compiled["n_choices"])
+        capability = batch_capability(probs, mask, compiled["correct_idx"])
+        entropy = batch_entropy(probs, mask)
+        results = [
+            {"id": item_id, "correct_idx": correct_idx, "probs": row[:k].tolist(),
+             "capability": cap, "entropy": ent}
+            for item_id, correct_idx, row, k, cap, ent in zip(
+                compiled["item_ids"].tolist(), compiled["correct_idx"].tolist(), probs,
+                compiled["n_choices"].tolist(), capability.tolist(), entropy.tolist())
+        ]
+    count("items", len(results))
+    print_summary(summarize_results(results, args.alpha, args.normalize_entropy), args.alpha)
+    with stage("serialize"), open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+def print_summary(summary, alpha):
+    print(f"Overall Accuracy: {summary['accuracy']*100:.2f}%")
+    print(f"Mean Entropy: {summary['entropy']:.3f}  Mean UCS (alpha={alpha}): {summary['ucs']:.3f}")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Multiple-choice capability / uncertainty evaluation.")
+    parser.add_argument("--model_name", default="gpt2-medium")
+    parser.add_argument("--revision", default=None,
+                        help="model revision (branch, tag or commit) to load")
+    parser.add_argument("--data_path", default="data/hellaswag_10k.json")
+    parser.add_argument("--dataset", default=None,
+                        help="registered parser name (default: inferred from --data_path)")
+    parser.add_argument("--compiled", action="store_true",
+                        help="tokenise the dataset once into arrays and score from them")
+    parser.add_argument("--output", default="results/hellaswag_results_gpt2-medium.json")
+    parser.add_argument("--alpha", type=float, default=0.3,
+                        help="uncertainty penalty in UCS = C * (1 - alpha * U)")
+    parser.add_argument("--normalize_entropy", action="store_true",
+                        help="use entropy / log(k) in summaries and UCS, for datasets with "
+                             "different numbers of choices")
+    parser.add_argument("--device", default="cuda")
+    parser.add_argument("--profile", choices=["none", "stages", "cprofile", "torch"], default="none",
+                        help="per-stage timers, optionally with cProfile or torch.profiler")
+    parser.add_argument("--trace_dir", default="results/profiles",
+                        help="where --profile writes its stage breakdown and trace files")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="overlap tokenization, batched inference and writing (pipeline.py)")
+    parser.add_argument("--batch_items", type=int, default=16,
+                        help="items per batch in --pipeline / --sequential mode")
+    parser.add_argument("--queue_size", type=int, default=4,
+                        help="batches buffered between --pipeline stages")
+    parser.add_argument("--sequential", action="store_true",
+                        help="score items in random order and stop early (sequential_eval.py)")
+    parser.add_argument("--tau", type=float, default=None,
+                        help="--sequential: stop once the metric is confidently above/below tau")
+    parser.add_argument("--ci_width", type=float, default=None,
+                        help="--sequential: stop once the confidence interval is this narrow")
+    parser.add_argument("--sequential_metric", choices=["capability", "ucs"], default="capability")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--min_items", type=int, default=1,
+                        help="--sequential: never stop before this many items")
+    parser.add_argument("--seed", type=int, default=0, help="--sequential: item order seed")
+    parser.add_argument("--item_ids", default=None,
+                        help="JSON list of item ids (or a subsample_planner.py plan) to evaluate")
+    parser.add_argument("--dedup", action="store_true",
+                        help="score each unique (prompt, choice) pair once (dedup.py)")
+    parser.add_argument("--share_prefix", action="store_true",
+                        help="with --dedup: run each shared prompt prefix through the model once")
+    parser.add_argument("--capture_dir", default=None,
+                        help="also store per-token log-probs and hidden states (feature_store.py)")
+    parser.add_argument("--cache_dir", default=None,
+                        help="reuse per-item scores across runs (result_cache.py; default and "
+                             "--dedup modes only)")
+    parser.add_argument("--summarize", nargs="+", metavar="RESULTS_JSON",
+                        help="only summarise existing result files (no model is loaded)")
+    args = parser.parse_args(argv)
+    if args.compiled:
+        # The compiled path scores the arrays directly and writes plain results
+        unsupported = [flag for flag, on in (("--pipeline", args.pipeline),
+                                             ("--sequential", args.sequential),
+                                             ("--dedup", args.dedup),
+                                             ("--share_prefix", args.share_prefix),
+                                             ("--cache_dir", args.cache_dir),
+                                             ("--capture_dir", args.capture_dir)) if on]
+        if unsupported:
+            parser.error(f"--compiled cannot be combined with {', '.join(unsupported)}")
+    if args.capture_dir:
+        # Capture scores every (prompt, choice) sequence itself, in the default loop
+        unsupported = [flag for flag, on in (("--dedup", args.dedup),
+                                             ("--share_prefix", args.share_prefix),
+                                             ("--pipeline", args.pipeline),
+                                             ("--sequential", args.sequential)) if on]
+        if unsupported:
+            parser.error(f"--capture_dir cannot be combined with {', '.join(unsupported)}")
+    if args.cache_dir:
+        # The cache is only consulted by the default and --dedup loops
+        unsupported = [flag for flag, on in (("--pipeline", args.pipeline),
+                                             ("--sequential", args.sequential),
+                                             ("--capture_dir", args.capture_dir)) if on]
+        if unsupported:
+            parser.error(f"--cache_dir cannot be combined with {', '.join(unsupported)}")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.summarize:
+        print_summary_table(args.summarize, args.alpha, args.normalize_entropy)
+        return
+    with profile_run(args.profile, args.trace_dir, device=args.device):
+        evaluate(args)
 
 if __name__ == "__main__":
     main()
@@ -1,15 +1,18 @@
 # src/model_utils.py
 
-import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM
+# torch / transformers are imported inside the functions so that modules
+# which only handle results (e.g. `main.py --summarize`) start quickly.
 
-def load_model(model_name="gpt2-medium", device="cuda"):
+def load_model(model_name="gpt2-medium", device="cuda", revision=None):
     """
     Load a pre-trained model and tokenizer from Hugging Face.
     Returns both the tokenizer and model, moved to the specified device.
+    `revision` pins a branch, tag or commit of the hub repository.
     """
-    tokenizer = AutoTokenizer.from_pretrained(model_name)
-    model = AutoModelForCausalLM.from_pretrained(model_name)
+    from transformers import AutoTokenizer, AutoModelForCausalLM
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name, revision=revision)
+    model = AutoModelForCausalLM.from_pretrained(model_name, revision=revision)
     model.to(device)
     model.eval()
     return tokenizer, model
@@ -18,6 +21,8 @@ def generate_text(prompt, tokenizer, model, max_length=50, device="cuda"):
     """
     Generates text from a given prompt using the loaded model.
     """
+    import torch
+
     inputs = tokenizer(prompt, return_tensors="pt").to(device)
     with torch.no_grad():
         outputs = model.generate(
@@ -28,4 +33,3 @@ def generate_text(prompt, tokenizer, model, max_length=50, device="cuda"):
             top_p=0.95
         )
     return tokenizer.decode(outputs[0], skip_special_tokens=True)
-
@@ -1,8 +1,9 @@
 # src/multiple_choice.py
 
-import torch
 import numpy as np
 
+from instrumentation import count, stage
+
 def get_option_probabilities(prompt, choices, tokenizer, model, device="cuda"):
     """
     For each choice in 'choices', we compute a log-prob of that choice token
@@ -12,27 +13,130 @@ def get_option_probabilities(prompt, choices, tokenizer, model, device="cuda"):
     For single-word choices, it's often okay. For multi-word, you'd want to
     sum log-probs of all tokens in the choice.
     """
+    import torch  # deferred: importing this module must stay cheap
 
     probs = []
     for choice in choices:
         prompt_text = f"{prompt}\nAnswer: {choice}"
-        inputs = tokenizer(prompt_text, return_tensors="pt").to(device)
-        with torch.no_grad():
-            outputs = model(**inputs)
+        with stage("tokenize"):
+            inputs = tokenizer(prompt_text, return_tensors="pt")
+        with stage("to_device"):
+            inputs = inputs.to(device)
+        with stage("forward"):
+            with torch.no_grad():
+                outputs = model(**inputs)
         # outputs.logits shape => [batch, seq_len, vocab_size]
 
-        # We'll take the last token's logit:
-        last_logits = outputs.logits[0, -1, :]  # shape [vocab_size]
+        with stage("extract"):
+            # We'll take the last token's logit:
+            last_logits = outputs.logits[0, -1, :]  # shape [vocab_size]
 
-        # Identify that last token's ID:
-        token_id = inputs["input_ids"][0, -1]
+            # Identify that last token's ID:
+            token_id = inputs["input_ids"][0, -1]
 
-        # Log probability:
-        log_prob = last_logits[token_id].item()
+            # Log probability:
+            log_prob = last_logits[token_id].item()
 
         probs.append(log_prob)
+        count("sequences")
+        count("tokens", inputs["input_ids"].shape[1])
 
-    # Convert logits to normal probabilities:
-    unnorm = np.exp(probs)          # exponentiate
-    normalized = unnorm / unnorm.sum()   # normalize
+    with stage("softmax"):
+        # Convert logits to normal probabilities:
+        unnorm = np.exp(probs)          # exponentiate
+        normalized = unnorm / unnorm.sum()   # normalize
     return normalized
+
+def tokenize_options(prompts, choices_list, tokenizer):
+    """
+    Token ids of every "{prompt}\nAnswer: {choice}" text, flattened in item
+    order (all choices of item 0, then item 1, ...).
+    """
+    texts = [f"{prompt}\nAnswer: {choice}"
+             for prompt, choices in zip(prompts, choices_list) for choice in choices]
+    with stage("tokenize"):
+        return tokenizer(texts)["input_ids"]
+
+def score_encoded(encoded, model, device="cuda", max_sequences=64):
+    """
+    Last-token logit score of each tokenised sequence (see
+    get_option_probabilities), computed in right-padded chunks of
+    `max_sequences`. Only the hidden state of each sequence's last real token
+    goes through the LM head, so the full [batch, seq_len, vocab] logits
+    tensor is never materialised.
+    """
+    scores = np.empty(len(encoded), dtype=np.float64)
+    for chunk in length_sorted_chunks(encoded, max_sequences):
+        input_ids, attention_mask, lengths = pad_sequences([encoded[i] for i in chunk], device)
+        with stage("forward"):
+            chunk_scores = last_token_scores(model, input_ids, attention_mask, lengths)
+        with stage("extract"):
+            scores[chunk] = chunk_scores.float().cpu().numpy()
+        count("sequences", len(chunk))
+        count("tokens", sum(lengths))
+    return scores
+
+def length_sorted_chunks(encoded, max_sequences):
+    """
+    Index chunks of at most `max_sequences`, longest sequences first so each
+    chunk pads to similar lengths.
+    """
+    order = sorted(range(len(encoded)), key=lambda i: -len(encoded[i]))
+    return [order[start:start + max_sequences] for start in range(0, len(order), max_sequences)]
+
+def pad_sequences(sequences, device="cuda"):
+    """
+    Right-padded input_ids / attention_mask tensors on `device`, plus lengths.
+    """
+    import torch
+
+    lengths = [len(seq) for seq in sequences]
+    with stage("to_device"):
+        input_ids = torch.zeros((len(sequences), max(lengths)), dtype=torch.long)
+        attention_mask = torch.zeros((len(sequences), max(lengths)), dtype=torch.long)
+        for row, seq in enumerate(sequences):
+            input_ids[row, :lengths[row]] = torch.as_tensor(seq)
+            attention_mask[row, :lengths[row]] = 1
+        return input_ids.to(device), attention_mask.to(device), lengths
+
+def last_token_scores(model, input_ids, attention_mask, lengths):
+    """
+    Logit of each row's last real token at its own position (see
+    get_option_probabilities), applying the LM head to those positions only.
+    """
+    import torch
+
+    with torch.no_grad():
+        hidden = model.base_model(input_ids=input_ids,
+                                  attention_mask=attention_mask).last_hidden_state
+        rows = torch.arange(len(lengths), device=hidden.device)
+        last = torch.as_tensor(lengths, device=hidden.device) - 1
+        last_logits = model.get_output_embeddings()(hidden[rows, last])  # [rows, vocab]
+        return last_logits[rows, input_ids[rows, last]]
+
+def normalize_scores(scores, choices_list):
+    """
+    Split flat scores back into items and normalise each item's scores the
+    same way as get_option_probabilities (shifted by the max for safety).
+    """
+    with stage("softmax"):
+        results = []
+        offset = 0
+        for choices in choices_list:
+            item_scores = scores[offset:offset + len(choices)]
+            offset += len(choices)
+            unnorm = np.exp(item_scores - item_scores.max())
+            results.append(unnorm / unnorm.sum())
+    return results
+
+def get_option_probabilities_batch(prompts, choices_list, tokenizer, model, device="cuda",
+                                   max_sequences=64):
+    """
+    Batched version of get_option_probabilities for many items at once:
+    tokenize_options -> score_encoded -> normalize_scores.
+
+    Returns a list with one normalised probability array per item.
+    """
+    encoded = tokenize_options(prompts, choices_list, tokenizer)
+    scores = score_encoded(encoded, model, device=device, max_sequences=max_sequences)
+    return normalize_scores(scores, choices_list)
@@ -0,0 +1,184 @@
+# src/phase_surface.py
+
+"""
+Measured phase-transition surface: emergent fraction over (log params, tau).
+
+For each evaluated (model, task) the empirical survival function
+
+    F(tau) = P(UCS >= tau) = 1 - empirical CDF of the per-item UCS
+
+is evaluated on a tau grid (one binary search per file through its
+UCSIndex, or a slice of a precomputed emergence surface). Per task, the
+models are placed at log10(parameters) (models of equal size averaged) and
+every tau column is interpolated linearly onto a fine log-params grid in one
+vectorised step, flat outside the evaluated range. The surface
+[task, log_params, tau] goes to results/phase_surface.npz, which
+Appendix Plots/theoritical_bound.py draws when it exists.
+
+Building from an emergence surface takes well under a second; reading raw
+result files is bound by JSON parsing (about 30 ms per 10k-item file).
+
+Usage:
+    python src/phase_surface.py --results_dir results
+    python src/phase_surface.py --emergence_surface results/emergence_surface.npz --alpha 0.3
+"""
+
+import argparse
+import math
+import os
+import time
+
+import numpy as np
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "results",
+                              "phase_surface.npz")
+TAU_POINTS = 201
+GRID_POINTS = 256
+
+def _model_key(name):
+    return name.strip("/").replace("--", "/").rsplit("/", 1)[-1].lower()
+
+def model_params(models, overrides=None, records=None):
+    """
+    {model: parameters in millions} from the results catalog (matched on the
+    lower-cased name after any org/ prefix) and `overrides`. Models with no
+    known size are left out.
+    """
+    if records is None:
+        from results_catalog import load_records
+        records = load_records()
+    known = {_model_key(r["model"]): r["param_count"] for r in records}
+    known.update({_model_key(k): v for k, v in (overrides or {}).items()})
+    return {m: known[_model_key(m)] for m in models if _model_key(m) in known}
+
+def interpolate_log_params(x, values, grid):
+    """
+    values [M, ...] observed at x [M] -> [len(grid), ...], linear in x with
+    duplicates averaged and flat extrapolation.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    ux, inverse = np.unique(x, return_inverse=True)
+    sums = np.zeros((len(ux),) + values.shape[1:])
+    np.add.at(sums, inverse, values)
+    mean = sums / np.bincount(inverse).reshape((-1,) + (1,) * (values.ndim - 1))
+    if len(ux) == 1:
+        return np.broadcast_to(mean[0], (len(grid),) + mean.shape[1:]).copy()
+    hi = np.clip(np.searchsorted(ux, grid), 1, len(ux) - 1)
+    w = np.clip((grid - ux[hi - 1]) / (ux[hi] - ux[hi - 1]), 0.0, 1.0)
+    w = w.reshape((-1,) + (1,) * (values.ndim - 1))
+    return mean[hi - 1] * (1.0 - w) + mean[hi] * w
+
+def survival_from_files(files, alpha, taus, normalize_entropy=False):
+    """
+    (models, tasks, fraction [M, D, T], present [M, D]) from
+    [(dataset, model, path)] result files.
+    """
+    from ucs_index import load_index
+
+    models = sorted({m for _, m, _ in files})
+    tasks = sorted({d for d, _, _ in files})
+    fraction = np.zeros((len(models), len(tasks), len(taus)))
+    present = np.zeros((len(models), len(tasks)), dtype=bool)
+    for dataset, model, path in files:
+        i, j = models.index(model), tasks.index(dataset)
+        fraction[i, j] = load_index(path, normalize_entropy).fraction_above(alpha, taus)
+        present[i, j] = True
+    return models, tasks, fraction, present
+
+def survival_from_emergence_surface(surface, alpha):
+    """
+    The same, sliced from an emergence_surface.py array at the nearest alpha.
+    """
+    from emergence_surface import SCALE, nearest
+
+    a = nearest(surface["alphas"], alpha)
+    return (list(surface["models"]), list(surface["datasets"]),
+            surface["fraction"][:, :, a, :] / SCALE, surface["present"], surface["taus"],
+            float(surface["alphas"][a]))
+
+def build_phase_surface(models, tasks, fraction, present, params, taus, alpha,
+                        grid_points=GRID_POINTS):
+    """
+    Surface dict: `surface` [task, log_params, tau] on `grid` (log10 params)
+    plus the per-model observations it was interpolated from.
+    """
+    keep = [i for i, m in enumerate(models) if m in params]
+    models = [models[i] for i in keep]
+    fraction, present = fraction[keep], present[keep]
+    x = np.array([math.log10(params[m] * 1e6) for m in models])
+    grid = np.linspace(x.min(), x.max(), grid_points)
+    surface = np.full((len(tasks), grid_points, len(taus)), np.nan, dtype=np.float32)
+    for j in range(len(tasks)):
+        rows = present[:, j]
+        if rows.any():
+            surface[j] = interpolate_log_params(x[rows], fraction[rows, j], grid)
+    return {
+        "tasks": np.array(tasks), "models": np.array(models), "log_params": x,
+        "grid": grid, "taus": np.asarray(taus, dtype=np.float64), "alpha": np.array(alpha),
+        "surface": surface, "fraction": fraction.astype(np.float32), "present": present,
+    }
+
+def load_phase_surface(path=DEFAULT_OUTPUT):
+    with np.load(path) as npz:
+        return {key: npz[key] for key in npz.files}
+
+def _parse_params(values):
+    out = {}
+    for value in values or ():
+        name, _, millions = value.rpartition("=")
+        if not name:
+            raise argparse.ArgumentTypeError(f"expected name=millions, got {value!r}")
+        out[name] = float(millions)
+    return out
+
+def main():
+    parser = argparse.ArgumentParser(description="Measured phase-transition surface.")
+    parser.add_argument("--results_dir", default="results")
+    parser.add_argument("--emergence_surface", default=None,
+                        help="slice this emergence_surface.py array instead of reading result files")
+    parser.add_argument("--alpha", type=float, default=0.3)
+    parser.add_argument("--normalize_entropy", action="store_true")
+    parser.add_argument("--params", nargs="+", default=None,
+                        help="name=millions for models missing from the results catalog")
+    parser.add_argument("--grid_points", type=int, default=GRID_POINTS)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.emergence_surface:
+        from emergence_surface import load_surface
+
+        models, tasks, fraction, present, taus, alpha = survival_from_emergence_surface(
+            load_surface(args.emergence_surface), args.alpha)
+    else:
+        from ucs_index import find_result_files
+
+        files = find_result_files(args.results_dir)
+        if not files:
+            raise SystemExit(f"no result files under {args.results_dir}")
+        taus, alpha = np.linspace(0.0, 1.0, TAU_POINTS), args.alpha
+        models, tasks, fraction, present = survival_from_files(files, alpha, taus,
+                                                               args.normalize_entropy)
+    loaded = time.perf_counter()
+
+    params = model_params(models, _parse_params(args.params))
+    sized = time.perf_counter()
+    missing = [m for m in models if m not in params]
+    if missing:
+        print(f"skipping models of unknown size (pass --params name=millions): {', '.join(missing)}")
+    if not params:
+        raise SystemExit("no model with a known parameter count")
+    surface = build_phase_surface(models, tasks, fraction, present, params, taus, alpha,
+                                  args.grid_points)
+    built = time.perf_counter()
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    np.savez_compressed(args.output, **surface)
+
+    print(f"{len(surface['models'])} models x {len(tasks)} tasks -> surface "
+          f"{surface['surface'].shape} (task, log params, tau) at alpha = {alpha:g}")
+    print(f"read {loaded - start:.2f}s, model sizes {sized - loaded:.2f}s, "
+          f"surface {(built - sized) * 1e3:.1f} ms; saved {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# src/pipeline.py
+
+"""
+Pipelined evaluation: tokenizer -> inference -> writer stages connected by
+bounded asyncio queues.
+
+Each stage runs its blocking work on its own thread (tokenizers and torch
+release the GIL), so while the model runs batch k the tokenizer is already
+preparing batch k+1 and the writer is serialising batch k-1. The bounded
+queues give backpressure: a slow writer stalls inference instead of letting
+results pile up in memory.
+
+Results are streamed to the output file in the same JSON layout as
+`json.dump(results, f, indent=2)` in main.py.
+"""
+
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import count
+from main import build_result, item_entropy
+from multiple_choice import normalize_scores, score_encoded, tokenize_options
+
+_DONE = object()
+
+class _JSONArrayWriter:
+    """
+    Writes list elements one at a time, byte-identical to json.dump(list, indent=2).
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.n = 0
+
+    def write(self, obj):
+        self.f.write("[\n" if self.n == 0 else ",\n")
+        self.f.write("  " + json.dumps(obj, indent=2).replace("\n", "\n  "))
+        self.n += 1
+
+    def close(self):
+        self.f.write("\n]" if self.n else "[]")
+
+async def _tokenize_stage(items, tokenizer, batch_items, out_q, executor, busy):
+    loop = asyncio.get_running_loop()
+    for start in range(0, len(items), batch_items):
+        batch = items[start:start + batch_items]
+        t0 = time.perf_counter()
+        encoded = await loop.run_in_executor(
+            executor, tokenize_options,
+            [it["prompt"] for it in batch], [it["choices"] for it in batch], tokenizer)
+        busy["tokenize"] += time.perf_counter() - t0
+        await out_q.put((batch, encoded))
+    await out_q.put(_DONE)
+
+async def _inference_stage(in_q, out_q, model, device, max_sequences, executor, busy):
+    loop = asyncio.get_running_loop()
+    while True:
+        message = await in_q.get()
+        if message is _DONE:
+            await out_q.put(_DONE)
+            return
+        batch, encoded = message
+        t0 = time.perf_counter()
+        scores = await loop.run_in_executor(
+            executor, score_encoded, encoded, model, device, max_sequences)
+        busy["inference"] += time.perf_counter() - t0
+        await out_q.put((batch, scores))
+
+def _write_batch(batch, scores, writer, totals, alpha, normalize_entropy):
+    probs = normalize_scores(scores, [it["choices"] for it in batch])
+    for q_item, prob_array in zip(batch, probs):
+        result = build_result(q_item, prob_array)
+        writer.write(result)
+        totals["n_items"] += 1
+        totals["capability"] += result["capability"]
+        ent = item_entropy(result, normalize_entropy)
+        totals["entropy"] += ent
+        totals["ucs"] += result["capability"] * (1.0 - alpha * ent)
+        count("items")
+
+async def _writer_stage(in_q, writer, totals, alpha, normalize_entropy, executor, busy):
+    loop = asyncio.get_running_loop()
+    while True:
+        message = await in_q.get()
+        if message is _DONE:
+            return
+        batch, scores = message
+        t0 = time.perf_counter()
+        await loop.run_in_executor(executor, _write_batch, batch, scores, writer, totals, alpha,
+                                   normalize_entropy)
+        busy["write"] += time.perf_counter() - t0
+
+async def _run(items, tokenizer, model, writer, device, batch_items, queue_size,
+               max_sequences, alpha, normalize_entropy, totals, busy):
+    token_q = asyncio.Queue(maxsize=queue_size)
+    score_q = asyncio.Queue(maxsize=queue_size)
+    executors = [ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+                 for name in ("tokenize", "inference", "write")]
+    tasks = [
+        asyncio.ensure_future(_tokenize_stage(items, tokenizer, batch_items, token_q,
+                                              executors[0], busy)),
+        asyncio.ensure_future(_inference_stage(token_q, score_q, model, device, max_sequences,
+                                               executors[1], busy)),
+        asyncio.ensure_future(_writer_stage(score_q, writer, totals, alpha, normalize_entropy,
+                                            executors[2], busy)),
+    ]
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in pending:  # a stage failed: stop the others
+            task.cancel()
+        for task in done:
+            task.result()
+    finally:
+        for executor in executors:
+            executor.shutdown(wait=True)
+
+def run_pipeline(items, tokenizer, model, out_path, device="cuda", batch_items=16,
+                 queue_size=4, max_sequences=64, alpha=0.3, normalize_entropy=False):
+    """
+    Evaluate parsed items with overlapping tokenization, inference and writing,
+    streaming per-item results to `out_path`.
+
+    Returns the same summary keys as main.summarize_results plus per-stage
+    busy seconds and the share of wall time the model was busy.
+    """
+    totals = {"n_items": 0, "capability": 0.0, "entropy": 0.0, "ucs": 0.0}
+    busy = {"tokenize": 0.0, "inference": 0.0, "write": 0.0}
+    start = time.perf_counter()
+    with open(out_path, "w") as f:
+        writer = _JSONArrayWriter(f)
+        asyncio.run(_run(items, tokenizer, model, writer, device, batch_items, queue_size,
+                         max_sequences, alpha, normalize_entropy, totals, busy))
+        writer.close()
+    wall = time.perf_counter() - start
+
+    n = totals["n_items"]
+    return {
+        "n_items": n,
+        "accuracy": totals["capability"] / n if n else 0.0,
+        "entropy": totals["entropy"] / n if n else 0.0,
+        "ucs": totals["ucs"] / n if n else 0.0,
+        "wall_seconds": wall,
+        "busy_seconds": busy,
+        "inference_utilization": busy["inference"] / wall if wall else 0.0,
+    }
@@ -0,0 +1,169 @@
+# src/render_figures.py
+
+"""
+Batch, headless rendering of every figure script in `Appendix Plots/` and
+`some figures code/`.
+
+Scripts that expose `figure_jobs()` are rendered per figure through the
+content-hash cache in figure_cache.py. Other scripts are executed whole as
+`__main__` with the Agg backend; `plt.show()` is turned into "save any figure
+the script did not save itself, then close".
+
+Usage:
+    python src/render_figures.py [--workers N] [--force] [--only NAME]
+"""
+
+import argparse
+import ast
+import os
+import runpy
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from figure_cache import DEFAULT_SAVEFIG, build_figures, load_script, use_headless_backend
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIGURE_DIRS = ["Appendix Plots", "some figures code"]
+
+# Not figure scripts.
+EXCLUDE = {"streamlit_emergence.py"}
+
+# Scripts that write repo-relative paths (e.g. "results/figures/...") and
+# must run from the repository root; all others run from their own folder.
+RUN_FROM_ROOT = {"analysis_plot.py"}
+
+def discover_scripts(only=None):
+    """
+    List (script path, working directory, has figure_jobs) for every figure
+    script, without importing them.
+    """
+    scripts = []
+    for folder in FIGURE_DIRS:
+        directory = os.path.join(REPO_ROOT, folder)
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(".py") or name in EXCLUDE:
+                continue
+            if only and only not in name:
+                continue
+            path = os.path.join(directory, name)
+            with open(path, "r", encoding="utf-8") as f:
+                tree = ast.parse(f.read())
+            has_jobs = any(
+                isinstance(node, ast.FunctionDef) and node.name == "figure_jobs"
+                for node in tree.body
+            )
+            cwd = REPO_ROOT if name in RUN_FROM_ROOT else directory
+            scripts.append((path, cwd, has_jobs))
+    return scripts
+
+def collect_jobs(script, cwd):
+    """
+    Call a script's `figure_jobs()` from its working directory so relative
+    output names resolve where the script itself would write them.
+    """
+    previous = os.getcwd()
+    os.chdir(cwd)
+    try:
+        return load_script(script).figure_jobs()
+    finally:
+        os.chdir(previous)
+
+def run_script(script, cwd):
+    """
+    Execute a whole plotting script headlessly. Returns a list of
+    (output, seconds) with the time spent building each saved figure.
+    """
+    use_headless_backend()
+    import matplotlib.pyplot as plt
+    from matplotlib.figure import Figure
+
+    stem = os.path.splitext(os.path.basename(script))[0]
+    timings = []
+    mark = [time.perf_counter()]
+    original_savefig, original_show = Figure.savefig, plt.show
+
+    def savefig(fig, fname, *args, **kwargs):
+        original_savefig(fig, fname, *args, **kwargs)
+        fig._render_saved = True
+        now = time.perf_counter()
+        timings.append((os.path.abspath(str(fname)), now - mark[0]))
+        mark[0] = now
+
+    def show(*args, **kwargs):
+        for num in plt.get_fignums():
+            fig = plt.figure(num)
+            if not getattr(fig, "_render_saved", False):
+                fig.savefig(f"{stem}_{num}.png", **DEFAULT_SAVEFIG)
+        plt.close("all")
+
+    Figure.savefig, plt.show = savefig, show
+    previous = os.getcwd()
+    os.chdir(cwd)
+    try:
+        runpy.run_path(script, run_name="__main__")
+        show()
+    finally:
+        os.chdir(previous)
+        Figure.savefig, plt.show = original_savefig, original_show
+    return timings
+
+def render_all(workers=None, force=False, only=None):
+    """
+    Render every discovered figure across one process pool.
+    Returns a list of (output, status, seconds); a failing script or figure
+    is reported with a "failed: ..." status and the others carry on.
+    """
+    use_headless_backend()
+    scripts = discover_scripts(only)
+    jobs = []
+    report = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=use_headless_backend) as pool:
+        # Whole-script jobs are queued first; cached per-figure jobs share the pool.
+        futures = {}
+        for script, cwd, has_jobs in scripts:
+            if has_jobs:
+                try:
+                    jobs.extend(collect_jobs(script, cwd))
+                except Exception as exc:
+                    report.append((script, f"failed: {os.path.basename(script)}: "
+                                           f"{type(exc).__name__}: {exc}", 0.0))
+            else:
+                futures[script] = pool.submit(run_script, script, cwd)
+        report.extend(build_figures(jobs, force=force, verbose=False, executor=pool))
+        for script, future in futures.items():
+            try:
+                for output, seconds in future.result():
+                    report.append((output, "rendered", seconds))
+            except Exception as exc:
+                report.append((script, f"failed: {os.path.basename(script)}: "
+                                       f"{type(exc).__name__}: {exc}", 0.0))
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Render all figures headlessly.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of render processes (default: one per CPU)")
+    parser.add_argument("--force", action="store_true",
+                        help="ignore the figure cache and re-render everything")
+    parser.add_argument("--only", default=None,
+                        help="only scripts whose file name contains this string")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    report = render_all(workers=args.workers, force=args.force, only=args.only)
+    wall = time.perf_counter() - start
+
+    failed = [(output, status) for output, status, _ in report if status.startswith("failed")]
+    print(f"{'seconds':>8}  {'status':<8}  figure")
+    for output, status, seconds in sorted(report, key=lambda r: -r[2]):
+        print(f"{seconds:>8.2f}  {status.split(':')[0]:<8}  {os.path.relpath(output, REPO_ROOT)}")
+    for output, status in failed:
+        print(f"\n{os.path.relpath(output, REPO_ROOT)} {status}")
+    n_rendered = sum(1 for _, status, _ in report if status == "rendered")
+    print(f"\n{n_rendered} rendered, {len(report) - n_rendered - len(failed)} up to date, "
+          f"{len(failed)} failed in {wall:.1f}s wall time.")
+    if failed:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# src/result_cache.py
+
+"""
+Content-addressed cache of per-item scores, shared across runs.
+
+An entry is the choice log-prob vector (log of the normalised option
+probabilities) of one (prompt, choices) pair under one scoring setup:
+
+    <root>/<model>/<revision>/<dtype>/<mode>/<ab>/<sha256>.json
+
+where <sha256> hashes the prompt and the ordered choices, and <ab> is its
+first two hex digits. Re-running a model/dataset pair therefore only scores
+items that are new or whose text changed. Each entry is its own file written
+atomically, so several runs can share a cache, and cache directories from
+different machines can be merged with a plain copy or rsync.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+def _slug(value):
+    return str(value).strip("/").replace("/", "--") or "_"
+
+def item_hash(prompt, choices):
+    payload = json.dumps([prompt, list(choices)], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def model_revision(model, revision=None):
+    """
+    Explicit revision, else the hub commit hash transformers recorded when
+    loading, else "local".
+    """
+    if revision:
+        return revision
+    return getattr(model.config, "_commit_hash", None) or "local"
+
+def model_dtype(model):
+    return str(next(model.parameters()).dtype).replace("torch.", "")
+
+class ResultCache:
+    """
+    Cache for one (model, revision, dtype, scoring mode) combination.
+    """
+
+    def __init__(self, root, model_name, revision, dtype, mode):
+        self.dir = os.path.join(root, _slug(model_name), _slug(revision), _slug(dtype), _slug(mode))
+        self.meta = {"model": model_name, "revision": revision, "dtype": dtype, "mode": mode}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def for_model(cls, root, model_name, model, mode="last_token_logit", revision=None):
+        return cls(root, model_name, model_revision(model, revision), model_dtype(model), mode)
+
+    def _path(self, key):
+        return os.path.join(self.dir, key[:2], key + ".json")
+
+    def get(self, prompt, choices):
+        """
+        Cached normalised probabilities for the item, or None.
+        """
+        try:
+            with open(self._path(item_hash(prompt, choices)), "r", encoding="utf-8") as f:
+                logprobs = np.asarray(json.load(f)["logprobs"], dtype=np.float64)
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        probs = np.exp(logprobs - logprobs.max())
+        return probs / probs.sum()
+
+    def put(self, prompt, choices, prob_array):
+        key = item_hash(prompt, choices)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        logprobs = np.log(np.clip(np.asarray(prob_array, dtype=np.float64), 1e-300, None))
+        entry = dict(self.meta, key=key, n_choices=len(choices), logprobs=logprobs.tolist())
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)  # atomic: concurrent readers never see half an entry
+
+    def summary(self):
+        total = self.hits + self.misses
+        return f"Result cache {self.dir}: {self.hits}/{total} hits, {self.misses} scored"
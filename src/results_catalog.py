@@ -0,0 +1,98 @@
+# src/results_catalog.py
+
+"""
+One place to read the (dataset, model, param_count, acc, ent, ucs) records
+behind the scaling figures.
+
+The records come from `data_records` in results/final_plot.py (param_count
+in millions), optionally extended with main.py result files via
+`record_from_results`. Records built from result files keep their path, so
+UCS at any alpha is recomputed exactly from the per-item results; for the
+aggregate records UCS(alpha) is approximated by acc * (1 - alpha * ent),
+which reproduces their stored alpha = 0.3 values.
+"""
+
+import ast
+import json
+import math
+import os
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+FINAL_PLOT = os.path.join(ROOT, "results", "final_plot.py")
+DEFAULT_ALPHA = 0.3
+
+def load_records(path=FINAL_PLOT):
+    """
+    `data_records` of a plotting script (default: results/final_plot.py).
+    A literal list is read from the source without running the script (and
+    importing matplotlib); anything else falls back to importing it.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    for node in tree.body:
+        if (isinstance(node, ast.Assign)
+                and any(isinstance(t, ast.Name) and t.id == "data_records" for t in node.targets)):
+            try:
+                return [dict(r) for r in ast.literal_eval(node.value)]
+            except ValueError:
+                break
+
+    from figure_cache import load_script
+
+    return [dict(r) for r in load_script(os.path.abspath(path)).data_records]
+
+def record_from_results(path, dataset, model, param_count, alpha=DEFAULT_ALPHA):
+    """
+    Catalog record summarising one main.py result file (param_count in millions).
+    """
+    from main import summarize_results
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    results = data["results"] if isinstance(data, dict) else data
+    summary = summarize_results(results, alpha)
+    return {
+        "dataset": dataset, "model": model, "param_count": param_count,
+        "acc": summary["accuracy"], "ent": summary["entropy"], "ucs": summary["ucs"],
+        "n_items": summary["n_items"], "results_path": os.path.abspath(path),
+    }
+
+def metric_value(record, metric, alpha=DEFAULT_ALPHA):
+    """
+    acc / ent / ucs of a record; UCS at any alpha (see module docstring).
+    """
+    if metric != "ucs":
+        return record[metric]
+    if alpha is None or math.isclose(alpha, record.get("alpha", DEFAULT_ALPHA)):
+        return record["ucs"]
+    if "results_path" in record:
+        from main import summarize_results
+
+        with open(record["results_path"], "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return summarize_results(data["results"] if isinstance(data, dict) else data, alpha)["ucs"]
+    return record["acc"] * (1.0 - alpha * record["ent"])
+
+def datasets(records):
+    return sorted({r["dataset"] for r in records})
+
+def curves(records, metrics=("acc", "ucs"), alphas=(DEFAULT_ALPHA,)):
+    """
+    One curve per (dataset, metric, alpha): x = log10(parameters), y = metric,
+    sorted by size. Accuracy curves do not depend on alpha and appear once.
+    """
+    out = []
+    for ds in datasets(records):
+        rows = sorted((r for r in records if r["dataset"] == ds), key=lambda r: r["param_count"])
+        for metric in metrics:
+            for alpha in (alphas if metric == "ucs" else (None,)):
+                out.append({
+                    "dataset": ds,
+                    "metric": metric,
+                    "alpha": alpha,
+                    "models": [r["model"] for r in rows],
+                    "x": [math.log10(r["param_count"] * 1e6) for r in rows],
+                    "y": [metric_value(r, metric, alpha) for r in rows],
+                    "n_items": [r.get("n_items") for r in rows],
+                })
+    return out
@@ -0,0 +1,265 @@
+# src/scale_selection.py
+
+"""
+Active scale selection: which model to evaluate next, and on how many items.
+
+For every task, UCS against x = log10(parameters) is modelled as a Gaussian
+process whose kernel is a Bayesian linear trend (broad priors on offset and
+slope, so extrapolation stays uncertain) plus an RBF term for curvature,
+fitted to the results catalog.
+Two noise terms enter each observation:
+
+    model_sd^2     spread between checkpoints of the same size (fitted)
+    var_item / n   sampling noise of an n-item evaluation; per-item UCS lies
+                   in [0, 1], so var_item <= y (1 - y) is used as a bound
+
+The emergence threshold is the smallest size at which the curve reaches
+tau. Posterior samples on a grid give its distribution (binned, with an
+extra "not reached in range" bin). The value of evaluating candidate c on n
+items is the expected drop in the entropy of that distribution. It is
+estimated by updating the same posterior samples with simulated
+observations at c (pathwise conditioning), with common random numbers
+across candidates, so the ranking is not dominated by Monte Carlo noise.
+Candidates are ranked by bits gained per unit cost (params_B x items / 1000).
+
+Usage:
+    python src/scale_selection.py --tau 0.3 --alpha 0.3
+    python src/scale_selection.py --candidates EleutherAI/pythia-2.8b=2780 facebook/opt-2.7b=2650
+"""
+
+import argparse
+import itertools
+import json
+import math
+
+import numpy as np
+
+DEFAULT_CANDIDATES = {
+    "EleutherAI/pythia-410m": 405,
+    "EleutherAI/pythia-1b": 1010,
+    "EleutherAI/pythia-1.4b": 1410,
+    "EleutherAI/pythia-2.8b": 2780,
+    "facebook/opt-2.7b": 2650,
+    "microsoft/phi-2": 2780,
+    "EleutherAI/pythia-6.9b": 6860,
+    "EleutherAI/pythia-12b": 11850,
+    "meta-llama/Llama-2-13b-hf": 13000,
+}  # millions of parameters
+DEFAULT_N_ITEMS = (250, 500, 1000, 2500, 5000, 10000)
+HYPER_GRID = {
+    "length": (0.25, 0.5, 1.0, 2.0),  # decades
+    "scale": (0.01, 0.03, 0.1, 0.3),
+    "model_sd": (0.003, 0.01, 0.02, 0.04),
+}
+TREND_SD = (0.3, 0.3)  # prior sd of the offset and of the slope per decade
+GRID_STEP = 0.025  # decades between grid points
+BIN_WIDTH = 0.1  # decades per threshold bin
+
+def rbf(a, b, scale, length):
+    return scale ** 2 * np.exp(-0.5 * (a[:, None] - b[None, :]) ** 2 / length ** 2)
+
+def kernel(a, b, gp):
+    """
+    Linear trend around the observed mean size plus RBF.
+    """
+    offset_sd, slope_sd = TREND_SD
+    trend = offset_sd ** 2 + slope_sd ** 2 * (a[:, None] - gp["x_mean"]) * (b[None, :] - gp["x_mean"])
+    return trend + rbf(a, b, gp["scale"], gp["length"])
+
+def fit_gp(x, y, item_var):
+    """
+    Constant mean at the observed average, then the (length, scale,
+    model_sd) on HYPER_GRID with the highest marginal likelihood.
+    """
+    y_mean = float(y.mean())
+    resid = y - y_mean
+    combos = list(itertools.product(*HYPER_GRID.values()))
+    cov = np.stack([kernel(x, x, {"x_mean": x.mean(), "scale": scale, "length": length})
+                    + np.diag(item_var + model_sd ** 2) for length, scale, model_sd in combos])
+    chol = np.linalg.cholesky(cov)
+    alpha = np.linalg.solve(chol, np.broadcast_to(resid[:, None], (len(combos), len(x), 1)))[..., 0]
+    log_lik = (-0.5 * (alpha ** 2).sum(1) - np.log(np.diagonal(chol, axis1=1, axis2=2)).sum(1)
+               - 0.5 * len(x) * math.log(2 * math.pi))
+    length, scale, model_sd = combos[int(np.argmax(log_lik))]
+    return {"y_mean": y_mean, "x_mean": float(x.mean()), "length": length, "scale": scale,
+            "model_sd": model_sd, "x": x, "resid": resid, "noise": item_var + model_sd ** 2,
+            "log_lik": float(log_lik.max())}
+
+def posterior(gp, z):
+    """
+    Posterior mean and covariance of the latent curve at points z.
+    """
+    k_xx = kernel(gp["x"], gp["x"], gp) + np.diag(gp["noise"])
+    k_zx = kernel(z, gp["x"], gp)
+    mean = gp["y_mean"] + k_zx @ np.linalg.solve(k_xx, gp["resid"])
+    cov = kernel(z, z, gp) - k_zx @ np.linalg.solve(k_xx, k_zx.T)
+    return mean, cov
+
+def threshold_bins(samples, grid, tau):
+    """
+    Threshold bin of each sample path ([..., G] over `grid`); the last bin
+    (index n_bins - 1) means tau is not reached in range.
+    """
+    above = samples >= tau
+    first = np.argmax(above, axis=-1)
+    n_bins = int(math.ceil((grid[-1] - grid[0]) / BIN_WIDTH)) + 1
+    bins = np.minimum(((grid[first] - grid[0]) / BIN_WIDTH).astype(int), n_bins - 2)
+    return np.where(above.any(-1), bins, n_bins - 1), n_bins
+
+def entropy_bits(bins, n_bins):
+    """
+    Entropy (bits) of the bin histogram along the last axis.
+    """
+    counts = np.apply_along_axis(np.bincount, -1, bins, minlength=n_bins)
+    p = counts / counts.sum(-1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return -np.where(p > 0, p * np.log2(p), 0.0).sum(-1)
+
+def task_recommendations(x, y, n_items, candidates, tau, n_item_grid=DEFAULT_N_ITEMS,
+                         n_samples=512, n_fantasies=32, seed=0):
+    """
+    Current threshold posterior for one task and the expected information
+    gain of every (candidate, n_items). `candidates` maps name -> log10 params.
+    """
+    rng = np.random.default_rng(seed)
+    x, y, n_items = (np.asarray(a, dtype=np.float64) for a in (x, y, n_items))
+    gp = fit_gp(x, y, np.clip(y * (1 - y), 1e-4, None) / n_items)
+
+    names = list(candidates)
+    cand_x = np.array([candidates[n] for n in names])
+    lo = x.min() - 0.5
+    hi = max(x.max(), cand_x.max() if len(cand_x) else x.max()) + 0.5
+    grid = np.arange(lo, hi + GRID_STEP / 2, GRID_STEP)
+    z = np.concatenate([grid, cand_x])
+    mean, cov = posterior(gp, z)
+    chol = np.linalg.cholesky(cov + 1e-8 * np.eye(len(z)))
+    samples = mean + rng.standard_normal((n_samples, len(z))) @ chol.T  # [S, G + C]
+    bins, n_bins = threshold_bins(samples[:, :len(grid)], grid, tau)
+    prior_entropy = float(entropy_bits(bins, n_bins))
+
+    crossed = bins < n_bins - 1
+    crossing = grid[0] + (bins[crossed] + 0.5) * BIN_WIDTH
+    current = {
+        "threshold_median_log10": float(np.median(crossing)) if crossed.any() else None,
+        "threshold_90_log10": np.percentile(crossing, [5, 95]).tolist() if crossed.any() else None,
+        "p_not_reached": float(1 - crossed.mean()),
+        "entropy_bits": prior_entropy,
+        "gp": {k: gp[k] for k in ("length", "scale", "model_sd", "log_lik")},
+    }
+
+    # Common random numbers: one set of fantasy quantiles and noise draws for all candidates.
+    fantasy_q = rng.standard_normal(n_fantasies)
+    eps_q = rng.standard_normal(n_samples)
+    rows = []
+    for c, name in enumerate(names):
+        idx = len(grid) + c
+        k_c = cov[:len(grid), idx]
+        y_pred = mean[idx]
+        p = float(np.clip(y_pred, 1e-3, 1 - 1e-3))
+        for n in n_item_grid:
+            obs_var = gp["model_sd"] ** 2 + p * (1 - p) / n
+            pred_sd = math.sqrt(cov[idx, idx] + obs_var)
+            fantasies = y_pred + pred_sd * fantasy_q  # [J]
+            gain = k_c / (cov[idx, idx] + obs_var)  # [G]
+            innovation = (fantasies[:, None] - samples[None, :, idx]
+                          - math.sqrt(obs_var) * eps_q[None, :])  # [J, S]
+            updated = samples[None, :, :len(grid)] + innovation[..., None] * gain  # [J, S, G]
+            post_entropy = float(entropy_bits(threshold_bins(updated, grid, tau)[0], n_bins).mean())
+            cost = 10 ** candidates[name] / 1e9 * n / 1000
+            rows.append({
+                "model": name,
+                "param_count": 10 ** candidates[name] / 1e6,
+                "n_items": n,
+                "predicted": float(y_pred),
+                "info_gain_bits": prior_entropy - post_entropy,
+                "cost": cost,
+                "gain_per_cost": (prior_entropy - post_entropy) / cost,
+            })
+    return current, rows
+
+def recommend(records, candidates=None, tau=0.3, metric="ucs", alpha=0.3,
+              n_item_grid=DEFAULT_N_ITEMS, default_n_items=10000, n_samples=512, n_fantasies=32,
+              seed=0):
+    """
+    Per dataset: the current threshold posterior and candidate rows sorted
+    by gain per cost. Candidates already in a dataset's records are skipped.
+    `candidates` maps name -> parameters in millions.
+    """
+    from results_catalog import datasets, metric_value
+
+    candidates = DEFAULT_CANDIDATES if candidates is None else candidates
+    out = {}
+    for ds in datasets(records):
+        rows = [r for r in records if r["dataset"] == ds]
+        seen = {r["model"] for r in rows}
+        todo = {name: math.log10(m * 1e6) for name, m in candidates.items() if name not in seen}
+        x = [math.log10(r["param_count"] * 1e6) for r in rows]
+        y = [metric_value(r, metric, alpha) for r in rows]
+        n = [r.get("n_items") or default_n_items for r in rows]
+        current, ranked = task_recommendations(x, y, n, todo, tau, n_item_grid, n_samples,
+                                               n_fantasies, seed)
+        ranked.sort(key=lambda r: -r["gain_per_cost"])
+        out[ds] = {"current": current, "candidates": ranked}
+    return out
+
+def _parse_candidates(values):
+    out = {}
+    for value in values:
+        name, _, millions = value.rpartition("=")
+        if not name:
+            raise argparse.ArgumentTypeError(f"expected name=millions, got {value!r}")
+        out[name] = float(millions)
+    return out
+
+def main():
+    parser = argparse.ArgumentParser(description="Recommend the next model / item count to evaluate.")
+    parser.add_argument("--records", default=None,
+                        help="plotting script with data_records (default: results/final_plot.py)")
+    parser.add_argument("--metric", default="ucs")
+    parser.add_argument("--alpha", type=float, default=0.3)
+    parser.add_argument("--tau", type=float, default=0.3)
+    parser.add_argument("--candidates", nargs="+", default=None,
+                        help="name=millions_of_parameters (default: DEFAULT_CANDIDATES)")
+    parser.add_argument("--n_items", type=int, nargs="+", default=list(DEFAULT_N_ITEMS))
+    parser.add_argument("--default_n_items", type=int, default=10000,
+                        help="items behind records that do not say")
+    parser.add_argument("--samples", type=int, default=512)
+    parser.add_argument("--fantasies", type=int, default=32)
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    from results_catalog import FINAL_PLOT, load_records
+
+    candidates = _parse_candidates(args.candidates) if args.candidates else None
+    out = recommend(load_records(args.records or FINAL_PLOT), candidates, args.tau, args.metric,
+                    args.alpha, args.n_items, args.default_n_items, args.samples, args.fantasies,
+                    args.seed)
+
+    for ds, rec in out.items():
+        cur = rec["current"]
+        if cur["threshold_median_log10"] is None:
+            where = "not reached in range"
+        else:
+            lo, hi = cur["threshold_90_log10"]
+            where = (f"{10 ** cur['threshold_median_log10'] / 1e9:.2f}B "
+                     f"[90%: {10 ** lo / 1e9:.2f}, {10 ** hi / 1e9:.2f}]")
+        print(f"\n{ds}: {args.metric} >= {args.tau} at {where}, "
+              f"P(not reached) = {cur['p_not_reached']:.2f}, H = {cur['entropy_bits']:.2f} bits")
+        print(f"  {'model':<28} {'params':>7} {'items':>6} {'pred':>6} {'bits':>6} {'bits/cost':>9}")
+        for row in rec["candidates"][:args.top]:
+            print(f"  {row['model']:<28} {row['param_count'] / 1e3:>6.2f}B {row['n_items']:>6} "
+                  f"{row['predicted']:>6.3f} {row['info_gain_bits']:>6.3f} "
+                  f"{row['gain_per_cost']:>9.3f}")
+        best = max(rec["candidates"], key=lambda r: r["info_gain_bits"], default=None)
+        if best is not None:
+            print(f"  largest gain: {best['model']} on {best['n_items']} items "
+                  f"({best['info_gain_bits']:.3f} bits)")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(out, f, indent=2)
+        print(f"\nSaved {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+# src/scoring_server.py
+
+"""
+Long-running local HTTP scoring service.
+
+The model is loaded once (load_model). Concurrent requests are coalesced
+into dynamic micro-batches: the batcher thread takes the first waiting
+request, keeps collecting until `max_batch` requests are queued or
+`max_wait_ms` has passed, and scores the whole batch with
+get_option_probabilities_batch.
+
+POST /score  {"prompt": str, "choices": [str, ...], "correct_idx": int (optional)}
+  -> {"probs": [...], "predicted_idx": int, "entropy": float,
+      "capability": float | null, "ucs": float | null, "batch_size": int}
+  capability and UCS need the gold answer, so they are null when
+  correct_idx is omitted. Malformed requests, an out-of-range correct_idx and
+  prompts longer than the model's context get a 400.
+GET  /health, GET /stats
+
+If a batch fails, its requests are retried one at a time, so only the
+request that caused the failure gets an error. Requests that time out before
+their batch starts are dropped and counted under "cancelled" in /stats.
+
+Usage:
+    python src/scoring_server.py --model_name gpt2 --device cuda --port 8080
+"""
+
+import argparse
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from capability_utils import compute_capability, compute_entropy, compute_ucs
+
+class _Pending:
+    __slots__ = ("prompt", "choices", "correct_idx", "done", "result", "error", "cancelled")
+
+    def __init__(self, prompt, choices, correct_idx):
+        self.prompt = prompt
+        self.choices = choices
+        self.correct_idx = correct_idx
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.cancelled = False
+
+class MicroBatcher:
+    """
+    Collects requests from many threads and scores them in batches on a
+    single worker thread (the model is never used concurrently).
+    """
+
+    def __init__(self, tokenizer, model, device="cuda", max_batch=32, max_wait_ms=10.0,
+                 alpha=0.3, max_sequences=64):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.device = device
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.alpha = alpha
+        self.max_sequences = max_sequences
+        self.queue = queue.Queue()
+        self.stats = {"requests": 0, "batches": 0, "busy_seconds": 0.0, "batch_retries": 0,
+                      "cancelled": 0}
+        config = getattr(model, "config", None)
+        self.max_length = (getattr(config, "n_positions", None)
+                           or getattr(config, "max_position_embeddings", None))
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def validate(self, prompt, choices, correct_idx=None):
+        """
+        Raise ValueError for a request that cannot be scored, so that it is
+        rejected before it joins (and fails) a batch.
+        """
+        if not isinstance(prompt, str):
+            raise ValueError("'prompt' must be a string")
+        if not isinstance(choices, list) or not choices or not all(isinstance(c, str) for c in choices):
+            raise ValueError("'choices' must be a non-empty list of strings")
+        if correct_idx is not None and (not isinstance(correct_idx, int) or isinstance(correct_idx, bool)
+                                        or not 0 <= correct_idx < len(choices)):
+            raise ValueError(f"'correct_idx' must be an integer in [0, {len(choices) - 1}]")
+        if self.max_length:
+            from multiple_choice import tokenize_options
+
+            longest = max(len(ids) for ids in tokenize_options([prompt], [choices], self.tokenizer))
+            if longest > self.max_length:
+                raise ValueError(f"prompt + choice is {longest} tokens; the model accepts at most "
+                                 f"{self.max_length}")
+
+    def score(self, prompt, choices, correct_idx=None, timeout=None):
+        """
+        Blocking call used by request handlers.
+        """
+        pending = _Pending(prompt, choices, correct_idx)
+        self.queue.put(pending)
+        if not pending.done.wait(timeout):
+            # Not scored yet: the batcher drops it instead of scoring it for nobody.
+            pending.cancelled = True
+            raise TimeoutError("scoring timed out")
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _take(self, timeout=None):
+        """
+        Next request that has not timed out, or None when `timeout` passes.
+        """
+        while True:
+            try:
+                pending = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                return None
+            if not pending.cancelled:
+                return pending
+            self.stats["cancelled"] += 1
+
+    def _collect(self):
+        batch = [self._take()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            pending = self._take(remaining)
+            if pending is None:
+                break
+            batch.append(pending)
+        return batch
+
+    def _score_batch(self, batch):
+        from multiple_choice import get_option_probabilities_batch
+
+        probs = get_option_probabilities_batch(
+            [p.prompt for p in batch], [p.choices for p in batch],
+            self.tokenizer, self.model, device=self.device,
+            max_sequences=self.max_sequences)
+        for pending, prob_array in zip(batch, probs):
+            pending.result = self._result(prob_array, pending.correct_idx, len(batch))
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            start = time.perf_counter()
+            try:
+                self._score_batch(batch)
+            except Exception as exc:
+                if len(batch) == 1:
+                    batch[0].error = exc
+                else:
+                    # Retry one at a time so only the offending request fails.
+                    self.stats["batch_retries"] += 1
+                    for pending in batch:
+                        try:
+                            self._score_batch([pending])
+                        except Exception as item_exc:
+                            pending.error = item_exc
+            self.stats["requests"] += len(batch)
+            self.stats["batches"] += 1
+            self.stats["busy_seconds"] += time.perf_counter() - start
+            for pending in batch:
+                pending.done.set()
+
+    def _result(self, prob_array, correct_idx, batch_size):
+        ent = float(compute_entropy(prob_array))
+        result = {
+            "probs": prob_array.tolist(),
+            "predicted_idx": int(prob_array.argmax()),
+            "entropy": ent,
+            "capability": None,
+            "ucs": None,
+            "batch_size": batch_size,
+        }
+        if correct_idx is not None:
+            cap = compute_capability(prob_array, correct_idx)
+            result["capability"] = cap
+            result["ucs"] = float(compute_ucs(cap, ent, self.alpha))
+        return result
+
+class ScoringHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The socketserver default backlog (5) resets connections under load.
+    request_queue_size = 1024
+
+def make_handler(batcher, request_timeout=60.0):
+    class ScoringHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"status": "ok"})
+            elif self.path == "/stats":
+                stats = dict(batcher.stats)
+                stats["mean_batch_size"] = (stats["requests"] / stats["batches"]
+                                            if stats["batches"] else 0.0)
+                self._send(200, stats)
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/score":
+                self._send(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length))
+                prompt, choices = request["prompt"], request["choices"]
+                correct_idx = request.get("correct_idx")
+                batcher.validate(prompt, choices, correct_idx)
+            except (KeyError, ValueError, TypeError) as exc:
+                self._send(400, {"error": f"bad request: {exc}"})
+                return
+            try:
+                self._send(200, batcher.score(prompt, choices, correct_idx, timeout=request_timeout))
+            except Exception as exc:
+                self._send(500, {"error": f"{type(exc).__name__}: {exc}"})
+
+        def log_message(self, format, *args):
+            pass  # one line per request would dominate the output under load
+
+    return ScoringHandler
+
+def serve(tokenizer, model, device="cuda", host="127.0.0.1", port=8080, max_batch=32,
+          max_wait_ms=10.0, alpha=0.3, max_sequences=64):
+    """
+    Build the batcher and HTTP server. Call `serve_forever()` on the returned
+    server (or run it in a thread).
+    """
+    batcher = MicroBatcher(tokenizer, model, device=device, max_batch=max_batch,
+                           max_wait_ms=max_wait_ms, alpha=alpha, max_sequences=max_sequences)
+    server = ScoringHTTPServer((host, port), make_handler(batcher))
+    server.batcher = batcher
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-batching capability/uncertainty scorer.")
+    parser.add_argument("--model_name", default="gpt2-medium")
+    parser.add_argument("--device", default="cuda")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--max_batch", type=int, default=32, help="max requests per micro-batch")
+    parser.add_argument("--max_wait_ms", type=float, default=10.0,
+                        help="how long the first request of a batch may wait for company")
+    parser.add_argument("--max_sequences", type=int, default=64,
+                        help="max (prompt, choice) sequences per forward pass")
+    parser.add_argument("--alpha", type=float, default=0.3)
+    args = parser.parse_args()
+
+    from model_utils import load_model
+
+    tokenizer, model = load_model(model_name=args.model_name, device=args.device)
+    server = serve(tokenizer, model, device=args.device, host=args.host, port=args.port,
+                   max_batch=args.max_batch, max_wait_ms=args.max_wait_ms, alpha=args.alpha,
+                   max_sequences=args.max_sequences)
+    print(f"Scoring {args.model_name} on http://{args.host}:{args.port}/score")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
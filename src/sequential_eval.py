@@ -0,0 +1,166 @@
+# src/sequential_eval.py
+
+"""
+Sequential (early-stopping) evaluation.
+
+Items are scored in a random order and, after every item, an anytime-valid
+confidence sequence is updated for mean capability and mean UCS. The run stops
+as soon as the interval of the decision metric lies entirely above or below
+`tau`, or is narrower than `target_width`, whichever comes first.
+
+The intervals are Hoeffding bounds with a union bound over time: at step t
+the error budget is delta / (t (t + 1)), which sums to delta over all t, so
+the coverage guarantee holds even though we look at the bounds after every
+item and stop on them. Capability lies in [0, 1]; UCS = C (1 - alpha H) lies
+in [min(0, 1 - alpha log k), 1] for k choices, or [min(0, 1 - alpha), 1]
+with normalised entropy.
+"""
+
+import math
+import random
+
+from instrumentation import count
+
+def hoeffding_radius(t, value_range, delta):
+    """
+    Anytime-valid half-width after `t` observations bounded in an interval of
+    width `value_range`.
+    """
+    delta_t = delta / (t * (t + 1))
+    return value_range * math.sqrt(math.log(2.0 / delta_t) / (2.0 * t))
+
+def ucs_bounds(max_choices, alpha, normalize_entropy=False):
+    """
+    Range of per-item UCS values for at most `max_choices` options.
+    """
+    max_entropy = 1.0 if normalize_entropy else math.log(max_choices)
+    return min(0.0, 1.0 - alpha * max_entropy), 1.0
+
+class RunningBound:
+    """
+    Running mean of a bounded quantity with its anytime-valid interval.
+    """
+
+    def __init__(self, low, high, delta):
+        self.low = low
+        self.high = high
+        self.delta = delta
+        self.n = 0
+        self.total = 0.0
+
+    def update(self, value):
+        self.n += 1
+        self.total += value
+
+    @property
+    def mean(self):
+        return self.total / self.n if self.n else 0.0
+
+    def interval(self):
+        if not self.n:
+            return self.low, self.high
+        radius = hoeffding_radius(self.n, self.high - self.low, self.delta)
+        return max(self.low, self.mean - radius), min(self.high, self.mean + radius)
+
+def decide(bound, tau, target_width=None):
+    """
+    "above" / "below" once the interval excludes tau, "width" once it is
+    narrower than target_width, otherwise None (keep sampling).
+    """
+    lo, hi = bound.interval()
+    if tau is not None and lo > tau:
+        return "above"
+    if tau is not None and hi < tau:
+        return "below"
+    if target_width is not None and hi - lo <= target_width:
+        return "width"
+    return None
+
+def sequential_evaluate(items, tokenizer, model, tau=None, metric="capability", target_width=None,
+                        confidence=0.95, alpha=0.3, batch_items=16, min_items=1, seed=0,
+                        device="cuda", normalize_entropy=False):
+    """
+    Score parsed items in a seeded random order until the decision on
+    `metric` ("capability" or "ucs") is reached.
+
+    Items are scored `batch_items` at a time with the batched scorer, but the
+    stopping rule is checked after every item, so up to batch_items - 1
+    items of the last batch are scored beyond the stopping point. They do not
+    enter the estimate (that would bias the stopping rule) but do count as
+    scored, not saved.
+
+    Returns (results, unused, report): the per-item results that entered the
+    estimate, the results scored past the stopping point, and a dict with the
+    decision, intervals and items saved.
+    """
+    from main import build_result, item_entropy
+    from multiple_choice import get_option_probabilities_batch
+
+    if tau is None and target_width is None:
+        raise ValueError("sequential evaluation needs tau and/or target_width to stop on")
+    if metric not in ("capability", "ucs"):
+        raise ValueError(f"unknown metric: {metric}")
+
+    # Each metric gets half of the error budget so both intervals hold jointly.
+    delta = (1.0 - confidence) / 2.0
+    max_choices = max(len(it["choices"]) for it in items)
+    bounds = {
+        "capability": RunningBound(0.0, 1.0, delta),
+        "ucs": RunningBound(*ucs_bounds(max_choices, alpha, normalize_entropy), delta),
+    }
+
+    order = list(range(len(items)))
+    random.Random(seed).shuffle(order)
+
+    results, unused = [], []
+    decision = None
+    for start in range(0, len(order), batch_items):
+        batch = [items[i] for i in order[start:start + batch_items]]
+        probs = get_option_probabilities_batch([it["prompt"] for it in batch],
+                                               [it["choices"] for it in batch],
+                                               tokenizer, model, device=device)
+        for q_item, prob_array in zip(batch, probs):
+            result = build_result(q_item, prob_array)
+            count("items")
+            if decision:
+                unused.append(result)
+                continue
+            results.append(result)
+            cap = result["capability"]
+            bounds["capability"].update(cap)
+            bounds["ucs"].update(cap * (1.0 - alpha * item_entropy(result, normalize_entropy)))
+            if len(results) >= min_items:
+                decision = decide(bounds[metric], tau, target_width)
+        if decision:
+            break
+
+    n_scored = len(results) + len(unused)
+    report = {
+        "metric": metric,
+        "tau": tau,
+        "target_width": target_width,
+        "confidence": confidence,
+        "decision": decision or "exhausted",
+        "n_used": len(results),
+        "n_scored": n_scored,
+        "n_total": len(items),
+        "n_saved": len(items) - n_scored,
+        "fraction_saved": (len(items) - n_scored) / len(items) if items else 0.0,
+    }
+    for name, bound in bounds.items():
+        lo, hi = bound.interval()
+        report[name] = {"mean": bound.mean, "lower": lo, "upper": hi}
+    return results, unused, report
+
+def print_report(report):
+    m = report[report["metric"]]
+    print(f"Sequential {report['metric']}: {m['mean']:.3f} "
+          f"[{m['lower']:.3f}, {m['upper']:.3f}] at {report['confidence']:.0%} confidence")
+    if report["decision"] in ("above", "below"):
+        print(f"Decision: {report['metric']} is {report['decision']} tau={report['tau']}")
+    elif report["decision"] == "width":
+        print(f"Decision: interval narrower than {report['target_width']}")
+    else:
+        print("No decision: all items scored")
+    print(f"Scored {report['n_scored']}/{report['n_total']} items, {report['n_used']} in the "
+          f"estimate (saved {report['n_saved']}, {report['fraction_saved']:.0%})")
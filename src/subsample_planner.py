@@ -0,0 +1,181 @@
+# src/subsample_planner.py
+
+"""
+Stratified subsampling for expensive model sweeps.
+
+1. Score a cheap model (e.g. distilgpt2) on the full dataset with main.py.
+2. `plan`: stratify the items by the cheap model's correctness x entropy
+   quantile, and draw a subset of `--fraction` of the items with Neyman
+   allocation. The per-stratum SD is approximated by the Bernoulli SD of the
+   cheap model's probability on the gold answer.
+3. Run the large model on the subset only: `main.py --item_ids plan.json`.
+4. `estimate`: combine the subset results with the stratified
+   (importance-weighted, weight N_h / n_h) estimator and report accuracy,
+   entropy and UCS with standard errors.
+
+Usage:
+    python src/subsample_planner.py plan --small_results results/distilgpt2.json \\
+        --fraction 0.1 --output results/plan.json
+    python src/main.py --model_name <large> --item_ids results/plan.json --output large_sub.json
+    python src/subsample_planner.py estimate --plan results/plan.json \\
+        --results large_sub.json [--reference large_full.json]
+"""
+
+import argparse
+import json
+
+import numpy as np
+
+def load_results(path):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data["results"] if isinstance(data, dict) else data
+
+def assign_strata(results, n_entropy_bins=5):
+    """
+    Stratum label per item: correctness (0/1) x entropy quantile bin of the
+    cheap model. Bins are computed separately within each correctness group.
+    """
+    correct = np.array([int(r["capability"]) for r in results])
+    entropy = np.array([float(r["entropy"]) for r in results])
+    labels = np.empty(len(results), dtype=int)
+    for c in (0, 1):
+        mask = correct == c
+        if not mask.any():
+            continue
+        edges = np.quantile(entropy[mask], np.linspace(0, 1, n_entropy_bins + 1)[1:-1])
+        labels[mask] = c * n_entropy_bins + np.searchsorted(edges, entropy[mask], side="right")
+    return labels
+
+def neyman_allocation(sizes, sds, budget, min_per_stratum=2):
+    """
+    Integer sample sizes n_h proportional to N_h * S_h, summing to `budget`
+    (capped at N_h, at least min(min_per_stratum, N_h) each).
+    """
+    sizes = np.asarray(sizes, dtype=int)
+    n = np.minimum(sizes, min_per_stratum)
+    remaining = budget - n.sum()
+    weights = sizes * np.asarray(sds, dtype=float)
+    while remaining > 0:
+        room = sizes - n
+        open_ = room > 0
+        if not open_.any():
+            break
+        w = np.where(open_, weights, 0.0)
+        if w.sum() <= 0:
+            w = open_.astype(float)
+        share = np.minimum(np.floor(remaining * w / w.sum()).astype(int), room)
+        if share.sum() == 0:  # hand out the rounding remainder one by one
+            share[np.argmax(np.where(open_, w, -1.0))] = 1
+        n += share
+        remaining -= share.sum()
+    return n
+
+def make_plan(results, fraction=0.1, n_entropy_bins=5, seed=0, min_sd=0.05):
+    """
+    Build the sampling plan from the cheap model's full-dataset results.
+    """
+    rng = np.random.default_rng(seed)
+    labels = assign_strata(results, n_entropy_bins)
+    gold_prob = np.array([r["probs"][r["correct_idx"]] for r in results], dtype=float)
+    ids = [str(r["id"]) for r in results]
+    strata = np.unique(labels)
+
+    sizes = np.array([(labels == h).sum() for h in strata])
+    sds = []
+    for h in strata:
+        p = gold_prob[labels == h].mean()
+        sds.append(max(np.sqrt(p * (1.0 - p)), min_sd))
+    budget = max(int(round(fraction * len(results))), len(strata))
+    alloc = neyman_allocation(sizes, sds, budget)
+
+    plan_strata = []
+    for h, size, n_h in zip(strata, sizes, alloc):
+        members = np.flatnonzero(labels == h)
+        chosen = rng.choice(members, size=int(n_h), replace=False)
+        plan_strata.append({
+            "stratum": int(h),
+            "correct": int(h // n_entropy_bins),
+            "entropy_bin": int(h % n_entropy_bins),
+            "N": int(size),
+            "n": int(n_h),
+            "item_ids": [ids[i] for i in sorted(chosen)],
+        })
+    return {
+        "n_total": len(results),
+        "n_selected": int(alloc.sum()),
+        "fraction": fraction,
+        "n_entropy_bins": n_entropy_bins,
+        "seed": seed,
+        "strata": plan_strata,
+        "item_ids": [i for s in plan_strata for i in s["item_ids"]],
+    }
+
+def stratified_estimate(plan, results, alpha=0.3):
+    """
+    Stratified mean and standard error (with finite population correction)
+    of accuracy, entropy and UCS from the large model's subset results.
+    """
+    by_id = {str(r["id"]): r for r in results}
+    n_total = plan["n_total"]
+    estimate = {}
+    for metric in ("accuracy", "entropy", "ucs"):
+        mean = var = 0.0
+        for s in plan["strata"]:
+            rows = [by_id[i] for i in s["item_ids"] if i in by_id]
+            if not rows:
+                raise ValueError(f"no results for stratum {s['stratum']}")
+            cap = np.array([float(r["capability"]) for r in rows])
+            ent = np.array([float(r["entropy"]) for r in rows])
+            y = {"accuracy": cap, "entropy": ent, "ucs": cap * (1.0 - alpha * ent)}[metric]
+            w = s["N"] / n_total
+            n_h = len(y)
+            mean += w * y.mean()
+            if n_h > 1:
+                var += w ** 2 * (1.0 - n_h / s["N"]) * y.var(ddof=1) / n_h
+        estimate[metric] = {"mean": float(mean), "se": float(np.sqrt(var))}
+    return estimate
+
+def main():
+    parser = argparse.ArgumentParser(description="Stratified subsampling planner.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("plan", help="choose a stratified subset from cheap-model results")
+    p.add_argument("--small_results", required=True, help="main.py output for the cheap model")
+    p.add_argument("--fraction", type=float, default=0.1)
+    p.add_argument("--entropy_bins", type=int, default=5)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--output", default="results/subsample_plan.json")
+
+    e = sub.add_parser("estimate", help="estimate full-set metrics from subset results")
+    e.add_argument("--plan", required=True)
+    e.add_argument("--results", required=True, help="main.py output for the subset")
+    e.add_argument("--alpha", type=float, default=0.3)
+    e.add_argument("--reference", default=None,
+                   help="optional full-set results to report the actual error")
+    args = parser.parse_args()
+
+    if args.command == "plan":
+        plan = make_plan(load_results(args.small_results), args.fraction, args.entropy_bins,
+                         args.seed)
+        with open(args.output, "w") as f:
+            json.dump(plan, f, indent=2)
+        print(f"Selected {plan['n_selected']}/{plan['n_total']} items "
+              f"in {len(plan['strata'])} strata -> {args.output}")
+        return
+
+    with open(args.plan, "r", encoding="utf-8") as f:
+        plan = json.load(f)
+    estimate = stratified_estimate(plan, load_results(args.results), args.alpha)
+    reference = None
+    if args.reference:
+        from main import summarize_results
+        reference = summarize_results(load_results(args.reference), args.alpha)
+    for metric, est in estimate.items():
+        line = (f"{metric:<9} {est['mean']:.4f} ± {1.96 * est['se']:.4f} (95%)")
+        if reference:
+            line += f"   full set {reference[metric]:.4f}  error {est['mean'] - reference[metric]:+.4f}"
+        print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# src/synthetic_data.py
+
+"""
+Seeded, vectorised generators for the synthetic appendix figures.
+
+Every series is produced as a whole array by broadcasting over
+model x threshold x task, so a figure costs the same handful of numpy calls
+at any resolution. Randomness comes from `generator(name)`: one independent
+stream per figure/series name derived from a single seed, so a figure looks
+the same whether it is rendered alone, with the others, or in a worker
+process.
+"""
+
+import zlib
+
+import numpy as np
+
+SEED = 42
+
+def generator(name, seed=SEED):
+    """
+    Reproducible numpy Generator for the series called `name`.
+    """
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(zlib.crc32(name.encode()),)))
+
+def logistic(x, x0, k, floor=0.0, ceil=1.0):
+    """
+    floor + (ceil - floor) * sigmoid(k (x - x0)), broadcast over all arguments.
+    """
+    return floor + (ceil - floor) / (1.0 + np.exp(-k * (np.asarray(x) - x0)))
+
+def perturb(base, sd, rng, shape=None):
+    """
+    base + N(0, sd^2) noise drawn in one call; `shape` (default: base's
+    shape) must broadcast with base.
+    """
+    base = np.asarray(base, dtype=np.float64)
+    return base + rng.normal(0.0, sd, np.broadcast_shapes(base.shape, shape or base.shape))
+
+def stepwise(sizes, edges, levels):
+    """
+    levels[i] for sizes in [edges[i-1], edges[i]) (len(levels) == len(edges) + 1).
+    """
+    return np.asarray(levels)[np.digitize(sizes, edges)]
+
+def emergence_fraction(thresholds, sizes, size_edges=(0.5, 2.0), centers=(0.3, 0.5, 0.7),
+                       slopes=(10.0, 8.0, 6.0)):
+    """
+    [model, threshold] fraction of items above each threshold: a decreasing
+    logistic in the threshold whose centre and slope depend on the model's
+    size class (small / medium / large by default).
+    """
+    cls = np.digitize(sizes, size_edges)
+    center = np.asarray(centers)[cls][:, None]
+    slope = np.asarray(slopes)[cls][:, None]
+    return 1.0 / (1.0 + np.exp(slope * (np.asarray(thresholds)[None, :] - center)))
+
+def task_curves(scales, x0, k, base_uncertainty, rng, jitter=0.01, floor=0.05, ceil=0.90):
+    """
+    [task, scale] accuracy and uncertainty with a logistic emergence per task
+    (centre x0, steepness k, both [task]) plus Gaussian jitter, clipped to [0, 1].
+    Uncertainty falls by 0.1 over the same transition.
+    """
+    scales = np.asarray(scales, dtype=np.float64)[None, :]
+    x0, k, base_uncertainty = (np.asarray(a, dtype=np.float64)[:, None]
+                               for a in (x0, k, base_uncertainty))
+    shape = np.broadcast_shapes(scales.shape, x0.shape)
+    accuracy = perturb(logistic(scales, x0, k, floor, ceil), jitter, rng, shape)
+    uncertainty = perturb(base_uncertainty - 0.1 * logistic(scales, x0, k), jitter, rng, shape)
+    return np.clip(accuracy, 0.0, 1.0), np.clip(uncertainty, 0.0, 1.0)
@@ -0,0 +1,132 @@
+# src/ucs_index.py
+
+"""
+Exact, sub-millisecond UCS queries over a result file at any (alpha, tau).
+
+Capability is 0/1 per item, so UCS = capability * (1 - alpha * entropy) is
+0 for wrong items and 1 - alpha * entropy for correct ones. Keeping only the
+sorted entropies of the correct items therefore answers every query with a
+binary search:
+
+    #{UCS >= tau} = #{correct, entropy <= (1 - tau) / alpha}
+                    + #{wrong} * [tau <= 0]
+
+Histograms come from the same counts at the bin edges, quantiles from
+index arithmetic on the sorted entropies, and mean UCS from two sums. None
+of this touches the per-item data again after the index is built.
+"""
+
+import json
+import os
+
+import numpy as np
+
+def parse_result_name(path):
+    """
+    (dataset, model) of a main.py result file named <dataset>_results_<model>.json,
+    or None for other files.
+    """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if "_results_" not in stem:
+        return None
+    dataset, _, model = stem.partition("_results_")
+    return dataset, model
+
+def find_result_files(root):
+    """
+    [(dataset, model, path)] for every <dataset>_results_<model>.json under `root`.
+    """
+    found = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            parsed = parse_result_name(name) if name.endswith(".json") else None
+            if parsed is not None:
+                found.append(parsed + (os.path.join(dirpath, name),))
+    return sorted(found)
+
+class UCSIndex:
+    """
+    Sorted entropies of the correct items of one result file.
+    """
+
+    def __init__(self, capability, entropy):
+        capability = np.asarray(capability, dtype=np.float64)
+        entropy = np.asarray(entropy, dtype=np.float64)
+        self.n = len(capability)
+        self.correct_entropy = np.sort(entropy[capability > 0.5])
+        self.n_correct = len(self.correct_entropy)
+        self.entropy_sum = float(self.correct_entropy.sum())
+        self.mean_entropy = float(entropy.mean()) if self.n else 0.0
+
+    @classmethod
+    def from_results(cls, results, normalize_entropy=False):
+        from main import item_entropy
+
+        return cls([r["capability"] for r in results],
+                   [item_entropy(r, normalize_entropy) for r in results])
+
+    @property
+    def accuracy(self):
+        return self.n_correct / max(self.n, 1)
+
+    def mean_ucs(self, alpha):
+        return (self.n_correct - alpha * self.entropy_sum) / max(self.n, 1)
+
+    def count_above(self, alpha, tau):
+        """
+        Number of items with UCS >= tau; alpha and tau broadcast.
+        """
+        alpha, tau = np.broadcast_arrays(np.asarray(alpha, dtype=np.float64),
+                                         np.asarray(tau, dtype=np.float64))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            limit = np.where(alpha > 0, (1.0 - tau) / alpha, np.where(tau <= 1.0, np.inf, -np.inf))
+        correct = np.searchsorted(self.correct_entropy, limit, side="right")
+        return correct + np.where(tau <= 0.0, self.n - self.n_correct, 0)
+
+    def fraction_above(self, alpha, tau):
+        return self.count_above(alpha, tau) / max(self.n, 1)
+
+    def histogram(self, alpha, edges):
+        """
+        Item counts of UCS per bin [edges[i], edges[i + 1]); values outside
+        the edges are clipped into the first / last bin.
+        """
+        above = self.count_above(alpha, np.asarray(edges, dtype=np.float64))
+        counts = above[:-1] - above[1:]
+        counts[0] += self.n - above[0]
+        counts[-1] += above[-1]
+        return counts
+
+    def quantiles(self, alpha, q):
+        """
+        UCS quantiles (numpy's default linear interpolation) at levels q.
+        """
+        if self.n == 0:
+            return np.full(np.shape(q), np.nan)
+        # Ascending UCS: correct items with UCS < 0 (largest entropies first),
+        # then the zeros of wrong items, then the remaining correct items.
+        n_negative = self.n_correct - (np.searchsorted(self.correct_entropy, 1.0 / alpha, side="right")
+                                       if alpha > 0 else self.n_correct)
+        n_zero = self.n - self.n_correct
+
+        def value(rank):
+            if not self.n_correct:
+                return np.zeros(np.shape(rank))
+            in_zero = (rank >= n_negative) & (rank < n_negative + n_zero)
+            j = np.where(rank < n_negative, rank, rank - n_zero)
+            ent = self.correct_entropy[np.clip(self.n_correct - 1 - j, 0, self.n_correct - 1)]
+            return np.where(in_zero, 0.0, 1.0 - alpha * ent)
+
+        pos = np.asarray(q, dtype=np.float64) * (self.n - 1)
+        lo = np.floor(pos).astype(int)
+        hi = np.minimum(lo + 1, self.n - 1)
+        return value(lo) + (pos - lo) * (value(hi) - value(lo))
+
+def load_index(path, normalize_entropy=False):
+    """
+    UCSIndex of a main.py result file (plain list or --sequential dict).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    results = data["results"] if isinstance(data, dict) else data
+    return UCSIndex.from_results(results, normalize_entropy)
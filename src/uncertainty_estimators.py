@@ -0,0 +1,196 @@
+# src/uncertainty_estimators.py
+
+"""
+Epistemic uncertainty estimators on top of the last-token scorer.
+
+- MC-dropout: dropout stays active at inference and T stochastic predictions
+  are drawn per item. Every padded chunk of sequences is replicated T times
+  along the batch dimension and scored in one forward pass, each row with
+  its own dropout mask. The arithmetic is that of T passes; what batching
+  buys is fewer, larger launches, so MC passes get their own row budget
+  (`max_rows`, default 512) rather than the plain scorer's max_sequences.
+  With T = 20 that is 25 distinct sequences per pass instead of 3.
+- Ensembles: the same items are scored by several checkpoints (e.g. the
+  GPT-2 family) and each checkpoint is one member.
+
+Both report capability_utils.uncertainty_decomposition per item: total
+predictive entropy = expected entropy (aleatoric) + mutual information
+(epistemic).
+
+Usage:
+    python src/uncertainty_estimators.py mc_dropout --model_name gpt2 \\
+        --data_path data/mmlu_10k.json --samples 20 --output results/mcd_gpt2.json
+    python src/uncertainty_estimators.py ensemble \\
+        --models distilgpt2 gpt2 gpt2-medium --data_path data/mmlu_10k.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+
+import numpy as np
+
+from capability_utils import batch_capability, pad_prob_list, uncertainty_decomposition
+from instrumentation import count, stage
+from multiple_choice import (get_option_probabilities_batch, last_token_scores,
+                             length_sorted_chunks, normalize_scores, pad_sequences,
+                             tokenize_options)
+
+# Rows (sequences x samples) per MC-dropout forward pass.
+MC_MAX_ROWS = 512
+
+@contextlib.contextmanager
+def mc_dropout(model, p=None):
+    """
+    Put only the nn.Dropout modules in train mode (optionally overriding
+    their rate) and restore eval mode afterwards.
+
+    Models trained without dropout (p=0 everywhere) need an explicit `p`.
+    Attention-probability dropout inside fused (SDPA) attention follows the
+    attention module's own mode and stays off; residual and embedding
+    dropout are active.
+    """
+    import torch
+
+    dropouts = [m for m in model.modules() if isinstance(m, torch.nn.Dropout)]
+    old_p = [m.p for m in dropouts]
+    model.eval()
+    try:
+        for m in dropouts:
+            if p is not None:
+                m.p = p
+            m.train(m.p > 0)
+        if not any(m.training for m in dropouts):
+            raise ValueError("model has no active dropout; pass a dropout rate")
+        yield model
+    finally:
+        for m, rate in zip(dropouts, old_p):
+            m.p = rate
+        model.eval()
+
+def mc_dropout_scores(encoded, model, n_samples=20, device="cuda", max_rows=MC_MAX_ROWS):
+    """
+    [n_samples, n_sequences] last-token scores with dropout active. Each
+    forward pass holds max_rows // n_samples distinct sequences, each
+    replicated n_samples times.
+    """
+    scores = np.empty((n_samples, len(encoded)), dtype=np.float64)
+    per_pass = max(1, max_rows // n_samples)
+    for chunk in length_sorted_chunks(encoded, per_pass):
+        input_ids, attention_mask, lengths = pad_sequences([encoded[i] for i in chunk], device)
+        with stage("forward"):
+            sample_scores = last_token_scores(model, input_ids.repeat(n_samples, 1),
+                                              attention_mask.repeat(n_samples, 1),
+                                              lengths * n_samples)
+        with stage("extract"):
+            scores[:, chunk] = sample_scores.float().view(n_samples, len(chunk)).cpu().numpy()
+        count("sequences", len(chunk) * n_samples)
+        count("tokens", sum(lengths) * n_samples)
+    return scores
+
+def mc_dropout_probabilities(items, tokenizer, model, n_samples=20, device="cuda",
+                             max_rows=MC_MAX_ROWS, dropout_p=None):
+    """
+    Padded [n_samples, n_items, max_k] option probabilities and the choice mask.
+    """
+    choices_list = [it["choices"] for it in items]
+    encoded = tokenize_options([it["prompt"] for it in items], choices_list, tokenizer)
+    with mc_dropout(model, dropout_p):
+        scores = mc_dropout_scores(encoded, model, n_samples, device, max_rows)
+    samples = [pad_prob_list(normalize_scores(s, choices_list)) for s in scores]
+    return np.stack([probs for probs, _ in samples]), samples[0][1]
+
+def ensemble_probabilities(items, model_names, device="cuda", max_sequences=64):
+    """
+    Padded [n_members, n_items, max_k] option probabilities (one member per
+    checkpoint, loaded one at a time) and the choice mask.
+    """
+    from model_utils import load_model
+
+    members = []
+    for name in model_names:
+        with stage("load_model"):
+            tokenizer, model = load_model(model_name=name, device=device)
+        probs = get_option_probabilities_batch([it["prompt"] for it in items],
+                                               [it["choices"] for it in items],
+                                               tokenizer, model, device=device,
+                                               max_sequences=max_sequences)
+        members.append(pad_prob_list(probs))
+        del model
+    return np.stack([probs for probs, _ in members]), members[0][1]
+
+def uncertainty_results(items, prob_samples, mask, alpha=0.3, normalize_entropy=False):
+    """
+    Per-item records in the main.py result layout (capability and entropy
+    of the mean prediction) plus the entropy decomposition.
+    """
+    mean_probs = prob_samples.mean(axis=0)
+    correct = [it["correct_idx"] for it in items]
+    capability = batch_capability(mean_probs, mask, correct)
+    total, expected, mutual_info = uncertainty_decomposition(prob_samples, mask,
+                                                             normalize_entropy)
+    member_acc = np.mean([batch_capability(p, mask, correct) for p in prob_samples], axis=0)
+    results = []
+    for i, item in enumerate(items):
+        k = int(mask[i].sum())
+        results.append({
+            "id": item["id"],
+            "correct_idx": item["correct_idx"],
+            "probs": mean_probs[i, :k].tolist(),
+            "capability": float(capability[i]),
+            "entropy": float(total[i]),
+            "expected_entropy": float(expected[i]),
+            "mutual_info": float(mutual_info[i]),
+            "sample_accuracy": float(member_acc[i]),
+            "ucs": float(capability[i] * (1.0 - alpha * total[i])),
+        })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="MC-dropout / ensemble uncertainty.")
+    parser.add_argument("method", choices=["mc_dropout", "ensemble"])
+    parser.add_argument("--model_name", default="gpt2", help="mc_dropout model")
+    parser.add_argument("--models", nargs="+", default=["distilgpt2", "gpt2", "gpt2-medium"],
+                        help="ensemble members")
+    parser.add_argument("--samples", type=int, default=20, help="mc_dropout passes T")
+    parser.add_argument("--dropout", type=float, default=None,
+                        help="override the dropout rate (needed for models trained without it)")
+    parser.add_argument("--data_path", default="data/mmlu_10k.json")
+    parser.add_argument("--dataset", default=None)
+    parser.add_argument("--device", default="cuda")
+    parser.add_argument("--max_sequences", type=int, default=64,
+                        help="sequences per forward pass for ensemble members")
+    parser.add_argument("--mc_max_rows", type=int, default=MC_MAX_ROWS,
+                        help="rows (sequences x samples) per mc_dropout forward pass")
+    parser.add_argument("--alpha", type=float, default=0.3)
+    parser.add_argument("--normalize_entropy", action="store_true")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    from dataset_registry import load_items
+
+    items = load_items(args.data_path, args.dataset)
+    if args.method == "mc_dropout":
+        from model_utils import load_model
+
+        tokenizer, model = load_model(model_name=args.model_name, device=args.device)
+        prob_samples, mask = mc_dropout_probabilities(items, tokenizer, model, args.samples,
+                                                      args.device, args.mc_max_rows,
+                                                      args.dropout)
+    else:
+        prob_samples, mask = ensemble_probabilities(items, args.models, args.device,
+                                                    args.max_sequences)
+    results = uncertainty_results(items, prob_samples, mask, args.alpha, args.normalize_entropy)
+
+    n = len(results)
+    for key in ("capability", "sample_accuracy", "entropy", "expected_entropy", "mutual_info", "ucs"):
+        print(f"{key:<17} {sum(r[key] for r in results) / n:.4f}")
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+if __name__ == "__main__":
+    main()